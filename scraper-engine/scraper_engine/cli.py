@@ -6,7 +6,7 @@ import os
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 import click
 import requests
@@ -18,6 +18,7 @@ from uiclasses import Model
 
 from scraper_engine import sql
 from scraper_engine.config import config
+from scraper_engine.indexing import RecipeIndexer
 from scraper_engine.logs import get_logger, logger
 from scraper_engine.networking import (
     check_database_is_reachable,
@@ -26,16 +27,27 @@ from scraper_engine.networking import (
     check_sqlalchemy_connection,
     connect_to_elasticsearch,
     connect_to_redis,
+    RECIPE_QUEUE_REDIS_KEY,
     RedisQueueManager,
 )
-from scraper_engine.sites.tudo_gostoso import TudoGostosoClient
+from scraper_engine.sites.tudo_gostoso import CrawlCheckpoints, TudoGostosoClient
 from scraper_engine.sites.tudo_gostoso.models import Recipe
+from scraper_engine.util import chunked
 from scraper_engine.web.core import app
-from scraper_engine.workers import GetRecipeWorker, QueueClient, QueueServer
+from scraper_engine.workers import (
+    GetRecipeWorker,
+    HttpCacheSweeper,
+    QueueClient,
+    QueueServer,
+    RecipeParserPool,
+    RedisJobSource,
+    StreamingQueueServer,
+)
 
 DEFAULT_QUEUE_ADDRESS = "tcp://127.0.0.1:5000"
 DEFAULT_PUSH_ADDRESS = "tcp://127.0.0.1:6000"
 DEFAULT_MAX_WORKERS = multiprocessing.cpu_count()
+QUEUE_BACKENDS = click.Choice(["zmq", "redis"])
 alembic_ini_path = Path(__file__).parent.joinpath("alembic.ini").absolute()
 
 
@@ -77,54 +89,157 @@ def upgrade_db(ctx, target, alembic_ini, retry_seconds):
 @main.command("workers")
 @click.option("-s", "--queue-address", default=DEFAULT_QUEUE_ADDRESS)
 @click.option("-m", "--max-workers", default=DEFAULT_MAX_WORKERS, type=int)
+@click.option("-j", "--max-in-flight", default=config.max_workers_per_process, type=int)
+@click.option(
+    "-p",
+    "--parser-processes",
+    default=config.recipe_parser_processes,
+    type=int,
+    help="how many processes parse recipe pages, 0 parses them in the event loop",
+)
 @click.pass_context
-def workers(ctx, queue_address, max_workers):
-    async def main():
-        loop = asyncio.get_event_loop()
+def workers(ctx, queue_address, max_workers, max_in_flight, parser_processes):
+    # shared by every worker so that parsing is sized apart from fetching
+    parser = RecipeParserPool(parser_processes)
 
-        queue_server = QueueServer(queue_address, "inproc://recipe-info")
+    async def main():
+        queue_server = StreamingQueueServer(queue_address, "inproc://recipe-info")
 
         tasks = [asyncio.create_task(queue_server.run())]
         for worker_id in range(max_workers):
             recipe_info_worker = GetRecipeWorker(
-                "inproc://recipe-info", worker_id, **ctx.obj
+                "inproc://recipe-info",
+                worker_id,
+                max_in_flight=max_in_flight,
+                parser=parser,
+                **ctx.obj,
             )
             tasks.append(asyncio.create_task(recipe_info_worker.run()))
 
-        asyncio.gather(*tasks, loop=loop)
+        await asyncio.gather(*tasks)
 
-    asyncio.run(main())
+    indexer = RecipeIndexer()
+    indexer.start()
+    try:
+        asyncio.run(main())
+    finally:
+        parser.close()
+        indexer.stop()
 
 
 @main.command("worker:get_recipe")
 @click.option("-c", "--pull-connect-address", default=DEFAULT_PUSH_ADDRESS)
+@click.option("-j", "--max-in-flight", default=config.max_workers_per_process, type=int)
+@click.option("-q", "--backend", default="zmq", type=QUEUE_BACKENDS)
+@click.option("--visibility-timeout", default=300, type=float)
+@click.option(
+    "-p",
+    "--parser-processes",
+    default=config.recipe_parser_processes,
+    type=int,
+    help="how many processes parse recipe pages, 0 parses them in the event loop",
+)
 @click.pass_context
-def worker_get_recipe(ctx, pull_connect_address):
+def worker_get_recipe(
+    ctx,
+    pull_connect_address,
+    max_in_flight,
+    backend,
+    visibility_timeout,
+    parser_processes,
+):
     worker_id = "1"
-    worker = GetRecipeWorker(pull_connect_address, worker_id)
-    asyncio.run(worker.run())
+    source = None
+    if backend == "redis":
+        source = RedisJobSource(
+            RedisQueueManager(connect_to_redis(), RECIPE_QUEUE_REDIS_KEY),
+            visibility_timeout=visibility_timeout,
+        )
+
+    parser = RecipeParserPool(parser_processes)
+    worker = GetRecipeWorker(
+        pull_connect_address,
+        worker_id,
+        max_in_flight=max_in_flight,
+        source=source,
+        parser=parser,
+    )
+    indexer = RecipeIndexer()
+    indexer.start()
+    try:
+        asyncio.run(worker.run())
+    finally:
+        parser.close()
+        indexer.stop()
 
 
 @main.command("worker:queue")
 @click.option("-s", "--rep-bind-address", default=DEFAULT_QUEUE_ADDRESS)
 @click.option("-p", "--push-bind-address", default=DEFAULT_PUSH_ADDRESS)
+@click.option("-b", "--batch-size", default=100, type=int)
+@click.option(
+    "--polling",
+    is_flag=True,
+    default=False,
+    help="use the legacy broker that sleeps between polls",
+)
 @click.pass_context
-def worker_queue(ctx, rep_bind_address, push_bind_address):
-    queue_server = QueueServer(rep_bind_address, push_bind_address)
+def worker_queue(ctx, rep_bind_address, push_bind_address, batch_size, polling):
+    if polling:
+        queue_server = QueueServer(rep_bind_address, push_bind_address)
+    else:
+        queue_server = StreamingQueueServer(
+            rep_bind_address, push_bind_address, batch_size=batch_size
+        )
+
     asyncio.run(queue_server.run())
 
 
 @main.command("crawler")
 @click.option("-m", "--max-pages", default=100, type=int)
-@click.option("-f", "--urls-file", default=f"recipe-urls.json")
+@click.option(
+    "-f",
+    "--urls-file",
+    default=None,
+    help="json file of recipe urls to enqueue, written by the crawl when missing",
+)
 @click.option("-c", "--rep-connect-address", default=DEFAULT_QUEUE_ADDRESS)
+@click.option("-b", "--batch-size", default=1000, type=int)
+@click.option("-q", "--backend", default="zmq", type=QUEUE_BACKENDS)
+@click.option(
+    "-j",
+    "--concurrency",
+    default=config.crawler_sitemap_concurrency,
+    type=int,
+    help="how many sitemaps to download at the same time",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="enqueue every recipe instead of only those that changed",
+)
 @click.pass_context
-def crawl_sitemap_for_recipes(ctx, rep_connect_address, max_pages, urls_file):
+def crawl_sitemap_for_recipes(
+    ctx,
+    rep_connect_address,
+    max_pages,
+    urls_file,
+    batch_size,
+    backend,
+    concurrency,
+    full,
+):
     client = TudoGostosoClient()
-    urls_file = Path(urls_file)
+    # only given explicitly, as a stored list would replace every later
+    # incremental crawl
+    urls_file = Path(urls_file) if urls_file else None
     recipe_urls = []
+    failures = []
+    # sitemaps are marked as crawled once their recipes are enqueued
+    checkpoints = CrawlCheckpoints()
 
-    if urls_file.is_file():
+    if urls_file and urls_file.is_file():
         with urls_file.open("r") as fd:
             try:
                 recipe_urls = json.load(fd)
@@ -133,22 +248,63 @@ def crawl_sitemap_for_recipes(ctx, rep_connect_address, max_pages, urls_file):
                 print(f"failed to load recipe urls from {urls_file}: {e}")
 
     if not recipe_urls:
-        recipe_urls = client.crawl_sitemap(max_pages=max_pages)
+        # enqueued as the sitemaps are parsed rather than once all are downloaded
+        recipe_urls = client.iter_crawl_sitemap(
+            max_pages=max_pages,
+            incremental=not full,
+            concurrency=concurrency,
+            failures=failures,
+            checkpoints=checkpoints,
+        )
+        if urls_file:
+            recipe_urls = stream_to_json_file(recipe_urls, urls_file)
+
+    jobs = ({"recipe_url": url} for url in recipe_urls)
+    if backend == "redis":
+        queue = RedisQueueManager(connect_to_redis(), RECIPE_QUEUE_REDIS_KEY)
+        count = 0
+        for batch in chunked(jobs, batch_size):
+            queue.add_jobs(RECIPE_QUEUE_REDIS_KEY, batch)
+            checkpoints.confirm(count, len(batch))
+            count += len(batch)
+        print(f" -> enqueued {count} recipes in {RECIPE_QUEUE_REDIS_KEY}")
+        queue.close()
+    else:
+        worker = QueueClient(rep_connect_address)
+        worker.connect()
+
+        result = worker.send_many(
+            jobs, batch_size=batch_size, on_ack=checkpoints.confirm
+        )
+        print(f" -> enqueued {result['count']} recipes")
+        for position in result["rejected"]:
+            print(f" -> rejected recipe #{position}")
+
+        worker.close()
 
-        with urls_file.open("w") as fd:
-            json.dump(recipe_urls, fd)
-            print(f"stored recipe urls in {urls_file}")
+    for shard in failures:
+        print(f" -> failed to crawl {shard.sitemap.url}: {shard.error}")
 
-    count = len(recipe_urls)
-    print(f"found {count} failed recipes")
-    worker = QueueClient(rep_connect_address)
-    worker.connect()
+    for tier, stats in client.cache.stats().items():
+        print(f"http cache {tier}: {stats['hits']} hits, {stats['misses']} misses")
+    print(f"deduplicated {client.single_flight.deduplicated} concurrent requests")
 
-    for i, url in enumerate(recipe_urls, start=1):
-        print(f" -> enqueing recipe {i} of {count} -> {url}")
-        worker.send({"recipe_url": url})
 
-    worker.close()
+def stream_to_json_file(items: Iterable, path: Path) -> Iterator:
+    """yields ``items`` while storing them in ``path`` as a json list,
+    which only replaces an existing file once every item was written"""
+    partial_path = path.with_name(f"{path.name}.partial")
+    with partial_path.open("w") as fd:
+        fd.write("[")
+        for position, item in enumerate(items):
+            if position:
+                fd.write(",")
+            json.dump(item, fd)
+            yield item
+        fd.write("]")
+
+    partial_path.replace(path)
+    print(f"stored recipe urls in {path}")
 
 
 @main.command("web")
@@ -169,6 +325,40 @@ def purge_elasticsearch():
         logger.error(f'failed to purge index "recipes": {e}')
 
 
+@main.command("reindex")
+@click.option("-a", "--all", "reindex_all", is_flag=True, default=False)
+@click.option("-b", "--batch-size", default=config.elasticsearch_bulk_size, type=int)
+def reindex_recipes(reindex_all, batch_size):
+    "indexes recipes updated since the last reindex into elasticsearch"
+    indexer = RecipeIndexer(batch_size=batch_size)
+    if reindex_all:
+        indexer.reconcile(since=(datetime.min, 0))
+    else:
+        indexer.reconcile()
+
+
+@main.command("cache:sweep")
+@click.option(
+    "-b", "--batch-size", default=config.http_cache_sweep_batch_size, type=int
+)
+@click.option("-m", "--max-bytes", default=config.http_cache_max_bytes, type=int)
+@click.option("-i", "--interval", default=config.http_cache_sweep_interval, type=float)
+@click.option("--once", is_flag=True, default=False)
+def sweep_http_cache(batch_size, max_bytes, interval, once):
+    "deletes expired http interactions and keeps the cache within --max-bytes"
+    sweeper = HttpCacheSweeper(
+        batch_size=batch_size, max_bytes=max_bytes, interval=interval
+    )
+    if once:
+        sweeper.sweep()
+        return
+
+    try:
+        sweeper.run()
+    except KeyboardInterrupt:
+        sweeper.stop()
+
+
 @main.command("env")
 @click.option("-d", "--docker", is_flag=True)
 @click.pass_context
@@ -0,0 +1,91 @@
+import gzip
+import io
+import zlib
+from typing import BinaryIO, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# every process can read gzip. zstd decompresses several times faster
+# at a similar ratio but needs the optional "zstandard" package, so the
+# http cache only writes it when configured to (see
+# config.http_cache_body_codec)
+DEFAULT_CODEC = GZIP
+
+
+class UnsupportedCodec(Exception):
+    """raised when a body was compressed with a codec that is not available"""
+
+
+def compress(data: Union[bytes, str, None], codec: str = DEFAULT_CODEC) -> bytes:
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    if codec == IDENTITY:
+        return data
+    if codec == GZIP:
+        return gzip.compress(data, compresslevel=6)
+    if codec == ZSTD and zstandard:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+    raise UnsupportedCodec(codec)
+
+
+def decompress(data: Union[bytes, memoryview, None], codec: str) -> bytes:
+    if data is None:
+        return b""
+
+    if codec in (IDENTITY, None):
+        return bytes(data)
+    if codec == GZIP:
+        return gzip.decompress(data)
+    if codec == ZSTD and zstandard:
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    raise UnsupportedCodec(codec)
+
+
+class IdentityCompressor(object):
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def compressor(codec: str = DEFAULT_CODEC):
+    """returns an object whose ``compress()`` and ``flush()`` compress a
+    body with ``codec`` one chunk at a time, like :py:func:`compress`
+    does at once"""
+    if codec == IDENTITY:
+        return IdentityCompressor()
+    if codec == GZIP:
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if codec == ZSTD and zstandard:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    raise UnsupportedCodec(codec)
+
+
+def open_decompressed(data: Union[bytes, memoryview, None], codec: str) -> BinaryIO:
+    """returns a binary stream that decompresses ``data`` as it is read,
+    rather than decompressing the whole body up front"""
+    if data is None:
+        return io.BytesIO()
+
+    if codec in (IDENTITY, None):
+        return io.BytesIO(data)
+    if codec == GZIP:
+        return gzip.GzipFile(fileobj=io.BytesIO(data))
+    if codec == ZSTD and zstandard:
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data))
+
+    raise UnsupportedCodec(codec)
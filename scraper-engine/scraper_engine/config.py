@@ -1,8 +1,9 @@
 import logging
 import multiprocessing
+import re
 import sys
 from pathlib import Path
-from typing import Dict, Iterator, List
+from typing import Dict, Iterator, List, Pattern, Tuple
 from urllib.parse import urlparse
 
 import redis
@@ -189,6 +190,38 @@ class Config(BaseConfig):
         deserialize=int,
     )
 
+    recipe_write_batch_size = ConfigProperty(
+        "workers",
+        "recipe_write_batch_size",
+        env="SCRAPER_ENGINE_RECIPE_WRITE_BATCH_SIZE",
+        default_value=100,
+        deserialize=int,
+    )
+
+    recipe_write_flush_interval = ConfigProperty(
+        "workers",
+        "recipe_write_flush_interval",
+        env="SCRAPER_ENGINE_RECIPE_WRITE_FLUSH_INTERVAL",
+        default_value=5,
+        deserialize=float,
+    )
+
+    recipe_parser_processes = ConfigProperty(
+        "workers",
+        "recipe_parser_processes",
+        env="SCRAPER_ENGINE_RECIPE_PARSER_PROCESSES",
+        default_value=multiprocessing.cpu_count(),
+        deserialize=int,
+    )
+
+    crawler_sitemap_concurrency = ConfigProperty(
+        "crawler",
+        "sitemap_concurrency",
+        env="SCRAPER_ENGINE_CRAWLER_SITEMAP_CONCURRENCY",
+        default_value=4,
+        deserialize=int,
+    )
+
     drone_api_max_pages = ConfigProperty(
         "drone",
         "api",
@@ -234,6 +267,35 @@ class Config(BaseConfig):
         deserialize=int,
     )
 
+    elasticsearch_bulk_size = ConfigProperty(
+        "elasticsearch",
+        "bulk_size",
+        env="SCRAPER_ENGINE_ELASTICSEARCH_BULK_SIZE",
+        default_value=500,
+        deserialize=int,
+    )
+    elasticsearch_bulk_flush_interval = ConfigProperty(
+        "elasticsearch",
+        "bulk_flush_interval",
+        env="SCRAPER_ENGINE_ELASTICSEARCH_BULK_FLUSH_INTERVAL",
+        default_value=2,
+        deserialize=float,
+    )
+    elasticsearch_bulk_max_pending = ConfigProperty(
+        "elasticsearch",
+        "bulk_max_pending",
+        env="SCRAPER_ENGINE_ELASTICSEARCH_BULK_MAX_PENDING",
+        default_value=10000,
+        deserialize=int,
+    )
+    elasticsearch_bulk_max_retries = ConfigProperty(
+        "elasticsearch",
+        "bulk_max_retries",
+        env="SCRAPER_ENGINE_ELASTICSEARCH_BULK_MAX_RETRIES",
+        default_value=3,
+        deserialize=int,
+    )
+
     elastic_search_logs_index = ConfigProperty(
         "elasticsearch",
         "logs_index",
@@ -274,6 +336,205 @@ class Config(BaseConfig):
         env="SCRAPER_ENGINE_HTTP_CACHE",
         deserialize=parse_bool,
     )
+    http_cache_memory_max_bytes = ConfigProperty(
+        "cache",
+        "http",
+        "memory_max_bytes",
+        env="SCRAPER_ENGINE_HTTP_CACHE_MEMORY_MAX_BYTES",
+        default_value=64 * 1024 * 1024,
+        deserialize=int,
+    )
+    http_cache_redis_enabled = ConfigProperty(
+        "cache",
+        "http",
+        "redis_enabled",
+        env="SCRAPER_ENGINE_HTTP_CACHE_REDIS",
+        deserialize=parse_bool,
+    )
+    http_cache_redis_ttl = ConfigProperty(
+        "cache",
+        "http",
+        "redis_ttl",
+        env="SCRAPER_ENGINE_HTTP_CACHE_REDIS_TTL",
+        default_value=HOUR,
+        deserialize=int,
+    )
+    http_cache_default_ttl = ConfigProperty(
+        "cache",
+        "http",
+        "default_ttl",
+        env="SCRAPER_ENGINE_HTTP_CACHE_DEFAULT_TTL",
+        default_value=DAY,
+        deserialize=int,
+    )
+    http_cache_max_bytes = ConfigProperty(
+        "cache",
+        "http",
+        "max_bytes",
+        env="SCRAPER_ENGINE_HTTP_CACHE_MAX_BYTES",
+        default_value=2 * 1024 * 1024 * 1024,
+        deserialize=int,
+    )
+    http_cache_body_codec = ConfigProperty(
+        "cache",
+        "http",
+        "body_codec",
+        env="SCRAPER_ENGINE_HTTP_CACHE_BODY_CODEC",
+        default_value="gzip",
+    )
+    http_cache_max_stream_bytes = ConfigProperty(
+        "cache",
+        "http",
+        "max_stream_bytes",
+        env="SCRAPER_ENGINE_HTTP_CACHE_MAX_STREAM_BYTES",
+        default_value=32 * 1024 * 1024,
+        deserialize=int,
+    )
+    http_cache_sweep_batch_size = ConfigProperty(
+        "cache",
+        "http",
+        "sweep_batch_size",
+        env="SCRAPER_ENGINE_HTTP_CACHE_SWEEP_BATCH_SIZE",
+        default_value=500,
+        deserialize=int,
+    )
+    http_cache_sweep_interval = ConfigProperty(
+        "cache",
+        "http",
+        "sweep_interval",
+        env="SCRAPER_ENGINE_HTTP_CACHE_SWEEP_INTERVAL",
+        default_value=HOUR,
+        deserialize=float,
+    )
+
+    http_rate_limit_enabled = ConfigProperty(
+        "http",
+        "rate_limit",
+        "enabled",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT",
+        default_value=True,
+        deserialize=parse_bool,
+    )
+    http_rate_limit_redis_enabled = ConfigProperty(
+        "http",
+        "rate_limit",
+        "redis_enabled",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_REDIS",
+        deserialize=parse_bool,
+    )
+    http_rate_limit_initial_rate = ConfigProperty(
+        "http",
+        "rate_limit",
+        "initial_rate",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_INITIAL_RATE",
+        default_value=5,
+        deserialize=float,
+    )
+    http_rate_limit_min_rate = ConfigProperty(
+        "http",
+        "rate_limit",
+        "min_rate",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_MIN_RATE",
+        default_value=0.2,
+        deserialize=float,
+    )
+    http_rate_limit_max_rate = ConfigProperty(
+        "http",
+        "rate_limit",
+        "max_rate",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_MAX_RATE",
+        default_value=50,
+        deserialize=float,
+    )
+    http_rate_limit_burst = ConfigProperty(
+        "http",
+        "rate_limit",
+        "burst",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_BURST",
+        default_value=5,
+        deserialize=int,
+    )
+    http_rate_limit_target_latency = ConfigProperty(
+        "http",
+        "rate_limit",
+        "target_latency",
+        env="SCRAPER_ENGINE_HTTP_RATE_LIMIT_TARGET_LATENCY",
+        default_value=2,
+        deserialize=float,
+    )
+
+    http_retry_connection_attempts = ConfigProperty(
+        "http",
+        "retry",
+        "connection_attempts",
+        env="SCRAPER_ENGINE_HTTP_RETRY_CONNECTION_ATTEMPTS",
+        default_value=5,
+        deserialize=int,
+    )
+    http_retry_server_error_attempts = ConfigProperty(
+        "http",
+        "retry",
+        "server_error_attempts",
+        env="SCRAPER_ENGINE_HTTP_RETRY_SERVER_ERROR_ATTEMPTS",
+        default_value=3,
+        deserialize=int,
+    )
+    http_retry_throttled_attempts = ConfigProperty(
+        "http",
+        "retry",
+        "throttled_attempts",
+        env="SCRAPER_ENGINE_HTTP_RETRY_THROTTLED_ATTEMPTS",
+        default_value=5,
+        deserialize=int,
+    )
+    http_retry_base_delay = ConfigProperty(
+        "http",
+        "retry",
+        "base_delay",
+        env="SCRAPER_ENGINE_HTTP_RETRY_BASE_DELAY",
+        default_value=0.5,
+        deserialize=float,
+    )
+    http_retry_max_delay = ConfigProperty(
+        "http",
+        "retry",
+        "max_delay",
+        env="SCRAPER_ENGINE_HTTP_RETRY_MAX_DELAY",
+        default_value=30,
+        deserialize=float,
+    )
+    http_retry_budget = ConfigProperty(
+        "http",
+        "retry",
+        "budget",
+        env="SCRAPER_ENGINE_HTTP_RETRY_BUDGET",
+        default_value=120,
+        deserialize=float,
+    )
+    http_circuit_breaker_failure_threshold = ConfigProperty(
+        "http",
+        "circuit_breaker",
+        "failure_threshold",
+        env="SCRAPER_ENGINE_HTTP_CIRCUIT_BREAKER_FAILURE_THRESHOLD",
+        default_value=5,
+        deserialize=int,
+    )
+    http_circuit_breaker_reset_timeout = ConfigProperty(
+        "http",
+        "circuit_breaker",
+        "reset_timeout",
+        env="SCRAPER_ENGINE_HTTP_CIRCUIT_BREAKER_RESET_TIMEOUT",
+        default_value=30,
+        deserialize=float,
+    )
+    http_circuit_breaker_probe_timeout = ConfigProperty(
+        "http",
+        "circuit_breaker",
+        "probe_timeout",
+        env="SCRAPER_ENGINE_HTTP_CIRCUIT_BREAKER_PROBE_TIMEOUT",
+        default_value=120,
+        deserialize=float,
+    )
 
     web_client_url = ConfigProperty(
         "web",
@@ -302,6 +563,19 @@ class Config(BaseConfig):
             )
         return users
 
+    @property
+    def http_cache_ttl_overrides(self) -> List[Tuple[Pattern, int]]:
+        """``cache.http.ttl_overrides`` is a list of ``{pattern, ttl}``
+        mappings whose ttl (in seconds) replaces the one announced by
+        the server for every url that matches the regex ``pattern``"""
+        overrides = self.traverse("cache", "http", "ttl_overrides") or []
+        if not isinstance(overrides, list):
+            raise InvalidYamlConfig(
+                f"cache.http.ttl_overrides should be a list but instead got {repr(overrides)}"
+            )
+
+        return [(re.compile(item["pattern"]), int(item["ttl"])) for item in overrides]
+
     @property
     def web_server_host(self):
         return urlparse(self.web_server_url).hostname
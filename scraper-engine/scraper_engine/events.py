@@ -1,10 +1,14 @@
+from typing import TYPE_CHECKING
+
 from blinker import signal
 from humanfriendly.text import pluralize
 from requests import Request, Response
 
 from scraper_engine.logs import get_logger
 from scraper_engine.networking import connect_to_elasticsearch
-from scraper_engine.sites.tudo_gostoso.models import Recipe
+
+if TYPE_CHECKING:  # importing the site package here would be circular
+    from scraper_engine.sites.tudo_gostoso.models import Recipe
 
 es = connect_to_elasticsearch()
 
@@ -29,11 +33,11 @@ def log_cache_hit(cache, request: Request, response: Response):
 
 
 @get_recipes.connect
-def log_get_recipes(client, limit: int, page: int, recipes: Recipe.List.Type):
+def log_get_recipes(client, limit: int, page: int, recipes: "Recipe.List.Type"):
     count = len(recipes)
     logger.debug(f'found {pluralize(count, "recipe")} for page={page} limit={limit}')
 
 
 @get_recipe_info.connect
-def log_get_recipe_info(client, recipe_id: int, recipe: Recipe):
+def log_get_recipe_info(client, recipe_id: int, recipe: "Recipe"):
     logger.debug(f"retrieved recipe {recipe_id} {recipe.link}")
@@ -1,69 +1,229 @@
-import hashlib
 import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, List, Optional, Union
 
+import redis
 import requests
 
 from scraper_engine import events
+from scraper_engine.config import config
+from scraper_engine.http.freshness import get_expiry
+from scraper_engine.logs import get_logger
+from scraper_engine.networking import connect_to_redis
 from scraper_engine.sql import HttpInteraction
+from scraper_engine.util import generate_cache_key
 
+HTTP_CACHE_REDIS_PREFIX = "cook-my-list:http-cache"
 
-def hash_dict(data: dict, algo: callable) -> str:
-    parts = list(filter(sorted(data.items(), lambda args: args[0]), bool))
-    if not parts:
-        return ""
-    result = algo()
-    for k, v in parts:
-        result.update(f"{key}={value}")
-
-    return result.hexdigest()
-
-
-def generate_cache_key(
-    url: str,
-    method: str,
-    json_body: str = None,
-    params: dict = None,
-    headers: dict = None,
-    algo=hashlib.sha1,
-):
-    params = hash_dict(params or {}, algo)
-    headers = hash_dict(headers or {}, algo)
-    json_body = hash_dict(json_body or {}, algo)
-
-    parts = [
-        f"{key}={value}"
-        for key, value in filter(
-            [
-                algo(method).hexdigest(),
-                algo(url).hexdigest(),
-                headers,
-                params,
-                json_body,
-            ],
-            bool,
+logger = get_logger(__name__)
+
+
+class CacheTierStats(object):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class MemoryCacheTier(object):
+    """in-process LRU of interactions, bounded by the approximate
+    number of bytes they hold rather than by the number of entries"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = config.http_cache_memory_max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = CacheTierStats()
+
+    @staticmethod
+    def sizeof(interaction: HttpInteraction) -> int:
+        return sum(
+            len(interaction.get(name) or b"")
+            for name in (
+                "request_url",
+                "request_headers",
+                "response_headers",
+                "response_body",
+            )
         )
-    ]
 
-    return ".".join(parts)
+    def get(self, key: str) -> Optional[HttpInteraction]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(self, key: str, interaction: HttpInteraction):
+        size = self.sizeof(interaction)
+        with self.lock:
+            self.discard(key)
+            if size > self.max_bytes:
+                return
+
+            self.entries[key] = (interaction, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def discard(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class RedisCacheTier(object):
+    """interactions shared between processes through redis, each entry
+    expires after ``ttl`` seconds.
+
+    Redis errors are logged and treated as misses so that an
+    unavailable redis never prevents fetching pages.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        connection: Optional[redis.StrictRedis] = None,
+        ttl: int = config.http_cache_redis_ttl,
+        prefix: str = HTTP_CACHE_REDIS_PREFIX,
+    ):
+        self.connection = connection or connect_to_redis(verbose=False)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheTierStats()
+
+    def redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Optional[HttpInteraction]:
+        try:
+            data, body = self.connection.hmget(self.redis_key(key), "data", "body")
+        except redis.RedisError as e:
+            logger.warning(f"failed to read {key!r} from the redis http cache: {e}")
+            data = None
+
+        if not data:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return HttpInteraction(response_body=body, **json.loads(data))
+
+    def set(self, key: str, interaction: HttpInteraction):
+        data = interaction.to_dict()
+        data.pop("response_body", None)
+        name = self.redis_key(key)
+        try:
+            pipeline = self.connection.pipeline()
+            pipeline.hset(
+                name,
+                mapping={
+                    "data": json.dumps(data),
+                    "body": bytes(interaction.get("response_body") or b""),
+                },
+            )
+            pipeline.expire(name, self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"failed to store {key!r} in the redis http cache: {e}")
+
+
+def get_default_cache_tiers() -> list:
+    tiers = [MemoryCacheTier()]
+    if config.http_cache_redis_enabled:
+        tiers.append(RedisCacheTier())
+    return tiers
 
 
 class DummyCache(object):
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
     def get(self, request: requests.Request) -> Optional[HttpInteraction]:
         return None
 
-    def get_by_url_and_method(self, url: str, method: str) -> Optional[HttpInteraction]:
+    def get_by_url_and_method(
+        self, url: str, method: str, params: dict = None, headers: dict = None
+    ) -> Optional[HttpInteraction]:
+        return None
+
+    def get_by_cache_key(self, cache_key: str) -> Optional[HttpInteraction]:
         return None
 
     def set(
-        self, request: requests.Request, response: requests.Response
+        self,
+        request: requests.Request,
+        response: requests.Response,
+        cache_key: str = None,
+        compressed_body: bytes = None,
     ) -> Optional[HttpInteraction]:
         return
 
+    def revalidated(
+        self, interaction: HttpInteraction, response: requests.Response = None
+    ) -> HttpInteraction:
+        return interaction
+
 
 class HttpCache(object):
+    """looks up interactions in each of its ``tiers`` in order before
+    falling back to postgres, which remains the authoritative store.
+    Hits in a lower tier are copied into the tiers above it.
+
+    Postgres is only reached through :py:meth:`load`, :py:meth:`save`
+    and :py:meth:`touch`.
+    """
+
+    def __init__(self, tiers: Optional[list] = None):
+        self.tiers = get_default_cache_tiers() if tiers is None else tiers
+        self.database_stats = CacheTierStats()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        result = {tier.name: tier.stats.to_dict() for tier in self.tiers}
+        result["postgres"] = self.database_stats.to_dict()
+        return result
+
+    def load(self, cache_key: str) -> Optional[HttpInteraction]:
+        return HttpInteraction.get_by_cache_key(cache_key)
+
+    def save(
+        self,
+        request: requests.Request,
+        response: requests.Response,
+        cache_key: str = None,
+        expires_at: datetime = None,
+        compressed_body: bytes = None,
+    ) -> HttpInteraction:
+        return HttpInteraction.upsert(
+            request,
+            response,
+            cache_key=cache_key,
+            expires_at=expires_at,
+            compressed_body=compressed_body,
+        )
+
+    def touch(self, interaction: HttpInteraction, expires_at: datetime = None):
+        interaction.touch(expires_at=expires_at)
+
+    def store(self, interaction: HttpInteraction, tiers: Optional[list] = None):
+        for tier in self.tiers if tiers is None else tiers:
+            tier.set(interaction.cache_key, interaction)
+
     def get(self, request: requests.Request) -> Optional[HttpInteraction]:
-        found = HttpInteraction.get_by_requests_request(request)
+        found = self.get_by_cache_key(HttpInteraction.cache_key_for_request(request))
         if found:
             events.http_cache_hit.send(
                 self, request=found.request(), response=found.response()
@@ -71,18 +231,74 @@ class HttpCache(object):
 
         return found
 
-    def get_by_url_and_method(self, url: str, method: str) -> Optional[HttpInteraction]:
-        return HttpInteraction.get_by_url_and_method(url=url, method=method)
+    def get_by_url_and_method(
+        self, url: str, method: str, params: dict = None, headers: dict = None
+    ) -> Optional[HttpInteraction]:
+        return self.get_by_cache_key(
+            generate_cache_key(url, method, params=params, headers=headers)
+        )
+
+    def get_by_cache_key(self, cache_key: str) -> Optional[HttpInteraction]:
+        for position, tier in enumerate(self.tiers):
+            found = tier.get(cache_key)
+            if found:
+                self.store(found, self.tiers[:position])
+                return found
+
+        found = self.load(cache_key)
+        if not found:
+            self.database_stats.misses += 1
+            return None
+
+        self.database_stats.hits += 1
+        self.store(found)
+        return found
 
     def set(
-        self, request: requests.Request, response: requests.Response
+        self,
+        request: requests.Request,
+        response: requests.Response,
+        cache_key: str = None,
+        compressed_body: bytes = None,
     ) -> Optional[HttpInteraction]:
+        """stores ``response`` unless it must not be cached.
+
+        ``compressed_body`` is the body already compressed with
+        ``config.http_cache_body_codec``, for responses whose content
+        was streamed.
+        """
         if request.method != "GET":
             return
 
-        interaction = HttpInteraction.upsert(request, response)
+        expires_at = get_expiry(request.url, response.headers)
+        if expires_at is None:
+            # Cache-Control: no-store
+            return
+
+        interaction = self.save(
+            request,
+            response,
+            cache_key=cache_key,
+            expires_at=expires_at,
+            compressed_body=compressed_body,
+        )
+        self.store(interaction)
+        # the stored body is not decompressed again just to be logged
         events.http_cache_miss.send(
-            self, request=interaction.request(), response=interaction.response()
+            self, request=interaction.request(), response=response
         )
 
         return interaction
+
+    def revalidated(
+        self, interaction: HttpInteraction, response: requests.Response = None
+    ) -> HttpInteraction:
+        """called when the server answered 304 Not Modified to a
+        conditional request for a cached interaction"""
+        headers = response.headers if response is not None else {}
+        self.touch(interaction, get_expiry(interaction.request_url, headers))
+        self.store(interaction)
+        events.http_cache_hit.send(
+            self, request=interaction.request(), response=response
+        )
+        return interaction
@@ -1,27 +1,69 @@
+import asyncio
+import functools
 import logging
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
 from urllib.parse import urljoin
 
-from requests import Response, Session
+import aiohttp
+from requests import Request, Response, Session
+from requests.structures import CaseInsensitiveDict
 
-from scraper_engine import events
+from scraper_engine import compression, events
+from scraper_engine.config import config
 from scraper_engine.http.cache import DummyCache, HttpCache
 from scraper_engine.http.exceptions import ClientError, invalid_response
+from scraper_engine.http.ratelimit import get_default_rate_limiters, parse_retry_after
+from scraper_engine.http.retry import (
+    CONNECTION_ERRORS,
+    THROTTLED,
+    RetryPolicies,
+    classify,
+    default_circuit_breakers,
+)
+from scraper_engine.http.singleflight import (
+    AsyncSingleFlight,
+    SingleFlight,
+    get_loop_single_flight,
+)
 from scraper_engine.logs import get_logger
+from scraper_engine.util import detect_encoding, generate_cache_key, run_in_thread
 from scraper_engine.version import version
 
 logger = get_logger(__name__)
 
+# shared by the sync clients of every thread of the process
+default_single_flight = SingleFlight()
+
+
+def get_default_cache():
+    if config.http_cache_enabled:
+        return HttpCache()
+
+    return DummyCache()
+
 
 class HttpClient(object):
-    def __init__(self, user_agent: str = "AdsBot-Google"):
+    def __init__(
+        self,
+        user_agent: str = "AdsBot-Google",
+        cache=None,
+        rate_limiters=None,
+        retry_policies=None,
+        circuit_breakers=None,
+    ):
         self.http = Session()
         self.user_agent = user_agent
         self.http.headers = {
             "User-Agent": user_agent,
         }
-        self.cache = DummyCache()
+        self.cache = cache or get_default_cache()
+        self.rate_limiters = rate_limiters or get_default_rate_limiters()
+        self.retry_policies = retry_policies or RetryPolicies()
+        self.circuit_breakers = circuit_breakers or default_circuit_breakers
+        self.single_flight = default_single_flight
 
     def request(
         self,
@@ -33,26 +75,381 @@ class HttpClient(object):
         **kwargs,
     ):
         headers = headers or {}
-        if not skip_cache:
-            interaction = self.cache.get_by_url_and_method(method=method, url=url)
-            if interaction and interaction.response:
-                return interaction.response()
+        cache_key = generate_cache_key(
+            url, method, params=kwargs.get("params"), headers=headers
+        )
+        fetch = functools.partial(
+            self.fetch, method, url, cache_key, data, headers, skip_cache, **kwargs
+        )
+        if method.upper() != "GET":
+            return fetch()
+
+        # concurrent identical GETs share one network request and cache write
+        return self.single_flight.do(f"{cache_key}:{skip_cache}", fetch)
+
+    def fetch(
+        self,
+        method: str,
+        url: str,
+        cache_key: str,
+        data=None,
+        headers=None,
+        skip_cache: bool = False,
+        **kwargs,
+    ) -> Response:
+        interaction = self.cache.get_by_cache_key(cache_key)
+        if interaction and interaction.is_fresh() and not skip_cache:
+            return interaction.response()
+
+        if interaction:
+            # refresh: let the server tell whether the stored copy is current
+            headers = dict(interaction.conditional_headers(), **headers)
+
+        response = self.send(method, url, data=data, headers=headers, **kwargs)
+        if response.status_code == 304 and interaction:
+            return self.cache.revalidated(interaction, response).response()
 
-        response = self.http.request(method, url, data=data, headers=headers, **kwargs)
         if response.status_code != 200:
             raise invalid_response(response)
 
-        if skip_cache:
-            return response
+        self.cache.set(response.request, response, cache_key=cache_key)
+        # returned as received rather than decompressed back from the cache
+        response.encoding = detect_encoding(response.headers, response.content)
+        return response
+
+    def send(self, method: str, url: str, **kwargs) -> Response:
+        """sends the request through the rate limiter and circuit
+        breaker of its host, retrying failed attempts according to
+        ``self.retry_policies``"""
+        limiter = self.rate_limiters.get(url)
+        breaker = self.circuit_breakers.get(url)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            probe = breaker.before_request()
+            try:
+                response, error = self.attempt(limiter, method, url, **kwargs)
+            except Exception:
+                breaker.record(failed=True)
+                raise
+            except BaseException:
+                # interrupted before the outcome was known
+                breaker.release(probe)
+                raise
+
+            failure = classify(response, error)
+            breaker.record(failed=failure is not None and failure != THROTTLED)
+            delay = self.retry_policies.get_delay(
+                attempt, time.monotonic() - started, response=response, error=error
+            )
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            logger.warning(
+                f"retrying {method} {url} in {delay:.2f}s after attempt {attempt + 1} "
+                f"failed: {error or response.status_code}"
+            )
+            if response is not None:
+                # releases the connection of streamed responses
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def attempt(self, limiter, method: str, url: str, **kwargs):
+        """sends a single attempt once ``limiter`` allows it and returns
+        its response, or the connection error it failed with"""
+        wait = limiter.reserve()
+        if wait > 0:
+            time.sleep(wait)
 
-        interaction = self.cache.set(response.request, response)
-        if not interaction:
-            return response
+        sent_at = time.monotonic()
+        try:
+            response = self.http.request(method, url, **kwargs)
+        except CONNECTION_ERRORS as e:
+            return None, e
 
-        return interaction.response()
+        limiter.feedback(
+            response.status_code,
+            time.monotonic() - sent_at,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+        return response, None
+
+    @contextmanager
+    def open(self, url: str, headers=None) -> Iterator[BinaryIO]:
+        """opens the body of a GET request as a binary stream, for callers
+        that parse it incrementally.
+
+        The body comes from the cache while it is fresh. Otherwise it is
+        streamed from the network, revalidating the cached copy if there
+        is one, and stored in the cache once it was read to the end.
+        Bodies are compressed as they are read and decompressed as they
+        are read back, so neither is ever held in memory in full.
+        """
+        headers = headers or {}
+        cache_key = generate_cache_key(url, "GET", headers=headers)
+        interaction = self.cache.get_by_cache_key(cache_key)
+        if interaction and interaction.is_fresh():
+            yield interaction.response_stream()
+            return
+
+        if interaction:
+            headers = dict(interaction.conditional_headers(), **headers)
+
+        response = self.send("GET", url, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and interaction:
+                interaction = self.cache.revalidated(interaction, response)
+                yield interaction.response_stream()
+                return
+
+            if response.status_code != 200:
+                raise invalid_response(response)
+
+            response.raw.decode_content = True
+            body = TeeReader(response.raw)
+            yield body
+            if body.complete:
+                self.cache.set(
+                    response.request,
+                    response,
+                    cache_key=cache_key,
+                    compressed_body=body.getvalue(),
+                )
+        finally:
+            response.close()
 
     def close(self):
         self.http.close()
 
     def __del__(self):
         self.close()
+
+
+class TeeReader(object):
+    """binary stream that keeps a compressed copy of everything read
+    from ``source``.
+
+    The copy is given up once it grows past ``max_bytes``, in which case
+    the stream is never ``complete``.
+    """
+
+    def __init__(
+        self, source: BinaryIO, max_bytes: int = config.http_cache_max_stream_bytes
+    ):
+        self.source = source
+        # the codec that the cache stores bodies with
+        self.compressor = compression.compressor(config.http_cache_body_codec)
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+        self.complete = False
+
+    def keep(self, compressed: bytes):
+        self.chunks.append(compressed)
+        self.size += len(compressed)
+        if self.size > self.max_bytes:
+            self.chunks = None
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if self.chunks is None or self.complete:
+            return data
+
+        if data:
+            self.keep(self.compressor.compress(data))
+        # reading without a size reads up to the end
+        at_end = size is None or size < 0 or (size != 0 and not data)
+        if at_end and self.chunks is not None:
+            self.keep(self.compressor.flush())
+            self.complete = self.chunks is not None
+        return data
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.chunks or [])
+
+
+class AsyncHttpClient(object):
+    """asyncio counterpart of :py:class:`HttpClient`.
+
+    ``request()`` takes the same arguments, honors the same cache and
+    returns :py:class:`requests.Response` objects, so that scrapers
+    work unchanged regardless of which client fetched the page.
+    """
+
+    def __init__(
+        self,
+        user_agent: str = "AdsBot-Google",
+        max_connections: int = 100,
+        cache=None,
+        rate_limiters=None,
+        retry_policies=None,
+        circuit_breakers=None,
+    ):
+        self.http = None
+        self.user_agent = user_agent
+        self.max_connections = max_connections
+        self.headers = {
+            "User-Agent": user_agent,
+        }
+        self.cache = cache or get_default_cache()
+        self.rate_limiters = rate_limiters or get_default_rate_limiters()
+        self.retry_policies = retry_policies or RetryPolicies()
+        self.circuit_breakers = circuit_breakers or default_circuit_breakers
+
+    @property
+    def single_flight(self) -> AsyncSingleFlight:
+        # shared with the other clients of the running event loop
+        return get_loop_single_flight()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # the session must be created from within a running event loop
+        if self.http is None or self.http.closed:
+            self.http = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+            )
+        return self.http
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        headers=None,
+        skip_cache: bool = False,
+        **kwargs,
+    ) -> Response:
+        headers = headers or {}
+        cache_key = generate_cache_key(
+            url, method, params=kwargs.get("params"), headers=headers
+        )
+        fetch = functools.partial(
+            self.fetch, method, url, cache_key, data, headers, skip_cache, **kwargs
+        )
+        if method.upper() != "GET":
+            return await fetch()
+
+        return await self.single_flight.do(f"{cache_key}:{skip_cache}", fetch)
+
+    async def fetch(
+        self,
+        method: str,
+        url: str,
+        cache_key: str,
+        data=None,
+        headers=None,
+        skip_cache: bool = False,
+        **kwargs,
+    ) -> Response:
+        interaction = await run_in_thread(self.cache.get_by_cache_key, cache_key)
+        if interaction and interaction.is_fresh() and not skip_cache:
+            return interaction.response()
+
+        if interaction:
+            headers = dict(interaction.conditional_headers(), **headers)
+
+        response = await self.send(method, url, data=data, headers=headers, **kwargs)
+        if response.status_code == 304 and interaction:
+            interaction = await run_in_thread(
+                self.cache.revalidated, interaction, response
+            )
+            return interaction.response()
+
+        if response.status_code != 200:
+            raise invalid_response(response)
+
+        # returned as received rather than decompressed back from the cache
+        await run_in_thread(
+            self.cache.set, response.request, response, cache_key=cache_key
+        )
+        return response
+
+    async def send(self, method: str, url: str, data=None, **kwargs) -> Response:
+        """asyncio counterpart of :py:meth:`HttpClient.send`"""
+        limiter = self.rate_limiters.get(url)
+        breaker = self.circuit_breakers.get(url)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            probe = breaker.before_request()
+            try:
+                response, error = await self.attempt(
+                    limiter, method, url, data=data, **kwargs
+                )
+            except Exception:
+                breaker.record(failed=True)
+                raise
+            except BaseException:
+                # e.g. asyncio.CancelledError, the outcome is unknown
+                breaker.release(probe)
+                raise
+
+            failure = classify(response, error)
+            breaker.record(failed=failure is not None and failure != THROTTLED)
+            delay = self.retry_policies.get_delay(
+                attempt, time.monotonic() - started, response=response, error=error
+            )
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            logger.warning(
+                f"retrying {method} {url} in {delay:.2f}s after attempt {attempt + 1} "
+                f"failed: {error or response.status_code}"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def attempt(self, limiter, method: str, url: str, data=None, **kwargs):
+        """asyncio counterpart of :py:meth:`HttpClient.attempt`"""
+        wait = await run_in_thread(limiter.reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        sent_at = time.monotonic()
+        try:
+            http = self.get_session()
+            async with http.request(method, url, data=data, **kwargs) as res:
+                body = await res.read()
+                response = to_requests_response(res, body, data=data)
+        except CONNECTION_ERRORS as e:
+            return None, e
+
+        await run_in_thread(
+            limiter.feedback,
+            response.status_code,
+            time.monotonic() - sent_at,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+        return response, None
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.close()
+
+
+def to_requests_response(
+    res: aiohttp.ClientResponse, body: bytes, data=None
+) -> Response:
+    """converts an :py:class:`aiohttp.ClientResponse` whose body has
+    already been read into a :py:class:`requests.Response`"""
+    request = Request(
+        method=res.method,
+        url=str(res.url),
+        headers=dict(res.request_info.headers),
+        data=data,
+    ).prepare()
+
+    response = Response()
+    response.status_code = res.status
+    response.reason = res.reason
+    response.url = str(res.url)
+    response.headers = CaseInsensitiveDict(res.headers)
+    response.encoding = detect_encoding(response.headers, body)
+    response.request = request
+    response._content = body
+    return response
@@ -13,6 +13,15 @@ class ElementNotFound(ScraperException):
     """raised when no element was found for a given css selector"""
 
 
+class CircuitOpen(Exception):
+    """raised without sending the request while a host keeps failing"""
+
+    def __init__(self, host: str, retry_in: float):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"{host} is unavailable, retrying in {retry_in:.1f}s")
+
+
 class ClientError(Exception):
     def __init__(self, response: Response, message: str):
         self.response = response
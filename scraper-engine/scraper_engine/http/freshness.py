@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from scraper_engine.config import config
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """parses a ``Cache-Control`` header into a dict of lowercase
+    directives, e.g. ``{"max-age": "300", "public": None}``"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    return parsed
+
+
+def get_ttl_override(url: str) -> Optional[int]:
+    for pattern, ttl in config.http_cache_ttl_overrides:
+        if pattern.search(url):
+            return ttl
+    return None
+
+
+def get_ttl(url: str, headers: Mapping[str, str]) -> Optional[int]:
+    """returns for how many seconds a response can be served from the
+    cache, or ``None`` if it must not be stored at all.
+
+    Per-url overrides from the config win, then ``Cache-Control:
+    no-store``, ``s-maxage``/``max-age`` and ``Expires``, and lastly
+    ``cache.http.default_ttl``.
+    """
+    override = get_ttl_override(url)
+    if override is not None:
+        return override
+
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        # may be stored, but must be revalidated before every use
+        return 0
+
+    for name in ("s-maxage", "max-age"):
+        try:
+            return max(0, int(directives[name]))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    if headers.get("Expires") is not None:
+        expires = parse_http_date(headers.get("Expires"))
+        if expires is None:
+            # invalid dates such as "0" mean already expired
+            return 0
+
+        date = parse_http_date(headers.get("Date")) or datetime.utcnow()
+        return max(0, int((expires - date).total_seconds()))
+
+    return config.http_cache_default_ttl
+
+
+def get_expiry(
+    url: str, headers: Mapping[str, str], now: Optional[datetime] = None
+) -> Optional[datetime]:
+    ttl = get_ttl(url, headers)
+    if ttl is None:
+        return None
+
+    return (now or datetime.utcnow()) + timedelta(seconds=ttl)
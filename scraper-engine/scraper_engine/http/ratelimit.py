@@ -0,0 +1,250 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import redis
+
+from scraper_engine.config import config
+from scraper_engine.http.freshness import parse_http_date
+from scraper_engine.logs import get_logger
+from scraper_engine.networking import connect_to_redis
+
+HTTP_RATE_LIMIT_REDIS_PREFIX = "cook-my-list:http-rate-limit"
+
+# status codes that mean the server wants us to slow down
+THROTTLING_STATUS_CODES = (429, 502, 503, 504)
+
+logger = get_logger(__name__)
+
+RESERVE_SCRIPT = """
+local bucket = KEYS[1]
+local now, default_rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local burst, ttl = tonumber(ARGV[3]), tonumber(ARGV[4])
+
+local rate = tonumber(redis.call("HGET", bucket, "rate")) or default_rate
+local tokens = tonumber(redis.call("HGET", bucket, "tokens")) or burst
+local updated = tonumber(redis.call("HGET", bucket, "updated")) or now
+local blocked_until = tonumber(redis.call("HGET", bucket, "blocked_until")) or 0
+
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate) - 1
+local wait = math.max(0, blocked_until - now)
+if tokens < 0 then
+    wait = math.max(wait, -tokens / rate)
+end
+
+redis.call("HSET", bucket, "rate", rate, "tokens", tokens, "updated", now)
+redis.call("EXPIRE", bucket, ttl)
+return tostring(wait)
+"""
+
+FEEDBACK_SCRIPT = """
+local bucket = KEYS[1]
+local now, default_rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local min_rate, max_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+local congested, retry_after = ARGV[5] == "1", tonumber(ARGV[6])
+local ttl = tonumber(ARGV[7])
+
+local rate = tonumber(redis.call("HGET", bucket, "rate")) or default_rate
+if congested then
+    rate = math.max(min_rate, rate / 2)
+else
+    rate = math.min(max_rate, rate + 1 / rate)
+end
+redis.call("HSET", bucket, "rate", rate)
+
+if retry_after > 0 then
+    local blocked_until = tonumber(redis.call("HGET", bucket, "blocked_until")) or 0
+    redis.call("HSET", bucket, "blocked_until", math.max(blocked_until, now + retry_after))
+    redis.call("HSET", bucket, "tokens", 0)
+end
+redis.call("EXPIRE", bucket, ttl)
+return tostring(rate)
+"""
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> float:
+    """returns how many seconds a ``Retry-After`` header asks to wait"""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    date = parse_http_date(value)
+    if date is None:
+        return 0.0
+
+    now = time.time() if now is None else now
+    return max(0.0, date.timestamp() - now)
+
+
+def get_host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class HostRateLimiter(object):
+    """token bucket for the requests sent to a single host.
+
+    The rate grows additively by roughly one request per second for
+    each second without trouble, and is halved whenever the host
+    answers with a throttling status code or responds slower than
+    ``target_latency``. ``Retry-After`` pauses the host altogether.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = config.http_rate_limit_initial_rate,
+        min_rate: float = config.http_rate_limit_min_rate,
+        max_rate: float = config.http_rate_limit_max_rate,
+        burst: int = config.http_rate_limit_burst,
+        target_latency: float = config.http_rate_limit_target_latency,
+    ):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.target_latency = target_latency
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def is_congested(self, status_code: int, latency: float) -> bool:
+        return status_code in THROTTLING_STATUS_CODES or latency > self.target_latency
+
+    def reserve(self) -> float:
+        """takes one token and returns how many seconds the caller must
+        wait before sending its request"""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self.updated)
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate) - 1
+            self.updated = now
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def feedback(self, status_code: int, latency: float, retry_after: float = 0):
+        with self.lock:
+            if self.is_congested(status_code, latency):
+                self.rate = max(self.min_rate, self.rate / 2)
+            else:
+                self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+            if retry_after > 0:
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+                self.tokens = min(self.tokens, 0.0)
+
+        if retry_after > 0 or status_code in THROTTLING_STATUS_CODES:
+            logger.warning(
+                f"{self.host} answered {status_code}, "
+                f"slowing down to {self.rate:.2f} requests/second"
+            )
+
+
+class RedisHostRateLimiter(HostRateLimiter):
+    """:py:class:`HostRateLimiter` whose bucket lives in redis, so that
+    every process scraping the same host shares one rate"""
+
+    def __init__(self, host: str, connection: redis.StrictRedis, ttl: int = 3600, **kw):
+        super().__init__(host, **kw)
+        self.connection = connection
+        self.ttl = ttl
+        self.key = f"{HTTP_RATE_LIMIT_REDIS_PREFIX}:{host}"
+        self.reserve_script = connection.register_script(RESERVE_SCRIPT)
+        self.feedback_script = connection.register_script(FEEDBACK_SCRIPT)
+
+    def reserve(self) -> float:
+        try:
+            return float(
+                self.reserve_script(
+                    keys=[self.key], args=[time.time(), self.rate, self.burst, self.ttl]
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning(f"failed to reserve {self.key} in redis: {e}")
+            return super().reserve()
+
+    def feedback(self, status_code: int, latency: float, retry_after: float = 0):
+        congested = self.is_congested(status_code, latency)
+        try:
+            self.rate = float(
+                self.feedback_script(
+                    keys=[self.key],
+                    args=[
+                        time.time(),
+                        self.rate,
+                        self.min_rate,
+                        self.max_rate,
+                        int(congested),
+                        retry_after,
+                        self.ttl,
+                    ],
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning(f"failed to update {self.key} in redis: {e}")
+            super().feedback(status_code, latency, retry_after)
+
+
+class RateLimiterRegistry(object):
+    """hands out one limiter per host, shared by every client and
+    coroutine of the process"""
+
+    def __init__(self, connection: Optional[redis.StrictRedis] = None, **options):
+        self.connection = connection
+        self.options = options
+        self.limiters: Dict[str, HostRateLimiter] = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str) -> HostRateLimiter:
+        host = get_host(url)
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = self.limiters[host] = self.create(host)
+            return limiter
+
+    def create(self, host: str) -> HostRateLimiter:
+        if self.connection is not None:
+            return RedisHostRateLimiter(host, self.connection, **self.options)
+        return HostRateLimiter(host, **self.options)
+
+
+class NoRateLimit(object):
+    def reserve(self) -> float:
+        return 0.0
+
+    def feedback(self, status_code: int, latency: float, retry_after: float = 0):
+        pass
+
+
+class DisabledRateLimiterRegistry(object):
+    def get(self, url: str) -> NoRateLimit:
+        return NoRateLimit()
+
+
+default_registry = None
+default_registry_lock = threading.Lock()
+
+
+def get_default_rate_limiters():
+    global default_registry
+    if not config.http_rate_limit_enabled:
+        return DisabledRateLimiterRegistry()
+
+    with default_registry_lock:
+        if default_registry is None:
+            connection = None
+            if config.http_rate_limit_redis_enabled:
+                connection = connect_to_redis(verbose=False)
+            default_registry = RateLimiterRegistry(connection)
+        return default_registry
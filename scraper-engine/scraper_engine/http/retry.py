@@ -0,0 +1,213 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import aiohttp
+import requests
+
+from scraper_engine.config import config
+from scraper_engine.http.exceptions import APIException, CircuitOpen
+from scraper_engine.http.ratelimit import get_host, parse_retry_after
+from scraper_engine.logs import get_logger
+
+CONNECTION_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+)
+
+CONNECTION = "connection"
+THROTTLED = "throttled"
+SERVER_ERROR = "server_error"
+
+logger = get_logger(__name__)
+
+
+def classify(
+    response: Optional[requests.Response] = None, error: Optional[Exception] = None
+) -> Optional[str]:
+    """returns the error class of a failed attempt, or ``None`` when it
+    should not be retried"""
+    if isinstance(error, CONNECTION_ERRORS):
+        return CONNECTION
+    if error is not None or response is None:
+        return None
+    if response.status_code == 429:
+        return THROTTLED
+    if response.status_code == 503 and response.headers.get("Retry-After"):
+        return THROTTLED
+    if response.status_code >= 500:
+        return SERVER_ERROR
+    return None
+
+
+def is_transient(error: Exception) -> bool:
+    """whether a request that failed with ``error`` may succeed later"""
+    if isinstance(error, (CircuitOpen,) + CONNECTION_ERRORS):
+        return True
+    if isinstance(error, APIException):
+        return classify(response=error.response) is not None
+    return False
+
+
+class RetryPolicy(object):
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float = config.http_retry_base_delay,
+        max_delay: float = config.http_retry_max_delay,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class RetryPolicies(object):
+    """decides whether and when a failed attempt is retried, according
+    to the policy of its error class and to the total ``budget`` in
+    seconds that a request may spend across all of its attempts"""
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, RetryPolicy]] = None,
+        budget: float = config.http_retry_budget,
+    ):
+        self.policies = policies or {
+            CONNECTION: RetryPolicy(config.http_retry_connection_attempts),
+            THROTTLED: RetryPolicy(config.http_retry_throttled_attempts),
+            SERVER_ERROR: RetryPolicy(config.http_retry_server_error_attempts),
+        }
+        self.budget = budget
+
+    def get_delay(
+        self,
+        attempt: int,
+        elapsed: float,
+        response: Optional[requests.Response] = None,
+        error: Optional[Exception] = None,
+    ) -> Optional[float]:
+        """returns how long to wait before the next attempt, or ``None``
+        if the request should fail now. ``attempt`` starts at 0."""
+        policy = self.policies.get(classify(response, error))
+        if policy is None or attempt + 1 >= policy.max_attempts:
+            return None
+
+        delay = policy.backoff(attempt)
+        if response is not None:
+            delay = max(delay, parse_retry_after(response.headers.get("Retry-After")))
+
+        if elapsed + delay > self.budget:
+            return None
+        return delay
+
+
+class CircuitBreaker(object):
+    """stops sending requests to a host after ``failure_threshold``
+    consecutive failures. Once ``reset_timeout`` seconds have passed a
+    single probe request is let through (half-open): its success closes
+    the circuit, its failure opens it again. A probe that neither
+    succeeds nor fails within ``probe_timeout`` seconds, or that is
+    released, is replaced by the next request."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = config.http_circuit_breaker_failure_threshold,
+        reset_timeout: float = config.http_circuit_breaker_reset_timeout,
+        probe_timeout: float = config.http_circuit_breaker_probe_timeout,
+    ):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = None
+        self.lock = threading.Lock()
+
+    def before_request(self) -> bool:
+        """raises :py:class:`CircuitOpen` unless a request may be sent,
+        returns whether the request is the half-open probe"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                retry_in = self.opened_at + self.reset_timeout - now
+                if retry_in <= 0:
+                    self.state = self.HALF_OPEN
+                    self.probe_started_at = now
+                    logger.info(f"probing {self.host}")
+                    return True
+            elif self.probe_started_at is None:
+                self.probe_started_at = now
+                logger.info(f"probing {self.host} again")
+                return True
+            else:
+                retry_in = self.probe_started_at + self.probe_timeout - now
+                if retry_in <= 0:
+                    self.probe_started_at = now
+                    logger.warning(f"probe of {self.host} timed out, probing again")
+                    return True
+
+            raise CircuitOpen(self.host, max(0.0, retry_in))
+
+    def record(self, failed: bool):
+        with self.lock:
+            self.probe_started_at = None
+            if not failed:
+                if self.state != self.CLOSED:
+                    logger.info(f"{self.host} recovered")
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"{self.host} failed {self.failures} times, "
+                        f"failing fast for {self.reset_timeout}s"
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self, probe: bool):
+        """called when an attempt ends without an outcome, e.g. because
+        it was cancelled, so that the next request can probe the host"""
+        with self.lock:
+            if probe and self.state == self.HALF_OPEN:
+                self.probe_started_at = None
+
+
+class CircuitBreakerRegistry(object):
+    def __init__(self, **options):
+        self.options = options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        host = get_host(url)
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(host, **self.options)
+            return breaker
+
+
+default_circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+
+class Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight(object):
+    """runs at most one call per key at a time: threads asking for a key
+    that is already in flight wait for that call and share its outcome.
+
+    ``deduplicated`` counts the calls that were spared this way.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, Call] = {}
+        self.lock = threading.Lock()
+        self.deduplicated = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.deduplicated += 1
+                follower = True
+            else:
+                call = self.calls[key] = Call()
+                follower = False
+
+        if follower:
+            return call.wait()
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class AsyncSingleFlight(object):
+    """asyncio counterpart of :py:class:`SingleFlight`, for the
+    coroutines of a single event loop"""
+
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Future] = {}
+        self.deduplicated = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.calls.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            # a cancelled follower must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = self.calls[key] = asyncio.ensure_future(func())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                del self.calls[key]
+            else:
+                future.add_done_callback(lambda _: self.calls.pop(key, None))
+
+
+# futures are bound to their event loop, so coroutines share one
+# AsyncSingleFlight per loop rather than one per process
+loop_single_flights = weakref.WeakKeyDictionary()
+
+
+def get_loop_single_flight() -> AsyncSingleFlight:
+    """returns the :py:class:`AsyncSingleFlight` shared by every client
+    running on the current event loop"""
+    loop = asyncio.get_running_loop()
+    flight = loop_single_flights.get(loop)
+    if flight is None:
+        flight = loop_single_flights[loop] = AsyncSingleFlight()
+    return flight
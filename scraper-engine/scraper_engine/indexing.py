@@ -0,0 +1,214 @@
+import json
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from dateutil.parser import parse as parse_date
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import streaming_bulk
+from sqlalchemy import tuple_
+
+from scraper_engine.config import config
+from scraper_engine.logs import get_logger
+from scraper_engine.networking import connect_to_elasticsearch, connect_to_redis
+from scraper_engine.sql.models import ScrapedRecipe
+from scraper_engine.sql.models.recipes import scraped_recipe_saved
+
+RECIPES_INDEX_NAME = "recipes"
+RECIPES_INDEX_WATERMARK_REDIS_KEY = "cook-my-list:recipes-index-watermark"
+
+logger = get_logger(__name__)
+
+
+class RecipeIndexer(object):
+    """indexes saved recipes into elasticsearch in the background.
+
+    Recipe ids arrive through the ``scraped-recipe-saved`` signal and
+    are sent to the bulk API in batches of ``batch_size`` or every
+    ``flush_interval`` seconds. Once ``max_pending`` ids are waiting,
+    the threads that save recipes block until the indexer catches up,
+    or drop the id when the indexer is not running.
+
+    Recipes that could not be indexed after ``max_retries``, or whose
+    batch failed altogether, are left for :py:meth:`reconcile` to pick
+    up.
+    """
+
+    def __init__(
+        self,
+        es: Optional[Elasticsearch] = None,
+        index: str = RECIPES_INDEX_NAME,
+        batch_size: int = config.elasticsearch_bulk_size,
+        flush_interval: float = config.elasticsearch_bulk_flush_interval,
+        max_pending: int = config.elasticsearch_bulk_max_pending,
+        max_retries: int = config.elasticsearch_bulk_max_retries,
+    ):
+        self.es = es
+        self.index = index
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self.max_retries = max_retries
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.should_run = False
+
+    def get_elasticsearch(self) -> Optional[Elasticsearch]:
+        if self.es is None:
+            self.es = connect_to_elasticsearch(verbose=False)
+        return self.es
+
+    def is_running(self) -> bool:
+        return self.should_run and self.thread is not None and self.thread.is_alive()
+
+    def add(self, recipe_id: int):
+        with self.condition:
+            while len(self.pending) >= self.max_pending and self.is_running():
+                self.condition.wait(self.flush_interval)
+
+            if len(self.pending) >= self.max_pending:
+                logger.warning(
+                    f"recipe indexer is not running, leaving recipe {recipe_id} "
+                    "for reconciliation"
+                )
+                return
+
+            # a dict keeps insertion order and de-duplicates ids
+            self.pending[recipe_id] = True
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+
+    def on_recipe_saved(self, recipe: ScrapedRecipe, recipe_id: int):
+        self.add(recipe_id)
+
+    def start(self):
+        self.should_run = True
+        scraped_recipe_saved.connect(self.on_recipe_saved)
+        self.thread = threading.Thread(
+            target=self.run, name="recipe-indexer", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        scraped_recipe_saved.disconnect(self.on_recipe_saved)
+        with self.condition:
+            self.should_run = False
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        try:
+            self.index_pending()
+        finally:
+            # wakes up threads blocked in add() so they stop waiting
+            with self.condition:
+                self.condition.notify_all()
+
+    def index_pending(self):
+        while True:
+            with self.condition:
+                if self.should_run and len(self.pending) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+
+                if not self.pending and not self.should_run:
+                    return
+
+                batch = list(self.pending)[: self.batch_size]
+                for recipe_id in batch:
+                    del self.pending[recipe_id]
+
+                self.condition.notify_all()
+
+            if not batch:
+                continue
+
+            try:
+                self.index_recipe_ids(batch)
+            except Exception:
+                logger.exception(f"failed to index {len(batch)} recipes")
+
+    def index_recipe_ids(self, recipe_ids: List[int]) -> int:
+        table = ScrapedRecipe.table
+        recipes = ScrapedRecipe.where_many(table.c.id.in_(recipe_ids))
+        return self.index_recipes(recipes)
+
+    def index_recipes(self, recipes: Iterable[ScrapedRecipe]) -> int:
+        """sends recipes through the bulk API and returns how many of
+        them were indexed"""
+        es = self.get_elasticsearch()
+        if not es:
+            logger.warning("elasticsearch is not available, skipping indexing")
+            return 0
+
+        actions = (
+            {
+                "_index": self.index,
+                "_id": recipe.id,
+                "_source": recipe.to_search_document(),
+            }
+            for recipe in recipes
+        )
+        indexed = 0
+        try:
+            for ok, result in streaming_bulk(
+                es,
+                actions,
+                chunk_size=self.batch_size,
+                max_retries=self.max_retries,
+                raise_on_error=False,
+            ):
+                if ok:
+                    indexed += 1
+                else:
+                    logger.error(f"failed to index recipe: {result}")
+        except Exception:
+            logger.exception(f"failed to index recipes into {self.index}")
+
+        return indexed
+
+    def reconcile(self, since: Optional[Tuple[datetime, int]] = None) -> int:
+        """indexes every recipe updated after the stored watermark,
+        advancing the watermark after each batch"""
+        watermark = since or self.get_watermark()
+        table = ScrapedRecipe.table
+        total = 0
+        while True:
+            query = table.select()
+            if watermark:
+                query = query.where(
+                    tuple_(table.c.updated_at, table.c.id) > tuple_(*watermark)
+                )
+            query = query.order_by(table.c.updated_at, table.c.id).limit(
+                self.batch_size
+            )
+            recipes = ScrapedRecipe.many_from_query(query)
+            if not recipes:
+                return total
+
+            indexed = self.index_recipes(recipes)
+            total += indexed
+            if indexed < len(recipes):
+                # keep the watermark so that the next run retries them
+                logger.error(f"stopping reconciliation after {total} recipes")
+                return total
+
+            last = recipes[-1]
+            watermark = (parse_date(last.updated_at), last.id)
+            self.set_watermark(watermark)
+            logger.info(f"reindexed {total} recipes up to {last.updated_at}")
+
+    def get_watermark(self) -> Optional[Tuple[datetime, int]]:
+        value = connect_to_redis().get(RECIPES_INDEX_WATERMARK_REDIS_KEY)
+        if not value:
+            return None
+
+        data = json.loads(value)
+        return parse_date(data["updated_at"]), data["id"]
+
+    def set_watermark(self, watermark: Tuple[datetime, int]):
+        updated_at, recipe_id = watermark
+        value = json.dumps({"updated_at": updated_at.isoformat(), "id": recipe_id})
+        connect_to_redis().set(RECIPES_INDEX_WATERMARK_REDIS_KEY, value)
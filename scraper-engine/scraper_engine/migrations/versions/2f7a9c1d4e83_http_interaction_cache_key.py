@@ -0,0 +1,127 @@
+"""http interaction cache key
+
+Revision ID: 2f7a9c1d4e83
+Revises: 9d4c2b7e6f10
+Create Date: 2021-08-22 11:03:47.520381
+
+"""
+
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2f7a9c1d4e83"
+down_revision = "9d4c2b7e6f10"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+http_interaction = sa.table(
+    "http_interaction",
+    sa.column("id", sa.Integer),
+    sa.column("cache_key", sa.String),
+    sa.column("request_url", sa.UnicodeText),
+    sa.column("request_method", sa.String),
+)
+
+
+# frozen copies of scraper_engine.util.normalize_url() and
+# generate_cache_key() as of this revision, so that later changes to the
+# key format do not change what this migration writes
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def generate_cache_key(url: str, method: str) -> str:
+    result = hashlib.sha256()
+    # no headers and no body were stored with the interactions
+    for part in (method.upper().encode("utf-8"), normalize_url(url).encode("utf-8")):
+        result.update(part)
+        result.update(b"\0")
+
+    result.update(b"\0")
+    result.update(b"\0")
+    return result.hexdigest()
+
+
+def backfill_cache_keys():
+    connection = op.get_bind()
+    table = http_interaction
+    seen = set()
+    last_id = 0
+    while True:
+        # newest rows first so that the most recent copy of a url wins
+        query = sa.select([table.c.id, table.c.request_url, table.c.request_method])
+        if last_id:
+            query = query.where(table.c.id < last_id)
+        rows = connection.execute(
+            query.order_by(table.c.id.desc()).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+
+        for row_id, url, method in rows:
+            cache_key = generate_cache_key(url, method)
+            if cache_key in seen:
+                # equivalent urls, e.g. that only differ by fragment
+                connection.execute(table.delete().where(table.c.id == row_id))
+                continue
+
+            seen.add(cache_key)
+            connection.execute(
+                table.update().where(table.c.id == row_id).values(cache_key=cache_key)
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column("http_interaction", sa.Column("cache_key", sa.String(64)))
+    backfill_cache_keys()
+    op.alter_column("http_interaction", "cache_key", nullable=False)
+    op.create_index(
+        "ix_http_interaction_cache_key",
+        "http_interaction",
+        ["cache_key"],
+        unique=True,
+    )
+    op.drop_constraint(
+        "http_interaction_request_url_key", "http_interaction", type_="unique"
+    )
+    op.alter_column(
+        "http_interaction",
+        "request_url",
+        type_=sa.UnicodeText(),
+        existing_type=sa.String(255),
+        existing_nullable=False,
+    )
+
+
+def downgrade():
+    op.alter_column(
+        "http_interaction",
+        "request_url",
+        type_=sa.String(255),
+        existing_type=sa.UnicodeText(),
+        existing_nullable=False,
+    )
+    op.create_unique_constraint(
+        "http_interaction_request_url_key", "http_interaction", ["request_url"]
+    )
+    op.drop_index("ix_http_interaction_cache_key", table_name="http_interaction")
+    op.drop_column("http_interaction", "cache_key")
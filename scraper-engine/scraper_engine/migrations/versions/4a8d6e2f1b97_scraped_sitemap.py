@@ -0,0 +1,30 @@
+"""scraped sitemap
+
+Revision ID: 4a8d6e2f1b97
+Revises: 7e3f5a8b2c61
+Create Date: 2021-08-24 18:52:09.771350
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4a8d6e2f1b97"
+down_revision = "7e3f5a8b2c61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "scraped_sitemap",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("url", sa.String(255), nullable=False, unique=True),
+        sa.Column("last_modified", sa.DateTime),
+        sa.Column("crawled_at", sa.DateTime),
+    )
+
+
+def downgrade():
+    op.drop_table("scraped_sitemap")
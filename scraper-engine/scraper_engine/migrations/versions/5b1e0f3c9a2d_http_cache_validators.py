@@ -0,0 +1,26 @@
+"""http cache validators
+
+Revision ID: 5b1e0f3c9a2d
+Revises: c48d18981e7c
+Create Date: 2021-08-14 10:12:31.208113
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5b1e0f3c9a2d"
+down_revision = "c48d18981e7c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("http_interaction", sa.Column("etag", sa.String(255)))
+    op.add_column("http_interaction", sa.Column("last_modified", sa.String(64)))
+
+
+def downgrade():
+    op.drop_column("http_interaction", "last_modified")
+    op.drop_column("http_interaction", "etag")
@@ -0,0 +1,30 @@
+"""http interaction expiry
+
+Revision ID: 7e3f5a8b2c61
+Revises: 2f7a9c1d4e83
+Create Date: 2021-08-23 09:27:15.904113
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7e3f5a8b2c61"
+down_revision = "2f7a9c1d4e83"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("http_interaction", sa.Column("expires_at", sa.DateTime))
+    # the one day window that was hard-coded before expiry was stored
+    op.execute("UPDATE http_interaction SET expires_at = updated_at + interval '1 day'")
+    op.create_index(
+        "ix_http_interaction_expires_at", "http_interaction", ["expires_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_http_interaction_expires_at", table_name="http_interaction")
+    op.drop_column("http_interaction", "expires_at")
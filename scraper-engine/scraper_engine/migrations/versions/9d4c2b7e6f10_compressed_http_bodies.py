@@ -0,0 +1,92 @@
+"""compressed http bodies
+
+Revision ID: 9d4c2b7e6f10
+Revises: 5b1e0f3c9a2d
+Create Date: 2021-08-21 16:40:05.113724
+
+"""
+
+import gzip
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9d4c2b7e6f10"
+down_revision = "5b1e0f3c9a2d"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+http_interaction = sa.table(
+    "http_interaction",
+    sa.column("id", sa.Integer),
+    sa.column("response_body", sa.UnicodeText),
+    sa.column("response_body_data", sa.LargeBinary),
+    sa.column("response_body_codec", sa.String),
+)
+
+
+def convert_in_batches(source, target, convert):
+    """copies ``source`` into ``target`` through ``convert``, BATCH_SIZE
+    rows at a time so that large tables are never loaded in memory"""
+    connection = op.get_bind()
+    table = http_interaction
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([table.c.id, table.c[source], table.c.response_body_codec])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+
+        for row_id, value, codec in rows:
+            connection.execute(
+                table.update()
+                .where(table.c.id == row_id)
+                .values({target: convert(value, codec)})
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column("http_interaction", sa.Column("response_body_data", sa.LargeBinary()))
+    op.add_column("http_interaction", sa.Column("response_body_codec", sa.String(10)))
+    op.execute(http_interaction.update().values(response_body_codec="gzip"))
+
+    def compress(value, codec):
+        if value is None:
+            return None
+        return gzip.compress(value.encode("utf-8"))
+
+    convert_in_batches("response_body", "response_body_data", compress)
+    op.drop_column("http_interaction", "response_body")
+    op.alter_column(
+        "http_interaction", "response_body_data", new_column_name="response_body"
+    )
+
+
+def downgrade():
+    op.alter_column(
+        "http_interaction", "response_body", new_column_name="response_body_data"
+    )
+    op.add_column("http_interaction", sa.Column("response_body", sa.UnicodeText()))
+
+    def decompress(value, codec):
+        if value is None:
+            return None
+        if codec == "gzip":
+            value = gzip.decompress(value)
+        elif codec == "zstd":
+            import zstandard
+
+            value = zstandard.ZstdDecompressor().decompress(value)
+        return bytes(value).decode("utf-8", errors="replace")
+
+    convert_in_batches("response_body_data", "response_body", decompress)
+    op.drop_column("http_interaction", "response_body_data")
+    op.drop_column("http_interaction", "response_body_codec")
@@ -1,7 +1,7 @@
 import logging
 import socket
 import time
-from typing import Union
+from typing import Iterable, List, Tuple, Union
 from urllib.parse import urlparse
 
 import redis
@@ -23,6 +23,30 @@ logger = logging.getLogger(__name__)
 
 BUILD_QUEUE_REDIS_KEY = "ci-butler:sortedset:build-info"
 BUILD_MONITOR_REDIS_KEY = "ci-butler:sortedset:build-monitor"
+RECIPE_QUEUE_REDIS_KEY = "cook-my-list:sortedset:recipes"
+
+# moves claims whose visibility timeout expired back into the queue,
+# then atomically moves up to ARGV[2] jobs from the queue into the
+# sorted set of claimed jobs, scored by their visibility deadline
+CLAIM_JOBS_SCRIPT = """
+local queue, claimed = KEYS[1], KEYS[2]
+local now, count, deadline = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+
+local expired = redis.call("ZRANGEBYSCORE", claimed, "-inf", now)
+for _, job in ipairs(expired) do
+    redis.call("ZADD", queue, now, job)
+end
+if #expired > 0 then
+    redis.call("ZREMRANGEBYSCORE", claimed, "-inf", now)
+end
+
+local jobs = redis.call("ZRANGE", queue, 0, count - 1)
+for _, job in ipairs(jobs) do
+    redis.call("ZREM", queue, job)
+    redis.call("ZADD", claimed, deadline, job)
+end
+return jobs
+"""
 
 
 def es_index_name_for_github_repo(owner: str, repo: str):
@@ -213,6 +237,7 @@ class RedisQueueManager(object):
         self.name = name
         self.redis = redis
         self.logger = logging.getLogger(f"redis-streams")
+        self.claim_jobs_script = redis.register_script(CLAIM_JOBS_SCRIPT)
 
     def consume_job(self, key: str, block_ms: int = 1000) -> dict:
         if isinstance(key, bytes):
@@ -242,6 +267,40 @@ class RedisQueueManager(object):
             )
         return stream_id
 
+    def add_jobs(self, key: str, jobs: Iterable[dict]) -> int:
+        weight = time.time()
+        mapping = dict((json_encode(job), weight) for job in jobs)
+        if not mapping:
+            return 0
+
+        return self.redis.zadd(key, mapping, nx=True)
+
+    def claimed_key(self, key: str) -> str:
+        return f"{key}:claimed"
+
+    def claim_jobs(
+        self, key: str, count: int = 1, visibility_timeout: float = 300
+    ) -> List[Tuple[bytes, dict]]:
+        """claims up to ``count`` jobs for ``visibility_timeout``
+        seconds, after which they are redelivered unless acknowledged
+        with :py:meth:`ack_job`.
+
+        Returns a list of ``(member, job)`` tuples where ``member`` is
+        the raw value that identifies the claim.
+        """
+        now = time.time()
+        members = self.claim_jobs_script(
+            keys=[key, self.claimed_key(key)],
+            args=[now, count, now + visibility_timeout],
+        )
+        return [(member, load_json(member)) for member in members]
+
+    def ack_job(self, key: str, member: Union[bytes, str]) -> bool:
+        return bool(self.redis.zrem(self.claimed_key(key), member))
+
+    def claimed_count(self, key: str) -> int:
+        return self.redis.zcard(self.claimed_key(key))
+
     def job_count(self, key: str, verbose: bool = False):
         verbose = verbose or self.verbose
         count = self.redis.zcard(key)
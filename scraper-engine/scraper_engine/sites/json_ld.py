@@ -0,0 +1,44 @@
+import json
+import re
+from typing import Iterator, Optional
+
+json_ld_regex = re.compile(
+    rb"<script[^>]+application/ld\+json[^>]*>(?P<data>.*?)</script>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def iter_json_ld_objects(
+    content: bytes, encoding: Optional[str] = None
+) -> Iterator[dict]:
+    """yields every object of the ``<script type="application/ld+json">``
+    blocks of a page, scanning its raw bytes rather than parsing the html.
+
+    Only the blocks are decoded, with ``encoding`` when the page is not
+    in utf-8.
+    """
+    for found in json_ld_regex.finditer(content):
+        data = found.group("data")
+        try:
+            if encoding:
+                data = data.decode(encoding)
+            data = json.loads(data)
+        except ValueError:
+            continue
+
+        if isinstance(data, dict) and "@graph" in data:
+            data = data["@graph"]
+        if isinstance(data, dict):
+            data = [data]
+        if isinstance(data, list):
+            yield from (item for item in data if isinstance(item, dict))
+
+
+def find_json_ld_object(
+    content: bytes, schema_type: str, encoding: Optional[str] = None
+) -> Optional[dict]:
+    """returns the first json-ld object of ``schema_type`` (e.g. ``Recipe``)"""
+    for item in iter_json_ld_objects(content, encoding):
+        types = item.get("@type")
+        if types == schema_type or isinstance(types, list) and schema_type in types:
+            return item
@@ -0,0 +1,61 @@
+import zlib
+from typing import BinaryIO, Iterator
+
+from lxml import etree
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_chunks(source: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """reads ``source`` in chunks, transparently decompressing gzipped
+    documents such as ``.xml.gz`` shards"""
+    decompressor = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+
+        if decompressor is None and chunk[:2] == GZIP_MAGIC:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        yield chunk
+
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+def iter_sitemap_elements(source: BinaryIO, tag: str) -> Iterator[etree._Element]:
+    """parses a sitemap incrementally from a binary stream, yielding each
+    ``<url>`` or ``<sitemap>`` element (depending on ``tag``) as soon as
+    it is complete.
+
+    Elements are discarded once the caller moves on to the next one, so
+    memory stays flat however large the document is.
+    """
+    parser = etree.XMLPullParser(
+        events=("end",),
+        tag=f"{{*}}{tag}",
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True,
+    )
+    for chunk in iter_chunks(source):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            yield element
+            element.clear()
+            # also drop the references kept by the root to earlier siblings
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    parser.close()
+
+
+def get_child_text(element: etree._Element, tag: str) -> str:
+    child = element.find(f"{{*}}{tag}")
+    if child is None or not child.text:
+        return ""
+    return child.text.strip()
@@ -1,22 +1,125 @@
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 
 from defusedxml.lxml import RestrictedElement
 from lxml import html as xml
 
-from scraper_engine.http.client import HttpClient
+from scraper_engine.config import config
+from scraper_engine.http.client import AsyncHttpClient, HttpClient
+from scraper_engine.http.freshness import get_ttl
 from scraper_engine.logs import get_logger
+from scraper_engine.sites.sitemaps import get_child_text, iter_sitemap_elements
+from scraper_engine.sql.models import ScrapedRecipe, ScrapedSiteMap
+from scraper_engine.util import chunked
 
-from .models import Recipe, SiteMap
+from .models import Recipe, SiteMap, try_parse_date
 from .scrapers import RecipeScraper
 
 logger = get_logger("TudoGostosoClient")
 
 
+def to_utc(value) -> Optional[datetime]:
+    """converts a ``<lastmod>`` into a naive utc datetime comparable to
+    the ones stored in the database"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return None
+
+
+def is_recipe_outdated(
+    url: str, last_modified: Optional[datetime], updated_at: Optional[datetime]
+) -> bool:
+    if updated_at is None:
+        return True
+    if last_modified is not None:
+        return last_modified > updated_at
+
+    # without a <lastmod> fall back to the configured ttl of the page
+    ttl = get_ttl(url, {}) or 0
+    return updated_at < datetime.utcnow() - timedelta(seconds=ttl)
+
+
+class SitemapShard(object):
+    """the recipe urls crawled from a single sitemap, or the error that
+    prevented it from being crawled"""
+
+    def __init__(
+        self,
+        sitemap: SiteMap,
+        urls: Optional[List[str]] = None,
+        error: Optional[Exception] = None,
+        changed: bool = True,
+    ):
+        self.sitemap = sitemap
+        self.urls = urls or []
+        self.error = error
+        self.changed = changed
+
+    @property
+    def last_modified(self) -> Optional[datetime]:
+        return to_utc(self.sitemap.last_modified)
+
+    def mark_crawled(self):
+        ScrapedSiteMap.mark_crawled(self.sitemap.url, self.last_modified)
+
+    def __repr__(self):
+        return f"<SitemapShard {self.sitemap.url} urls={len(self.urls)}>"
+
+
+class CrawlCheckpoints(object):
+    """marks the sitemaps of an incremental crawl as crawled only once
+    every recipe url up to the last one of each sitemap was enqueued,
+    so that an interrupted crawl is picked up by the next one.
+
+    Urls are counted by their position in the crawl, enqueuers
+    :py:meth:`confirm` the batches they stored in any order.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.enqueued = 0
+        self.confirmed = {}
+        self.shards = deque()
+
+    def track(self, shard: SitemapShard) -> List[str]:
+        """returns the urls of ``shard`` to be enqueued"""
+        if not shard.changed:
+            return shard.urls
+
+        if not shard.urls:
+            # there is nothing to enqueue that could get lost
+            shard.mark_crawled()
+            return shard.urls
+
+        self.position += len(shard.urls)
+        self.shards.append((self.position, shard))
+        return shard.urls
+
+    def confirm(self, offset: int, count: int):
+        """called once the urls at positions ``offset`` up to ``offset
+        + count`` were enqueued"""
+        self.confirmed[offset] = offset + count
+        while self.enqueued in self.confirmed:
+            self.enqueued = self.confirmed.pop(self.enqueued)
+
+        while self.shards and self.shards[0][0] <= self.enqueued:
+            _, shard = self.shards.popleft()
+            shard.mark_crawled()
+
+
 class TudoGostosoClient(HttpClient):
     def get_recipe(self, url):
         response = self.request("GET", url)
         scraper = RecipeScraper(url, response)
-        return scraper.get_recipe()
+        return scraper.scrape_recipe()
 
     def get_sitemap_element(self, sitemap_url, **kw) -> Optional[RestrictedElement]:
         logger.info(f"retrieving sitemap {sitemap_url}")
@@ -26,32 +129,156 @@ class TudoGostosoClient(HttpClient):
             logger.exception(f"failed request {sitemap_url}")
             raise
         try:
-            return xml.fromstring(bytes(response.text, "utf-8"))
+            return xml.fromstring(response.content)
         except Exception:
             logger.exception(f"failed to parse xml from url {sitemap_url}")
 
-    def get_recipe_urls(self, sitemap_url: str, skip_cache: bool = True) -> List[str]:
-        element = self.get_sitemap_element(sitemap_url, skip_cache=skip_cache)
-        return [x.text.strip() for x in element.xpath("//url/loc") if x.text]
+    @contextmanager
+    def open_sitemap(self, sitemap_url: str) -> Iterator[BinaryIO]:
+        """opens the body of a sitemap as a binary stream, see
+        :py:meth:`~scraper_engine.http.client.HttpClient.open`"""
+        logger.info(f"retrieving sitemap {sitemap_url}")
+        with self.open(sitemap_url) as stream:
+            yield stream
 
-    def get_sitemap(self, max_pages=2) -> SiteMap.List:
-        root_element = self.get_sitemap_element(
-            "https://tudogostoso.com.br/sitemap.xml"
+    def iter_sitemap_elements(self, sitemap_url: str, tag: str):
+        with self.open_sitemap(sitemap_url) as stream:
+            yield from iter_sitemap_elements(stream, tag)
+
+    def iter_recipe_urls(self, sitemap_url: str) -> Iterator[str]:
+        for url, _ in self.iter_recipe_entries(sitemap_url):
+            yield url
+
+    def iter_recipe_entries(
+        self, sitemap_url: str
+    ) -> Iterator[Tuple[str, Optional[datetime]]]:
+        """yields the url and ``<lastmod>`` of every recipe in a sitemap"""
+        for element in self.iter_sitemap_elements(sitemap_url, "url"):
+            url = get_child_text(element, "loc")
+            if url:
+                yield url, try_parse_date(get_child_text(element, "lastmod"))
+
+    def iter_outdated_recipe_urls(
+        self, sitemap_url: str, batch_size: int = 1000
+    ) -> Iterator[str]:
+        """yields the urls of recipes that were never scraped or whose
+        ``<lastmod>`` is newer than their last scrape"""
+        for batch in chunked(self.iter_recipe_entries(sitemap_url), batch_size):
+            updated_at = ScrapedRecipe.get_updated_at_by_url(url for url, _ in batch)
+            for url, last_modified in batch:
+                if is_recipe_outdated(url, to_utc(last_modified), updated_at.get(url)):
+                    yield url
+
+    def iter_sitemap(self, max_pages: int = None) -> Iterator[SiteMap]:
+        elements = self.iter_sitemap_elements(
+            "https://tudogostoso.com.br/sitemap.xml", "sitemap"
         )
-        if len(root_element) == 0:
-            return []
-
-        items = []
-        for i, element in enumerate(root_element.xpath("//sitemap")):
-            if i == max_pages:
-                break
-            sitemap = SiteMap.from_element(element)
-            items.append(sitemap)
-        return SiteMap.List(items)
-
-    def crawl_sitemap(self, max_pages: int = 2) -> List[str]:
-        recipe_urls = []
-        for sitemap in self.get_sitemap(max_pages=max_pages):
-            recipe_urls.extend(self.get_recipe_urls(sitemap.url))
-
-        return sorted(recipe_urls, reverse=True)
+        for element in islice(elements, max_pages):
+            yield SiteMap.from_element(element)
+
+    def crawl_shard(self, sitemap: SiteMap, incremental: bool = False) -> SitemapShard:
+        """downloads and parses a single sitemap, capturing any error so
+        that it can be reported without aborting the crawl"""
+        shard = SitemapShard(sitemap)
+        try:
+            if not incremental:
+                shard.urls = list(self.iter_recipe_urls(sitemap.url))
+            elif ScrapedSiteMap.has_changed(sitemap.url, shard.last_modified):
+                shard.urls = list(self.iter_outdated_recipe_urls(sitemap.url))
+            else:
+                logger.info(f"skipping unchanged sitemap {sitemap.url}")
+                shard.changed = False
+        except Exception as e:
+            logger.exception(f"failed to crawl sitemap {sitemap.url}")
+            shard.error = e
+
+        return shard
+
+    def iter_crawl_shards(
+        self,
+        max_pages: int = 2,
+        incremental: bool = False,
+        concurrency: int = config.crawler_sitemap_concurrency,
+    ) -> Iterator[SitemapShard]:
+        """crawls up to ``concurrency`` sitemaps at a time and yields
+        each of them as soon as it completes.
+
+        New sitemaps are only submitted as the running ones complete,
+        so at most ``concurrency`` shards are held in memory.
+        """
+        sitemaps = list(self.iter_sitemap(max_pages=max_pages))
+        concurrency = max(1, concurrency)
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="sitemap"
+        ) as executor:
+            pending = set()
+            for sitemap in sitemaps:
+                pending.add(executor.submit(self.crawl_shard, sitemap, incremental))
+                if len(pending) < concurrency:
+                    continue
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def iter_crawl_sitemap(
+        self,
+        max_pages: int = 2,
+        incremental: bool = False,
+        concurrency: int = config.crawler_sitemap_concurrency,
+        failures: Optional[List[SitemapShard]] = None,
+        checkpoints: Optional[CrawlCheckpoints] = None,
+    ) -> Iterator[str]:
+        """yields recipe urls as each sitemap completes.
+
+        An ``incremental`` crawl skips the sitemaps whose ``<lastmod>``
+        did not change since they were last crawled, and only yields
+        the recipes of changed sitemaps that are outdated. Changed
+        sitemaps are handed to ``checkpoints``, which marks them as
+        crawled once their urls are confirmed to be enqueued.
+
+        Sitemaps that fail are appended to ``failures`` rather than
+        aborting the crawl, and are retried by the next incremental one.
+        """
+        for shard in self.iter_crawl_shards(max_pages, incremental, concurrency):
+            if shard.error is not None:
+                if failures is not None:
+                    failures.append(shard)
+                continue
+
+            if incremental and checkpoints is not None:
+                yield from checkpoints.track(shard)
+            else:
+                yield from shard.urls
+
+    def get_recipe_urls(self, sitemap_url: str) -> List[str]:
+        return list(self.iter_recipe_urls(sitemap_url))
+
+    def get_sitemap(self, max_pages=2) -> SiteMap.List:
+        return SiteMap.List(self.iter_sitemap(max_pages=max_pages))
+
+    def crawl_sitemap(
+        self,
+        max_pages: int = 2,
+        concurrency: int = config.crawler_sitemap_concurrency,
+    ) -> List[str]:
+        urls = self.iter_crawl_sitemap(max_pages=max_pages, concurrency=concurrency)
+        return sorted(urls, reverse=True)
+
+
+class AsyncTudoGostosoClient(AsyncHttpClient):
+    async def get_recipe(self, url, parser=None):
+        """fetches a recipe, parsing its page in the given
+        :py:class:`~scraper_engine.workers.parser.RecipeParserPool` or
+        else within the event loop"""
+        response = await self.request("GET", url)
+        if parser is not None:
+            return await parser.parse(url, response)
+
+        scraper = RecipeScraper(url, response)
+        return scraper.scrape_recipe()
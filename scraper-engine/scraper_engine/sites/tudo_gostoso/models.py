@@ -7,12 +7,18 @@ from dateutil.parser import parse as parse_date
 from defusedxml.lxml import RestrictedElement
 from lxml import html
 from scraper_engine import events
+from scraper_engine.logs import get_logger
+from scraper_engine.sites.sitemaps import get_child_text
 from scraper_engine.sql.models import ScrapedRecipe, ScrapedSiteMap
 from uiclasses import Model
 from uiclasses.typing import Property
 
+logger = get_logger(__name__)
+
 
 def try_parse_date(value: str) -> Optional[datetime]:
+    if not value:
+        return None
     try:
         return parse_date(value)
     except Exception:
@@ -90,11 +96,17 @@ class Recipe(Model):
             "json_data": self.to_json(),
         }
 
-    def save(self) -> ScrapedRecipe:
+    def has_enough_data(self) -> bool:
         if not self.url or not self.title:
             logger.warning(
                 f"cannot save recipe {self} because it does not have enough data"
             )
+            return False
+
+        return True
+
+    def save(self) -> ScrapedRecipe:
+        if not self.has_enough_data():
             return
 
         sql = ScrapedRecipe.get_or_create(url=self.url)
@@ -109,14 +121,8 @@ class SiteMap(Model):
 
     @classmethod
     def from_element(cls, element: RestrictedElement):
-        lastmod = element.xpath("lastmod")
-        loc = element.xpath("loc")
-        url = len(loc) and loc[0].text.strip() or None
-        last_modified = (
-            len(lastmod)
-            and try_parse_date(lastmod[0].text.strip())
-            or datetime.utcnow().date()
-        )
+        url = get_child_text(element, "loc") or None
+        last_modified = try_parse_date(get_child_text(element, "lastmod"))
         return cls(url=url, last_modified=last_modified)
 
     def sql(self) -> Optional[ScrapedSiteMap]:
@@ -2,16 +2,18 @@ import re
 from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
-from functools import lru_cache
+from html import unescape
 from itertools import chain
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from urllib.parse import parse_qsl, urlparse
 
-from lxml import html
+from lxml import etree, html
+from lxml.cssselect import CSSSelector
 from requests import Response
 from scraper_engine.http.exceptions import ElementNotFound, TooManyElementsFound
 from scraper_engine.logs import get_logger
-from uiclasses import Model
+from scraper_engine.sites.json_ld import find_json_ld_object
+from scraper_engine.util import detect_encoding, memoized_method
 
 from .models import Direction, Ingredient, Picture, Recipe
 
@@ -19,34 +21,105 @@ recipe_id_regex = re.compile(r"[/](?P<id>\d+)[-][^/]+")
 
 total_cooking_time_regex = re.compile(r"(?P<value>[\d.]+)?(\s*(?P<unit>\S*))?")
 servings_regex = re.compile(r"(?P<value>[\d.]+)?(\s*(?P<unit>\S*))?")
+# schema.org durations such as ``PT1H30M``
+iso_duration_regex = re.compile(
+    r"^P(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+# the unit shown by the page next to the number of servings
+json_ld_servings_unit = "porções"
 
 
 logger = get_logger(__name__)
 
+# html parsers by encoding, shared by every scraper
+html_parsers: Dict[Optional[str], html.HTMLParser] = {}
 
-class Element(Model):
+# the fields of a :py:class:`Recipe`, in the order they are scraped
+recipe_fields = (
+    "id",
+    "title",
+    "url",
+    "ingredients",
+    "directions",
+    "pictures",
+    "total_ratings",
+    "rating",
+    "servings",
+    "servings_value",
+    "servings_unit",
+    "total_cooking_time",
+    "total_cooking_time_value",
+    "total_cooking_time_unit",
+    "author_name",
+)
 
-    tag: str
-    attributes: dict
+# compiled selectors by css expression, shared by every scraper
+css_selectors: Dict[str, CSSSelector] = {}
+
+
+def compile_selector(selector: str) -> CSSSelector:
+    """returns the compiled :py:class:`CSSSelector` of a css expression,
+    which is only translated to xpath the first time it is used"""
+    compiled = css_selectors.get(selector)
+    if compiled is None:
+        # same translator as :py:meth:`lxml.html.HtmlElement.cssselect`
+        compiled = CSSSelector(selector, translator="html")
+        compiled = css_selectors.setdefault(selector, compiled)
+
+    return compiled
+
+
+def parse_html(content: bytes, encoding: Optional[str] = None) -> html.HtmlElement:
+    """parses the raw bytes of a page, letting lxml decode them with the
+    given encoding (or else its own detection) rather than decoding the
+    whole page into a python string first"""
+    parser = html_parsers.get(encoding)
+    if parser is None:
+        try:
+            parser = html.HTMLParser(encoding=encoding)
+        except LookupError:
+            # known to python but not to libxml2
+            return html.fromstring(content.decode(encoding, errors="replace"))
+
+        parser = html_parsers.setdefault(encoding, parser)
+
+    return html.fromstring(content, parser=parser)
+
+
+class Element(object):
+    """a thin wrapper of an lxml element for the scrapers.
+
+    Pages wrap thousands of nodes while being parsed, so elements only
+    hold a reference to the lxml node and lists of them are plain lists.
+    """
+
+    __slots__ = ("dom",)
+
+    List = list
 
     def __init__(self, dom):
         if isinstance(dom, Element):
-            data = dom.to_dict()
-            self.dom = dom.dom
-        else:
-            self.dom = dom
-            data = dict(tag=dom.tag, attributes=dict(dom.attrib))
+            dom = dom.dom
 
-        super().__init__(**data)
+        self.dom = dom
 
-    def __ui_attributes__(self):
-        data = {
-            "tag": self.tag,
-        }
-        if self.attributes:
-            data["attributes"] = self.attributes
+    @property
+    def tag(self) -> str:
+        return self.dom.tag
+
+    @property
+    def attributes(self) -> dict:
+        return dict(self.dom.attrib)
+
+    def to_dict(self) -> dict:
+        return {"tag": self.tag, "attributes": self.attributes}
 
-        return data
+    def __repr__(self):
+        if self.dom.attrib:
+            return f"<Element tag={self.tag!r} attributes={self.attributes!r}>"
+
+        return f"<Element tag={self.tag!r}>"
 
     def to_html(self) -> str:
         return str(html.tostring(self.dom), "utf-8")
@@ -75,7 +148,7 @@ class Element(Model):
             return Element(element)
 
     def query_many(self, selector, fail: bool = False):
-        found = self.dom.cssselect(selector)
+        found = compile_selector(selector)(self.dom)
         if not found and fail:
             raise ElementNotFound(f"{selector} in {self}")
         elif not found:
@@ -84,24 +157,131 @@ class Element(Model):
         return Element.List(map(Element, found))
 
     def query_one(self, selector, fail: bool = False):
-        found = self.query_many(selector, fail=fail)
+        found = compile_selector(selector)(self.dom)
         count = len(found)
-        if count > 1 and fail:
+        if not found and fail:
+            raise ElementNotFound(f"{selector} in {self}")
+        elif count > 1 and fail:
             raise TooManyElementsFound(
                 f"{count} elements matching {selector} in {self}"
             )
 
         if count > 0:
-            return found[0]
+            # only the first match gets wrapped
+            return Element(found[0])
+
+
+class RecipeNodes(object):
+    """the nodes of a recipe page that feed each field of a
+    :py:class:`Recipe`, collected by walking the document only once.
+
+    Each attribute holds the same nodes, in the same order, as the css
+    selectors used by the getters of :py:class:`RecipeScraper`. Rather
+    than matching every node against every selector, the walk looks
+    for the few elements that scope those selectors (e.g. the
+    ``.ingredients-card`` of ``.ingredients-card ol``) and only then
+    searches their subtrees.
+    """
+
+    __slots__ = (
+        "title",
+        "ingredient_lists",
+        "direction_lists",
+        "pictures",
+        "rating",
+        "data_items",
+    )
+
+    # ``[itemprop="..."]`` queries of :py:meth:`RecipeScraper.get_data_item`
+    data_item_names = ("recipeYield", "totalTime", "name")
+
+    scope_classes = {
+        "recipe-title": "title",
+        "ingredients-card": "ingredients",
+        "directions-card": "directions",
+    }
+    scope_ids = {"rating-average": "rating"}
+    scope_tags = {"picture": "pictures"}
+
+    def __init__(self):
+        self.title = None
+        # dicts keep the document order and skip the lists found again
+        # through nested scopes
+        self.ingredient_lists = {"ol": {}, "ul": {}}
+        self.direction_lists = {"ol": {}, "ul": {}}
+        self.pictures = {}
+        self.rating = {}
+        self.data_items = {}
+
+    @classmethod
+    def collect(cls, root) -> "RecipeNodes":
+        nodes = cls()
+        # inlined as this runs for every node of the page
+        scope_classes = cls.scope_classes
+        for node in root.iter(etree.Element):
+            name = node.get("itemprop")
+            if name in cls.data_item_names and name not in nodes.data_items:
+                nodes.data_items[name] = node
+
+            names = node.get("class")
+            if names:
+                for name in names.split():
+                    if name in scope_classes:
+                        nodes.collect_scope(scope_classes[name], node)
+
+            node_id = node.get("id")
+            if node_id in cls.scope_ids:
+                nodes.collect_scope(cls.scope_ids[node_id], node)
+            if node.tag in cls.scope_tags:
+                nodes.collect_scope(cls.scope_tags[node.tag], node)
+
+        return nodes
+
+    def collect_scope(self, scope: str, root):
+        if scope == "title":
+            if self.title is None:
+                self.title = next(root.iterdescendants("h1"), None)
+        elif scope in ("ingredients", "directions"):
+            lists = getattr(self, f"{scope[:-1]}_lists")
+            for node in root.iterdescendants("ol", "ul"):
+                lists[node.tag][node] = True
+        elif scope == "pictures":
+            for node in root.iterdescendants("img"):
+                if "pic" in node.get("class", "").split():
+                    self.pictures[node] = True
+        elif scope == "rating":
+            for node in root.iterdescendants("span"):
+                self.rating[node] = True
 
 
 class RecipeScraper(object):
-    def __init__(self, url: str, response: Response):
+    def __init__(self, url: str, response: Response, encoding: Optional[str] = None):
         self.url = url
         self.response = response
-        self.dom = Element(html.fromstring(response.text))
+        self.encoding = encoding
+        self.parsed_dom = None
+
+    @memoized_method
+    def get_encoding(self) -> str:
+        """the encoding given or else the one declared by the page,
+        assuming utf-8 rather than latin-1 like libxml2 would when
+        there is none"""
+        if self.encoding:
+            return self.encoding
+
+        return detect_encoding(self.response.headers, self.response.content) or "utf-8"
 
-    @lru_cache()
+    @property
+    def dom(self) -> Element:
+        # parsed on demand, as recipes scraped from json-ld may not need it
+        if self.parsed_dom is None:
+            self.parsed_dom = Element(
+                parse_html(self.response.content, self.get_encoding())
+            )
+
+        return self.parsed_dom
+
+    @memoized_method
     def get_recipe_id(self):
         parsed = urlparse(self.url)
         found = recipe_id_regex.search(parsed.path)
@@ -111,61 +291,35 @@ class RecipeScraper(object):
 
         return found.group("id")
 
-    @lru_cache()
+    @memoized_method
     def get_title(self):
         h1 = self.dom.query_one(".recipe-title h1")
+        if h1 is None:
+            logger.warning(f"could not find the title of recipe {self.url}")
+            return ""
+
         return h1.text.strip()
 
     def get_ingredients(self):
-        ingredients = Ingredient.List([])
-        current_step = self.get_title()
-
         elements = self.dom.query_many(".ingredients-card ol")
         elements.extend(self.dom.query_many(".ingredients-card ul"))
-        for ol in elements:
-            h3 = ol.getprevious()
-            if h3 and h3.text:
-                # remove trailing colon (e.g.: "Molho:" becomes "Molho")
-                current_step = h3.text.rstrip(":")
-
-            index = 0
-            for li in ol.getchildren():
-
-                strong = li.query_one("strong")
-                if strong:
-                    # remove trailing colon (e.g.: "Molho:" becomes "Molho")
-                    current_step = strong.text.rstrip(":")
-                    continue
-                paragraph = li.query_one("p") or li.query_one("span")
-                if not paragraph.text:
-                    logger.warning(
-                        f"failed to parse ingredient from {self.url} {paragraph.to_html()}"
-                    )
-                else:
-                    ingredients.append(
-                        Ingredient(
-                            step=current_step,
-                            name=paragraph.text,
-                        )
-                    )
-        if len(ingredients) == 0:
-            logger.warning(f"could not find ingredients in recipe {self.url}")
-
-        return ingredients
+        return self.parse_steps(elements, self.get_title(), Ingredient, "ingredient")
 
     def get_directions(self):
-        directions = Direction.List([])
-        current_step = self.get_title()
-
         elements = self.dom.query_many(".directions-card ol")
         elements.extend(self.dom.query_many(".directions-card ul"))
+        return self.parse_steps(elements, self.get_title(), Direction, "direction")
+
+    def parse_steps(self, elements, title: str, model, name: str):
+        steps = model.List([])
+        current_step = title
+
         for ol in elements:
             h3 = ol.getprevious()
             if h3 and h3.text:
                 # remove trailing colon (e.g.: "Molho:" becomes "Molho")
                 current_step = h3.text.rstrip(":")
 
-            index = 0
             for li in ol.getchildren():
                 strong = li.query_one("strong")
                 if strong:
@@ -175,22 +329,26 @@ class RecipeScraper(object):
                 paragraph = li.query_one("p") or li.query_one("span")
                 if not paragraph.text:
                     logger.warning(
-                        f"failed to parse direction from {self.url} {paragraph.to_html()}"
+                        f"failed to parse {name} from {self.url} {paragraph.to_html()}"
                     )
                 else:
-                    directions.append(
-                        Direction(
+                    steps.append(
+                        model(
                             step=current_step,
                             name=paragraph.text,
                         )
                     )
-        if len(directions) == 0:
-            logger.warning(f"could not find ingredients in recipe {self.url}")
-        return directions
+        if len(steps) == 0:
+            logger.warning(f"could not find {name}s in recipe {self.url}")
+
+        return steps
 
     def get_pictures(self):
+        return self.parse_pictures(self.dom.query_many("picture img.pic"))
+
+    def parse_pictures(self, elements):
         pictures = Picture.List([])
-        for img in self.dom.query_many("picture img.pic"):
+        for img in elements:
             url = img.attrib.get("src")
             width, height = extract_image_size_from_url(url)
             pictures.append(
@@ -203,74 +361,46 @@ class RecipeScraper(object):
             )
         return pictures
 
-    @lru_cache()
+    @memoized_method
     def get_rating_tuple(self) -> Tuple[int, Decimal]:
-        parts = [x.text for x in self.dom.query_many("#rating-average span")]
-        if not parts:
-            return -1, Decimal("-1")
-
-        return int(parts[0]), Decimal(parts[-1])
+        return parse_rating(self.dom.query_many("#rating-average span"))
 
-    @lru_cache()
+    @memoized_method
     def get_total_ratings(self) -> int:
         return self.get_rating_tuple()[0]
 
-    @lru_cache()
+    @memoized_method
     def get_rating(self) -> Decimal:
         return self.get_rating_tuple()[-1]
 
     def get_data_item(self, prop: str) -> str:
-        element = self.dom.query_one(f'[itemprop="{prop}"]')
-        if element:
-            return re.sub(r"\s+", " ", element.text)
+        return parse_data_item(self.dom.query_one(f'[itemprop="{prop}"]'))
 
-        return ""
-
-    @lru_cache()
+    @memoized_method
     def get_servings(self) -> str:
         return self.get_data_item("recipeYield")
 
-    @lru_cache()
+    @memoized_method
     def get_servings_value(self) -> Decimal:
-        servings = self.get_servings()
-        found = servings_regex.search(servings)
-        if found and found.group("value"):
-            return Decimal(found.group("value"))
-
-        return Decimal("-1")
+        return parse_value(servings_regex, self.get_servings())
 
-    @lru_cache()
+    @memoized_method
     def get_servings_unit(self) -> str:
-        servings = self.get_servings()
-        found = servings_regex.search(servings)
-        if found and found.group("unit"):
-            return found.group("unit")
-
-        return servings
+        return parse_unit(servings_regex, self.get_servings())
 
-    @lru_cache()
+    @memoized_method
     def get_total_cooking_time(self) -> str:
         return self.get_data_item("totalTime").lower()
 
-    @lru_cache()
+    @memoized_method
     def get_total_cooking_time_value(self) -> Decimal:
-        total_cooking_time = self.get_total_cooking_time()
-        found = total_cooking_time_regex.search(total_cooking_time)
-        if found and found.group("value"):
-            return Decimal(found.group("value"))
+        return parse_value(total_cooking_time_regex, self.get_total_cooking_time())
 
-        return Decimal("-1")
-
-    @lru_cache()
+    @memoized_method
     def get_total_cooking_time_unit(self) -> str:
-        total_cooking_time = self.get_total_cooking_time()
-        found = total_cooking_time_regex.search(total_cooking_time)
-        if found and found.group("unit"):
-            return found.group("unit")
-
-        return total_cooking_time
+        return parse_unit(total_cooking_time_regex, self.get_total_cooking_time())
 
-    @lru_cache()
+    @memoized_method
     def get_author_name(self) -> str:
         return self.get_data_item("name")
 
@@ -294,6 +424,295 @@ class RecipeScraper(object):
         }
         return Recipe(**data)
 
+    def extract_recipe(self) -> Recipe:
+        """same as :py:meth:`get_recipe` but walks the document only
+        once instead of running a query for each field"""
+        return Recipe(**self.extract_fields(recipe_fields))
+
+    def extract_fields(self, names, known: Optional[dict] = None) -> dict:
+        """extracts the given fields of a :py:class:`Recipe` from the
+        document in a single walk.
+
+        Only the fields in ``names``, and the ones they depend on, are
+        computed. ``known`` holds fields that were already found
+        elsewhere, such as the title given to steps without a section.
+        """
+        nodes = RecipeNodes.collect(self.dom.dom)
+        fields = dict(known or {})
+
+        def field(name: str):
+            if name not in fields:
+                fields[name] = extractors[name]()
+            return fields[name]
+
+        def title() -> str:
+            if nodes.title is None:
+                logger.warning(f"could not find the title of recipe {self.url}")
+                return ""
+            return Element(nodes.title).text.strip()
+
+        def data_item(prop: str) -> str:
+            element = nodes.data_items.get(prop)
+            if element is not None:
+                element = Element(element)
+            return parse_data_item(element)
+
+        def steps(lists, model, name):
+            elements = map(Element, chain(*lists.values()))
+            return self.parse_steps(elements, field("title"), model, name)
+
+        extractors = {
+            "id": self.get_recipe_id,
+            "title": title,
+            "url": lambda: self.url,
+            "ingredients": lambda: steps(
+                nodes.ingredient_lists, Ingredient, "ingredient"
+            ),
+            "directions": lambda: steps(nodes.direction_lists, Direction, "direction"),
+            "pictures": lambda: self.parse_pictures(map(Element, nodes.pictures)),
+            "rating_tuple": lambda: parse_rating(map(Element, nodes.rating)),
+            "total_ratings": lambda: field("rating_tuple")[0],
+            "rating": lambda: field("rating_tuple")[-1],
+            "servings": lambda: data_item("recipeYield"),
+            "servings_value": lambda: parse_value(servings_regex, field("servings")),
+            "servings_unit": lambda: parse_unit(servings_regex, field("servings")),
+            "total_cooking_time": lambda: data_item("totalTime").lower(),
+            "total_cooking_time_value": lambda: parse_value(
+                total_cooking_time_regex, field("total_cooking_time")
+            ),
+            "total_cooking_time_unit": lambda: parse_unit(
+                total_cooking_time_regex, field("total_cooking_time")
+            ),
+            "author_name": lambda: data_item("name"),
+        }
+        return {name: field(name) for name in names}
+
+    def scrape_recipe(self) -> Recipe:
+        """fills the recipe from the json-ld block of the page and only
+        extracts the fields that it lacks from the document, which is
+        not parsed at all when nothing is missing"""
+        data = {"id": self.get_recipe_id(), "url": self.url}
+        recipe = find_json_ld_object(
+            self.response.content, "Recipe", self.get_encoding()
+        )
+        if recipe:
+            data.update(parse_json_ld_recipe(recipe))
+
+        missing = [name for name in recipe_fields if name not in data]
+        if missing:
+            data.update(self.extract_fields(missing, data))
+
+        return Recipe(**data)
+
+
+def scrape_recipe_page(url: str, content: bytes, encoding: Optional[str]) -> dict:
+    """scrapes a recipe from the raw body of its page, returning it as
+    a dict so that it can be sent back from another process"""
+    response = Response()
+    response.url = url
+    response.status_code = 200
+    response._content = content
+    response.encoding = encoding
+    data = RecipeScraper(url, response, encoding).scrape_recipe().to_dict()
+    # empty lists are left as model lists, whose classes cannot be pickled
+    return {
+        name: list(value) if isinstance(value, list) else value
+        for name, value in data.items()
+    }
+
+
+def parse_json_ld_recipe(data: dict) -> dict:
+    """maps a schema.org Recipe onto the fields of :py:class:`Recipe`.
+
+    Fields are left out when the json-ld is poorer than the page, so
+    that they are extracted from the document instead. The directions
+    are only taken when the instructions have sections, either as
+    ``HowToSection`` items or as steps ending with a colon, as the page
+    may title them with ``<h3>`` elements that the json-ld lacks. The
+    pictures are only taken when ``image`` lists several of them along
+    with their sizes, rather than just the cover photo.
+    """
+    fields = {}
+    title = unescape(str(data.get("name") or "")).strip()
+    if title:
+        fields["title"] = title
+
+    author = data.get("author")
+    if isinstance(author, list) and author:
+        author = author[0]
+    if isinstance(author, dict):
+        author = author.get("name")
+    if author:
+        fields["author_name"] = unescape(str(author)).strip()
+
+    aggregate_rating = data.get("aggregateRating")
+    if isinstance(aggregate_rating, dict):
+        try:
+            fields["total_ratings"] = int(aggregate_rating["reviewCount"])
+            fields["rating"] = Decimal(str(aggregate_rating["ratingValue"]))
+        except (KeyError, TypeError, ValueError, ArithmeticError):
+            fields.pop("total_ratings", None)
+
+    ingredients = data.get("recipeIngredient")
+    if title and isinstance(ingredients, list) and ingredients:
+        fields["ingredients"] = parse_json_ld_steps(ingredients, title, Ingredient)
+
+    instructions = data.get("recipeInstructions")
+    if isinstance(instructions, (str, dict)):
+        instructions = [instructions]
+    if title and isinstance(instructions, list):
+        directions = parse_json_ld_steps(instructions, title, Direction)
+        if any(direction.step != title for direction in directions):
+            fields["directions"] = directions
+
+    pictures = parse_json_ld_pictures(data.get("image"))
+    if len(pictures) > 1 and all(
+        picture.width > 0 and picture.height > 0 for picture in pictures
+    ):
+        fields["pictures"] = pictures
+
+    servings = parse_json_ld_yield(data.get("recipeYield"))
+    if servings:
+        fields["servings"] = servings
+        fields["servings_value"] = parse_value(servings_regex, servings)
+        fields["servings_unit"] = parse_unit(servings_regex, servings)
+
+    total_cooking_time = parse_json_ld_duration(data.get("totalTime"))
+    if total_cooking_time:
+        fields["total_cooking_time"] = total_cooking_time
+        fields["total_cooking_time_value"] = parse_value(
+            total_cooking_time_regex, total_cooking_time
+        )
+        fields["total_cooking_time_unit"] = parse_unit(
+            total_cooking_time_regex, total_cooking_time
+        )
+
+    return fields
+
+
+def parse_json_ld_steps(items, title: str, model):
+    """turns a flat list such as ``["Massa:", "2 ovos"]`` into steps,
+    where items ending with a colon are the titles of the next ones.
+
+    Items may also be ``HowToStep`` objects, or ``HowToSection`` ones
+    whose name is the title of their ``itemListElement``.
+    """
+    steps = model.List([])
+    current_step = title
+    for item in items:
+        if isinstance(item, dict) and "itemListElement" in item:
+            name = unescape(str(item.get("name") or "")).strip().rstrip(":")
+            sections = item["itemListElement"]
+            if not isinstance(sections, list):
+                sections = [sections]
+            steps.extend(parse_json_ld_steps(sections, name or current_step, model))
+            continue
+        if isinstance(item, dict):
+            item = item.get("text") or item.get("name") or ""
+
+        text = unescape(str(item)).strip()
+        if text.endswith(":"):
+            current_step = text.rstrip(":")
+        elif text:
+            steps.append(model(step=current_step, name=text))
+
+    return steps
+
+
+def parse_json_ld_pictures(images) -> Picture.List:
+    """maps the urls or ``ImageObject`` items of ``image`` onto pictures,
+    taking their size from the url when the object does not have one"""
+    if isinstance(images, (str, dict)):
+        images = [images]
+
+    pictures = Picture.List([])
+    for image in images if isinstance(images, list) else []:
+        description = ""
+        width = height = -1
+        if isinstance(image, dict):
+            description = image.get("caption") or image.get("name") or ""
+            width = try_int(image.get("width"))
+            height = try_int(image.get("height"))
+            image = image.get("url") or image.get("contentUrl")
+        if not image:
+            continue
+
+        url = str(image)
+        if width < 0 or height < 0:
+            width, height = extract_image_size_from_url(url)
+        pictures.append(
+            Picture(description=description, url=url, width=width, height=height)
+        )
+
+    return pictures
+
+
+def parse_json_ld_yield(value) -> Optional[str]:
+    """returns the servings text of ``recipeYield``, which is either a
+    number of servings or text such as ``"20 porções"``"""
+    if isinstance(value, list):
+        # e.g.: ["20", "20 porções"]
+        value = max(value, key=lambda item: len(str(item)), default=None)
+    if value is None or isinstance(value, bool):
+        return None
+
+    text = unescape(str(value)).strip()
+    if re.fullmatch(r"[\d.]+", text):
+        return f"{text} {json_ld_servings_unit}"
+
+    return text or None
+
+
+def parse_json_ld_duration(value) -> Optional[str]:
+    """turns a duration such as ``PT1H30M`` into the ``"90 min"`` shown
+    by the page"""
+    found = iso_duration_regex.match(str(value or "").strip().upper())
+    if not found:
+        return None
+
+    parts = {name: int(number or 0) for name, number in found.groupdict().items()}
+    minutes = (
+        parts["days"] * 24 * 60
+        + parts["hours"] * 60
+        + parts["minutes"]
+        + parts["seconds"] // 60
+    )
+    if not minutes:
+        return None
+
+    return f"{minutes} min"
+
+
+def parse_rating(elements) -> Tuple[int, Decimal]:
+    parts = [x.text for x in elements]
+    if not parts:
+        return -1, Decimal("-1")
+
+    return int(parts[0]), Decimal(parts[-1])
+
+
+def parse_data_item(element: Optional[Element]) -> str:
+    if element:
+        return re.sub(r"\s+", " ", element.text)
+
+    return ""
+
+
+def parse_value(regex, text: str) -> Decimal:
+    found = regex.search(text)
+    if found and found.group("value"):
+        return Decimal(found.group("value"))
+
+    return Decimal("-1")
+
+
+def parse_unit(regex, text: str) -> str:
+    found = regex.search(text)
+    if found and found.group("unit"):
+        return found.group("unit")
+
+    return text
+
 
 def parse_url_params(url):
     result = urlparse(url)
@@ -304,7 +723,7 @@ def parse_url_params(url):
 def try_int(value) -> int:
     try:
         return int(value)
-    except ValueError:
+    except (TypeError, ValueError):
         return -1
 
 
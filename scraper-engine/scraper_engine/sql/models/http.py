@@ -1,8 +1,15 @@
 import json
-import io
 import requests
 from chemist import Model, db
 from datetime import datetime
+from typing import BinaryIO, Tuple
+from dateutil.parser import parse as parse_date
+from requests.structures import CaseInsensitiveDict
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from scraper_engine import compression
+from scraper_engine.config import config
+from scraper_engine.util import detect_encoding, generate_cache_key
 from .base import metadata
 
 
@@ -18,23 +25,42 @@ class HttpInteraction(Model):
         "http_interaction",
         metadata,
         db.Column("id", db.Integer, primary_key=True),
-        db.Column("request_url", db.String(255), nullable=False, unique=True),
+        db.Column("cache_key", db.String(64), nullable=False, unique=True, index=True),
+        db.Column("request_url", db.UnicodeText(), nullable=False),
         db.Column("request_method", db.String(10), nullable=False),
         db.Column("request_headers", db.UnicodeText()),
         db.Column("request_params", db.UnicodeText()),
         db.Column("request_body", db.UnicodeText()),
         db.Column("response_status", db.Integer),
         db.Column("response_headers", db.UnicodeText()),
-        db.Column("response_body", db.UnicodeText()),
+        db.Column("response_body", db.LargeBinary()),
+        db.Column("response_body_codec", db.String(10)),
+        db.Column("etag", db.String(255)),
+        db.Column("last_modified", db.String(64)),
         db.Column("created_at", db.DateTime, default=datetime.utcnow),
         db.Column("updated_at", db.DateTime, default=datetime.utcnow),
+        db.Column("expires_at", db.DateTime, index=True),
     )
 
+    def response_content(self) -> bytes:
+        return compression.decompress(
+            self.get("response_body"), self.response_body_codec
+        )
+
+    def response_stream(self) -> BinaryIO:
+        """the response body as a stream decompressed while it is read"""
+        return compression.open_decompressed(
+            self.get("response_body"), self.response_body_codec
+        )
+
     def response(self) -> requests.Response:
         response = requests.Response()
         response.status_code = self.response_status
-        response.raw = io.BytesIO(bytes(self.response_body, "utf-8"))
-        response.headers = load_json(self.response_headers, {})
+        response.url = self.request_url
+        response.headers = CaseInsensitiveDict(load_json(self.response_headers, {}))
+        response._content = self.response_content()
+        # from the body itself rather than with chardet on .text
+        response.encoding = detect_encoding(response.headers, response._content)
         return response
 
     def request(self) -> requests.Request:
@@ -51,31 +77,165 @@ class HttpInteraction(Model):
         request.headers = load_json(self.request_headers)
         return request
 
+    def conditional_headers(self) -> dict:
+        """headers that make the server reply with 304 Not Modified if
+        the stored response is still current"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def is_fresh(self, now: datetime = None) -> bool:
+        """whether the stored response can be used without asking the
+        server first"""
+        expires_at = self.get("expires_at")
+        if isinstance(expires_at, str):
+            expires_at = parse_date(expires_at)
+
+        return bool(expires_at and expires_at > (now or datetime.utcnow()))
+
+    def touch(self, expires_at: datetime = None):
+        data = dict(updated_at=datetime.utcnow())
+        if expires_at:
+            data["expires_at"] = expires_at
+        return self.update_and_save(**data)
+
     @classmethod
-    def get_by_requests_request(model, request: requests.Request):
-        return model.get_by_url_and_method(
-            method=request.method,
+    def cache_key_for_request(cls, request: requests.Request) -> str:
+        # works with both requests.Request and requests.PreparedRequest
+        return generate_cache_key(
             url=request.url,
+            method=request.method,
+            json_body=getattr(request, "json", None) or getattr(request, "body", None),
+            params=getattr(request, "params", None),
+            headers=request.headers,
         )
 
     @classmethod
-    def get_by_url_and_method(cls, url: str, method: str):
-        return cls.find_one_by(
-            request_url=url,
-            request_method=method,
+    def get_by_cache_key(cls, cache_key: str):
+        return cls.find_one_by(cache_key=cache_key)
+
+    @classmethod
+    def get_by_requests_request(model, request: requests.Request):
+        return model.get_by_cache_key(model.cache_key_for_request(request))
+
+    @classmethod
+    def get_by_url_and_method(
+        cls, url: str, method: str, params: dict = None, headers: dict = None
+    ):
+        return cls.get_by_cache_key(
+            generate_cache_key(url, method, params=params, headers=headers)
         )
 
     @classmethod
-    def upsert(cls, request: requests.Request, response: requests.Response):
-        interaction = cls.get_or_create(
+    def exchange_data(
+        cls,
+        request: requests.Request,
+        response: requests.Response,
+        cache_key: str = None,
+        expires_at: datetime = None,
+        compressed_body: bytes = None,
+    ) -> dict:
+        """returns the column values that store ``response`` to ``request``.
+
+        Bodies are compressed with ``config.http_cache_body_codec``.
+        ``compressed_body`` is the body already compressed with it, for
+        responses whose content was streamed.
+        """
+        codec = config.http_cache_body_codec
+        if compressed_body is None:
+            compressed_body = compression.compress(response.content, codec)
+        now = datetime.utcnow()
+        return dict(
+            cache_key=cache_key or cls.cache_key_for_request(request),
             request_url=request.url,
             request_method=request.method,
-        )
-
-        return interaction.update_and_save(
             request_headers=json.dumps(dict(request.headers)),
             request_body=request.body,
             response_headers=json.dumps(dict(response.headers)),
             response_status=response.status_code,
-            response_body=response.text,
+            response_body=compressed_body,
+            response_body_codec=codec,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            created_at=now,
+            updated_at=now,
+            expires_at=expires_at,
+        )
+
+    @classmethod
+    def upsert(
+        cls,
+        request: requests.Request,
+        response: requests.Response,
+        cache_key: str = None,
+        expires_at: datetime = None,
+        compressed_body: bytes = None,
+    ):
+        """inserts or updates the interaction stored under ``cache_key``,
+        which defaults to the key of ``request``.
+
+        Callers that followed redirects should pass the key of the url
+        they originally asked for, as ``request.url`` is the final one.
+        """
+        data = cls.exchange_data(
+            request, response, cache_key, expires_at, compressed_body
+        )
+        statement = insert(cls.table).values(data)
+        statement = statement.on_conflict_do_update(
+            index_elements=[cls.table.c.cache_key],
+            set_=dict(
+                (name, statement.excluded[name])
+                for name in data
+                if name not in ("cache_key", "created_at")
+            ),
+        ).returning(*cls.table.c)
+
+        manager = cls.objects()
+        with manager.engine.begin() as conn:
+            return manager.many_from_result_proxy(conn.execute(statement))[0]
+
+    @classmethod
+    def delete_expired(cls, batch_size: int, now: datetime = None) -> int:
+        """deletes up to ``batch_size`` expired interactions and returns
+        how many were deleted"""
+        table = cls.table
+        expired = (
+            select([table.c.id])
+            .where(table.c.expires_at < (now or datetime.utcnow()))
+            .limit(batch_size)
+        )
+        statement = table.delete().where(table.c.id.in_(expired))
+        with cls.objects().engine.begin() as conn:
+            return conn.execute(statement).rowcount
+
+    @classmethod
+    def delete_oldest(cls, batch_size: int) -> Tuple[int, int]:
+        """deletes the ``batch_size`` interactions that expire first and
+        returns how many were deleted and how many bytes of response
+        bodies were freed"""
+        table = cls.table
+        oldest = (
+            select([table.c.id])
+            .order_by(table.c.expires_at.asc().nullsfirst())
+            .limit(batch_size)
+        )
+        statement = (
+            table.delete()
+            .where(table.c.id.in_(oldest))
+            .returning(func.coalesce(func.octet_length(table.c.response_body), 0))
+        )
+        with cls.objects().engine.begin() as conn:
+            sizes = [size for (size,) in conn.execute(statement)]
+        return len(sizes), sum(sizes)
+
+    @classmethod
+    def total_body_size(cls) -> int:
+        table = cls.table
+        query = select(
+            [func.coalesce(func.sum(func.octet_length(table.c.response_body)), 0)]
         )
+        with cls.objects().engine.connect() as conn:
+            return int(conn.execute(query).scalar())
@@ -1,16 +1,19 @@
 import io
 import json
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
 
 import requests
+from blinker import signal
 from chemist import db, Model
 from dateutil.parser import parse as parse_date
-
-from scraper_engine.networking import connect_to_elasticsearch
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 from .base import metadata
 
-es = connect_to_elasticsearch()
+# consumed by scraper_engine.indexing.RecipeIndexer
+scraped_recipe_saved = signal("scraped-recipe-saved")
 
 
 class ScrapedRecipe(Model):
@@ -41,14 +44,60 @@ class ScrapedRecipe(Model):
         self.updated_at = datetime.utcnow()
 
     def post_save(self, transaction):
-        if not es:
-            # ignore when elasticsearch is not available
-            return
+        scraped_recipe_saved.send(self, recipe_id=self.id)
 
+    def to_search_document(self) -> dict:
         data = self.to_ui_dict()
         data.update(self.to_dict())
         data.pop("json_data", None)
-        es.index(index="recipes", id=self.id, body=data)
+        return data
+
+    @classmethod
+    def bulk_upsert(
+        cls, recipes: Iterable[Union[dict, object]]
+    ) -> List["ScrapedRecipe"]:
+        """inserts or updates many recipes with a single ``INSERT ... ON
+        CONFLICT (url) DO UPDATE`` statement.
+
+        Accepts dicts in the format returned by ``Recipe.to_sql_data()``
+        or objects that implement that method.
+        """
+        statement = cls.bulk_upsert_statement(recipes)
+        if statement is None:
+            return []
+
+        manager = cls.objects()
+        with manager.engine.begin() as conn:
+            saved = manager.many_from_result_proxy(conn.execute(statement))
+
+        for recipe in saved:
+            recipe.post_save(None)
+
+        return saved
+
+    @classmethod
+    def bulk_upsert_statement(cls, recipes: Iterable[Union[dict, object]]):
+        """returns the statement executed by :py:meth:`bulk_upsert`, or
+        ``None`` when there are no recipes"""
+        now = datetime.utcnow()
+        rows = {}
+        for recipe in recipes:
+            data = recipe if isinstance(recipe, dict) else recipe.to_sql_data()
+            # postgres refuses to update the same row twice in one statement
+            rows[data["url"]] = dict(data, created_at=now, updated_at=now)
+
+        if not rows:
+            return None
+
+        statement = insert(cls.table).values(list(rows.values()))
+        return statement.on_conflict_do_update(
+            index_elements=[cls.table.c.url],
+            set_=dict(
+                (name, statement.excluded[name])
+                for name in cls.table.c.keys()
+                if name not in ("id", "url", "created_at")
+            ),
+        ).returning(*cls.table.c)
 
     def to_ui_dict(self):
         if self.json_data:
@@ -59,6 +108,15 @@ class ScrapedRecipe(Model):
     def last_updated(self):
         return parse_date(self.updated_at)
 
+    @classmethod
+    def get_updated_at_by_url(cls, urls: Iterable[str]) -> Dict[str, datetime]:
+        table = cls.table
+        query = select([table.c.url, table.c.updated_at]).where(
+            table.c.url.in_(list(urls))
+        )
+        with cls.objects().engine.connect() as conn:
+            return dict(conn.execute(query).fetchall())
+
 
 class ScrapedSiteMap(Model):
     table = db.Table(
@@ -67,4 +125,30 @@ class ScrapedSiteMap(Model):
         db.Column("id", db.Integer, primary_key=True),
         db.Column("url", db.String(255), nullable=False, unique=True),
         db.Column("last_modified", db.DateTime),
+        db.Column("crawled_at", db.DateTime),
     )
+
+    @classmethod
+    def has_changed(cls, url: str, last_modified: Optional[datetime]) -> bool:
+        """whether the sitemap at ``url`` changed since it was last
+        crawled, according to its ``<lastmod>``"""
+        if last_modified is None:
+            return True
+
+        found = cls.find_one_by(url=url)
+        crawled = found and found.get("last_modified")
+        return not crawled or last_modified > crawled
+
+    @classmethod
+    def mark_crawled(cls, url: str, last_modified: Optional[datetime]):
+        data = dict(url=url, last_modified=last_modified, crawled_at=datetime.utcnow())
+        statement = insert(cls.table).values(data)
+        statement = statement.on_conflict_do_update(
+            index_elements=[cls.table.c.url],
+            set_=dict(
+                last_modified=statement.excluded.last_modified,
+                crawled_at=statement.excluded.crawled_at,
+            ),
+        )
+        with cls.objects().engine.begin() as conn:
+            conn.execute(statement)
@@ -1,9 +1,15 @@
+import asyncio
+import codecs
+import functools
+import hashlib
 import json
 import logging
 import re
 from hashlib import sha1
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Iterable, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import yaml
 from chemist import Model as SQLModel
@@ -11,6 +17,18 @@ from uiclasses import Model as UIModel
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# request headers that select a different representation of the same url
+CACHE_KEY_HEADERS = ("accept", "accept-language")
+
+# how far into a page to look for a <meta charset>, more lenient than
+# the 1024 bytes of the html spec as pages often start with scripts
+ENCODING_SNIFF_LIMIT = 4096
+
+content_type_charset_regex = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+meta_charset_regex = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+
 GITHUB_PULL_REQUEST_REGEX = re.compile(
     r"github.com[/](?P<owner>[^/]+)[/](?P<repo>[^/]+)[/]pull[/](?P<pr_number>\d+)"
 )
@@ -157,3 +175,151 @@ def try_int(value: Union[str, int]) -> Optional[int]:
         return int(value)
     except (TypeError, ValueError):
         return
+
+
+async def run_in_thread(func: callable, *args, **kw):
+    """runs a blocking callable in the default executor of the running
+    event loop so that it does not stall other coroutines"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kw))
+
+
+def normalize_url(url: str, params: Optional[dict] = None) -> str:
+    """returns a canonical form of ``url`` so that equivalent urls
+    share the same cache key: lowercase scheme and host, no default
+    port, no fragment and query parameters (merged with ``params``)
+    sorted by name"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    for key, value in (params or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        query.extend((key, str(v)) for v in values if v is not None)
+
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def hash_dict(data: dict, algo: callable = hashlib.sha256) -> str:
+    parts = sorted((str(k), str(v)) for k, v in data.items() if v is not None)
+    if not parts:
+        return ""
+
+    result = algo()
+    for key, value in parts:
+        result.update(f"{key}={value}\n".encode("utf-8"))
+
+    return result.hexdigest()
+
+
+def generate_cache_key(
+    url: str,
+    method: str,
+    json_body: Union[dict, str, bytes, None] = None,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    algo: callable = hashlib.sha256,
+) -> str:
+    """returns a fixed-width hex digest that identifies a request by its
+    method, normalized url, parameters, body and the headers listed in
+    ``CACHE_KEY_HEADERS``"""
+    headers = dict(
+        (key.lower(), value)
+        for key, value in (headers or {}).items()
+        if key.lower() in CACHE_KEY_HEADERS
+    )
+    if headers.get("accept") == "*/*":
+        # same as not sending the header at all
+        del headers["accept"]
+
+    if isinstance(json_body, dict):
+        json_body = json.dumps(json_body, sort_keys=True)
+    if isinstance(json_body, str):
+        json_body = json_body.encode("utf-8")
+
+    result = algo()
+    for part in (
+        method.upper().encode("utf-8"),
+        normalize_url(url, params).encode("utf-8"),
+        hash_dict(headers, algo).encode("utf-8"),
+        json_body or b"",
+    ):
+        result.update(part)
+        result.update(b"\0")
+
+    return result.hexdigest()
+
+
+def chunked(items: Iterable, size: int) -> Iterable[list]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def memoized_method(method: callable) -> callable:
+    """caches the result of a method without arguments in the instance
+    itself, so that unlike ``functools.lru_cache`` it does not keep the
+    instance alive and is released along with it"""
+    key = f"_memoized_{method.__name__}"
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return self.__dict__[key]
+        except KeyError:
+            value = self.__dict__[key] = method(self)
+            return value
+
+    return wrapper
+
+
+def get_known_encoding(name: Union[str, bytes, None]) -> Optional[str]:
+    if isinstance(name, bytes):
+        name = name.decode("ascii", errors="ignore")
+    if not name:
+        return None
+
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+
+    return name.lower()
+
+
+def get_declared_encoding(headers: dict) -> Optional[str]:
+    """returns the charset of the ``Content-Type`` header, without the
+    iso-8859-1 that ``requests`` assumes for any text response"""
+    found = content_type_charset_regex.search(headers.get("content-type") or "")
+    return found and get_known_encoding(found.group(1))
+
+
+def sniff_encoding(content: bytes) -> Optional[str]:
+    """looks for a byte order mark or a ``<meta charset>`` at the start
+    of a page, without decoding it"""
+    if content.startswith(codecs.BOM_UTF8):
+        return "utf-8"
+
+    found = meta_charset_regex.search(content, 0, ENCODING_SNIFF_LIMIT)
+    return found and get_known_encoding(found.group(1))
+
+
+def detect_encoding(headers: dict, content: bytes) -> Optional[str]:
+    """returns the encoding of a response body in the order of the html
+    spec: byte order mark, declared charset and then ``<meta charset>``.
+
+    Unlike ``Response.text`` it never falls back to guessing the
+    encoding from the whole body with chardet.
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return "utf-8"
+
+    return get_declared_encoding(headers) or sniff_encoding(content)
@@ -1,2 +1,5 @@
 from .get_recipe import GetRecipeWorker
-from .queue import QueueServer, QueueClient
+from .parser import RecipeParserPool
+from .queue import QueueServer, QueueClient, StreamingQueueServer
+from .sources import RedisJobSource, ZmqJobSource
+from .sweeper import HttpCacheSweeper
@@ -1,13 +1,42 @@
+import asyncio
 from datetime import datetime, timedelta
 
+from scraper_engine.config import config
+from scraper_engine.http.freshness import get_ttl
+from scraper_engine.http.retry import is_transient
 from scraper_engine.sql.models import ScrapedRecipe
+from scraper_engine.util import run_in_thread
 
+from .parser import RecipeParserPool, get_shared_parser_pool
 from .puller import PullerWorker
+from .writer import RecipeWriteBuffer
 
 
 class GetRecipeWorker(PullerWorker):
     __log_name__ = "recipe-scraper"
 
+    def __init__(self, *args, parser: RecipeParserPool = None, **kw):
+        super().__init__(*args, **kw)
+        # jobs wait for the flush of their recipe before they are acked,
+        # so a full window of waiting jobs must be enough to flush
+        self.writer = RecipeWriteBuffer(
+            max_size=min(config.recipe_write_batch_size, self.max_in_flight)
+        )
+        # the pool is sized by the cpus rather than by the workers, so
+        # workers of the same process always share one
+        self.parser = parser or get_shared_parser_pool()
+
+    async def run(self):
+        flusher = asyncio.ensure_future(self.writer.run())
+        try:
+            await super().run()
+        finally:
+            flusher.cancel()
+            await self.writer.close()
+            self.logger.info(
+                f"deduplicated {self.api.single_flight.deduplicated} concurrent requests"
+            )
+
     async def process_job(self, info: dict):
         recipe_url = info.get("recipe_url")
 
@@ -22,10 +51,22 @@ class GetRecipeWorker(PullerWorker):
 
         await self.fetch_data(recipe_url)
 
+    async def is_fresh(self, recipe: ScrapedRecipe) -> bool:
+        """a recipe is fresh while the cached copy of its page is, or,
+        when that page is not cached, for as long as the configured
+        ttl for its url"""
+        interaction = await run_in_thread(
+            self.api.cache.get_by_url_and_method, url=recipe.url, method="GET"
+        )
+        if interaction:
+            return interaction.is_fresh()
+
+        ttl = get_ttl(recipe.url, {}) or 0
+        return recipe.last_updated > datetime.utcnow() - timedelta(seconds=ttl)
+
     async def fetch_data(self, url: str):
-        existing_recipe = ScrapedRecipe.find_one_by(url=url)
-        some_time_ago = datetime.utcnow() - timedelta(days=1)
-        if existing_recipe and existing_recipe.last_updated > some_time_ago:
+        existing_recipe = await run_in_thread(ScrapedRecipe.find_one_by, url=url)
+        if existing_recipe and await self.is_fresh(existing_recipe):
             self.logger.info(
                 f"skipping recipe {existing_recipe.id} already downloaded: {url}"
             )
@@ -33,10 +74,15 @@ class GetRecipeWorker(PullerWorker):
 
         try:
             self.logger.info(f"scraping recipe {url}")
-            recipe = self.api.get_recipe(url)
+            recipe = await self.api.get_recipe(url, parser=self.parser)
         except Exception as e:
+            if is_transient(e):
+                # leave the job unacknowledged so that it can be retried later
+                raise
+
             self.logger.exception(f"failed to retrieve recipe {url}")
             return
 
-        recipe.save()
-        self.logger.info(f"saved recipe {recipe}")
+        # raises when the batch fails to save, leaving the job unacknowledged
+        await (await self.writer.add(recipe))
+        self.logger.info(f"scraped recipe {recipe}")
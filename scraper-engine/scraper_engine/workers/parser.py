@@ -0,0 +1,97 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from requests import Response
+
+from scraper_engine.config import config
+from scraper_engine.logs import get_logger
+from scraper_engine.sites.tudo_gostoso.models import Recipe
+from scraper_engine.sites.tudo_gostoso.scrapers import scrape_recipe_page
+from scraper_engine.util import detect_encoding
+
+
+class RecipeParserPool(object):
+    """parses recipe pages in a pool of ``max_workers`` processes so
+    that the cpu bound parsing neither blocks the event loop that
+    fetches pages nor is limited to a single core.
+
+    Pages are sent as raw bytes and recipes come back as dicts. With
+    ``max_workers`` set to 0 pages are parsed within the event loop.
+    """
+
+    def __init__(self, max_workers: int = config.recipe_parser_processes):
+        self.logger = get_logger("recipe-parser-pool")
+        self.max_workers = max(0, max_workers)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        # forking would copy the locks held by the threads of the
+        # worker, such as the recipe indexer's
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = self.create_executor()
+
+            return self.executor
+
+    def replace_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """replaces the ``broken`` pool with a new one, unless another
+        parse already did, so that each broken pool is only replaced
+        once however many parses it failed"""
+        with self.lock:
+            if self.executor is broken:
+                broken.shutdown(wait=False)
+                self.executor = None
+
+        return self.get_executor()
+
+    async def parse(self, url: str, response: Response) -> Recipe:
+        content = response.content
+        args = (url, content, detect_encoding(response.headers, content))
+        if not self.max_workers:
+            return Recipe(**scrape_recipe_page(*args))
+
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        try:
+            data = await loop.run_in_executor(executor, scrape_recipe_page, *args)
+        except BrokenProcessPool:
+            # a parser process died (e.g.: killed for using too much
+            # memory), so start a new pool and try once more
+            self.logger.warning(f"parser pool broken while parsing {url}")
+            data = await loop.run_in_executor(
+                self.replace_executor(executor), scrape_recipe_page, *args
+            )
+
+        return Recipe(**data)
+
+    def close(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# the pool of the workers that were not given one
+shared_parser_pool: Optional[RecipeParserPool] = None
+
+
+def get_shared_parser_pool() -> RecipeParserPool:
+    """returns the :py:class:`RecipeParserPool` shared by every worker
+    of this process that was not given its own, so that starting many
+    workers does not start a pool of processes for each of them"""
+    global shared_parser_pool
+    if shared_parser_pool is None:
+        shared_parser_pool = RecipeParserPool()
+    return shared_parser_pool
@@ -1,11 +1,12 @@
 import asyncio
 from collections import defaultdict
+from typing import Any, List, Tuple
 
-import zmq
+from scraper_engine.config import config
 from scraper_engine.logs import get_logger
-from scraper_engine.sites.tudo_gostoso import TudoGostosoClient
+from scraper_engine.sites.tudo_gostoso import AsyncTudoGostosoClient
 
-from .base import context
+from .sources import ZmqJobSource
 
 
 class PullerWorker(object):
@@ -15,31 +16,35 @@ class PullerWorker(object):
         self,
         pull_connect_address: str,
         worker_id: str,
-        high_watermark: int = 1,
+        high_watermark: int = None,
         wait_timeout: int = 5,
+        max_in_flight: int = config.max_workers_per_process,
+        source=None,
     ):
         self.logger = get_logger(f"{self.__log_name__}:{worker_id}")
 
         self.pull_connect_address = pull_connect_address
         self.should_run = True
-        self.wait_timeout = wait_timeout
-        self.poller = zmq.asyncio.Poller()
-        self.queue = context.socket(zmq.PULL)
-        self.queue.set_hwm(high_watermark)
-
-        self.poller.register(self.queue, zmq.POLLIN)
-        self.api = TudoGostosoClient()
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = set()
+        # let the source prefetch the next batch while the current one runs
+        self.source = source or ZmqJobSource(
+            pull_connect_address,
+            high_watermark=high_watermark or self.max_in_flight,
+            wait_timeout=wait_timeout,
+        )
+        self.api = AsyncTudoGostosoClient()
 
     def handle_exception(self, e):
         self.logger.exception(f"{self.__class__.__name__} interrupted by error")
 
     def connect(self):
-        self.logger.info(f"Connecting to pull address: {self.pull_connect_address}")
-        self.queue.connect(self.pull_connect_address)
+        self.logger.info(f"Connecting to {self.source}")
+        self.source.connect()
 
     async def run(self):
         self.connect()
-        self.logger.info(f"Starting worker")
+        self.logger.info(f"Starting worker with up to {self.max_in_flight} jobs")
         while self.should_run:
             try:
                 await self.loop_once()
@@ -47,25 +52,49 @@ class PullerWorker(object):
                 self.handle_exception(e)
                 break
 
+        await self.wait_in_flight()
+        await self.api.close()
+        self.source.close()
+
     async def loop_once(self):
         await self.process_queue()
 
-    async def pull_queue(self):
+    async def pull_queue(self, max_count: int = 1) -> List[Tuple[Any, dict]]:
         self.logger.debug(f"Waiting for job")
-        socks = dict(await self.poller.poll(1000 * self.wait_timeout))
-        if self.queue in socks and socks[self.queue] == zmq.POLLIN:
-            return await self.queue.recv_json()
+        return await self.source.pull(max_count)
 
     async def process_queue(self):
-        info = await self.pull_queue() or {}
-        if not info:
-            return
+        if len(self.in_flight) >= self.max_in_flight:
+            await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+        available = self.max_in_flight - len(self.in_flight)
+        for token, info in await self.pull_queue(available):
+            if info:
+                self.start_job(info, token)
+            else:
+                await self.source.ack(token)
 
+    def start_job(self, info: dict, token: Any = None) -> asyncio.Task:
+        task = asyncio.ensure_future(self.execute_job(info, token))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+        return task
+
+    async def execute_job(self, info: dict, token: Any = None):
         self.logger.debug(f"processing job")
         try:
             await self.process_job(info)
         except Exception:
+            # left unacknowledged so that durable sources redeliver it
             self.logger.exception(f"failed to process job {info}")
+            return
+
+        await self.source.ack(token)
+
+    async def wait_in_flight(self):
+        if self.in_flight:
+            self.logger.info(f"waiting for {len(self.in_flight)} jobs to finish")
+            await asyncio.gather(*self.in_flight)
 
     async def process_job(self, job):
         raise NotImplementedError
@@ -1,11 +1,14 @@
 import asyncio
+import json
 import logging
 import time
 from collections import defaultdict
+from typing import Callable, Iterable, List, Optional, Tuple
 
 import zmq
 import zmq.asyncio
 from scraper_engine.logs import get_logger
+from scraper_engine.util import chunked
 from scraper_engine.sites.tudo_gostoso import TudoGostosoClient
 
 from .base import context
@@ -15,6 +18,29 @@ from .base import context
 # except that it uses a REP socket instead of a subscriber socket,
 # this way it can block clients from enqueueing more jobs that can be
 # processed.
+#
+# Besides single jobs, both servers accept batches in the form
+# {"id": <batch id>, "batch": [job, ...]} which are fanned out to the
+# PUSH socket one job at a time and acknowledged with
+# {"id": <batch id>, "count": <jobs accepted>, "rejected": [positions]}
+
+
+def unpack_request(data) -> Tuple[List[dict], dict]:
+    """returns the jobs carried by a request along with the reply
+    that should be sent back to the client"""
+    if not isinstance(data, dict) or "batch" not in data:
+        return [data], data
+
+    jobs = []
+    rejected = []
+    for position, job in enumerate(data.get("batch") or []):
+        if isinstance(job, dict) and job:
+            jobs.append(job)
+        else:
+            rejected.append(position)
+
+    reply = {"id": data.get("id"), "count": len(jobs), "rejected": rejected}
+    return jobs, reply
 
 
 class QueueClient(object):
@@ -30,16 +56,20 @@ class QueueClient(object):
         self.context = zmq.Context()
         self.socket = self.context.socket(zmq.REQ)
         self.socket.set_hwm(rep_high_watermark)
+        # DEALER socket used by send_many() to pipeline batches
+        self.pipeline = self.context.socket(zmq.DEALER)
         self.__connected__ = False
 
     def connect(self):
         self.logger.debug(f"connecting to {self.rep_connect_address}")
         self.socket.connect(self.rep_connect_address)
+        self.pipeline.connect(self.rep_connect_address)
         self.__connected__ = True
 
     def close(self):
         self.__connected__ = False
         self.socket.disconnect(self.rep_connect_address)
+        self.pipeline.disconnect(self.rep_connect_address)
 
     def send(self, job: dict):
         if not self.__connected__:
@@ -50,6 +80,55 @@ class QueueClient(object):
         self.logger.debug(f"{response}")
         return response
 
+    def send_many(
+        self,
+        jobs: Iterable[dict],
+        batch_size: int = 1000,
+        max_pending: int = 4,
+        on_ack: Optional[Callable[[int, int], None]] = None,
+    ) -> dict:
+        """enqueues jobs in batches of ``batch_size``, keeping up to
+        ``max_pending`` batches on the wire before waiting for their
+        acknowledgements.
+
+        ``on_ack`` is called with the offset and size of each batch as
+        it is acknowledged.
+
+        Returns the number of accepted jobs along with the positions of
+        the rejected ones within ``jobs``.
+        """
+        if not self.__connected__:
+            raise RuntimeError(f"{self} is not connected")
+
+        result = {"count": 0, "rejected": []}
+        offsets = {}
+
+        def receive_ack():
+            delimiter, payload = self.pipeline.recv_multipart()
+            ack = json.loads(payload)
+            offset, size = offsets.pop(ack["id"])
+            result["count"] += ack["count"]
+            result["rejected"].extend(offset + p for p in ack["rejected"])
+            self.logger.debug(f"batch {ack['id']} acknowledged: {ack['count']} jobs")
+            if on_ack is not None:
+                on_ack(offset, size)
+
+        offset = 0
+        for batch_id, batch in enumerate(chunked(jobs, max(1, batch_size))):
+            while len(offsets) >= max_pending:
+                receive_ack()
+
+            offsets[batch_id] = (offset, len(batch))
+            offset += len(batch)
+            request = json.dumps({"id": batch_id, "batch": batch})
+            # the empty delimiter frame emulates the envelope of a REQ socket
+            self.pipeline.send_multipart([b"", request.encode("utf-8")])
+
+        while offsets:
+            receive_ack()
+
+        return result
+
     def __del__(self):
         if self.__connected__:
             self.close()
@@ -116,18 +195,105 @@ class QueueServer(object):
             await self.push.send_json(data)
             return True
 
-    async def handle_request(self):
+    async def handle_request(self) -> List[dict]:
         socks = dict(await self.poller.poll(1000 * self.sleep_timeout))
         if self.rep in socks and socks[self.rep] == zmq.POLLIN:
             data = await self.rep.recv_json()
             if data:
-                await self.rep.send_json(data)
-                return data
+                jobs, reply = unpack_request(data)
+                await self.rep.send_json(reply)
+                return jobs
+
+        return []
 
     async def process_queue(self):
-        data = await self.handle_request()
-        if not data:
+        jobs = await self.handle_request()
+        if not jobs:
             await asyncio.sleep(self.sleep_timeout)
             return
-        self.logger.info(f"forwarding job {data}")
-        await self.push_job(data)
+
+        self.logger.info(f"forwarding {len(jobs)} jobs")
+        for data in jobs:
+            # already acknowledged jobs must not be dropped when the
+            # workers are busy, so wait until one of them takes it
+            while not await self.push_job(data) and self.should_run:
+                continue
+
+
+class StreamingQueueServer(QueueServer):
+    """event-driven variant of :py:class:`QueueServer`.
+
+    Rather than sleeping between iterations it waits for the request
+    socket to become readable, then drains up to ``batch_size``
+    requests at once. It binds a ROUTER socket, which speaks the same
+    protocol as REP from the point of view of REQ clients, but can hold
+    many requests before replying.
+
+    Each client is only acknowledged after its job was handed to the
+    PUSH socket, so clients are still blocked while workers are busy.
+    """
+
+    def __init__(
+        self,
+        rep_bind_address: str,
+        push_bind_address: str,
+        rep_high_watermark: int = 1000,
+        push_high_watermark: int = 1,
+        sleep_timeout: float = 0.1,
+        batch_size: int = 100,
+        log_level: int = logging.WARNING,
+    ):
+        super().__init__(
+            rep_bind_address,
+            push_bind_address,
+            rep_high_watermark=rep_high_watermark,
+            push_high_watermark=push_high_watermark,
+            sleep_timeout=sleep_timeout,
+            log_level=log_level,
+        )
+        self.batch_size = max(1, batch_size)
+        self.poller.unregister(self.rep)
+        self.rep.close()
+        self.rep = context.socket(zmq.ROUTER)
+        self.rep.set_hwm(rep_high_watermark)
+
+    async def run(self):
+        self.listen()
+        self.logger.info(f"Starting {self.__class__.__name__}")
+        while self.should_run:
+            try:
+                await self.loop_once()
+            except Exception as e:
+                self.handle_exception(e)
+                break
+        self.disconnect()
+
+    async def handle_request(self) -> List[List[bytes]]:
+        # the timeout only bounds how long it takes to notice that
+        # should_run became False, requests are handled as they arrive
+        if not await self.rep.poll(1000 * self.sleep_timeout, zmq.POLLIN):
+            return []
+
+        requests = [await self.rep.recv_multipart()]
+        while len(requests) < self.batch_size:
+            try:
+                requests.append(await self.rep.recv_multipart(zmq.NOBLOCK))
+            except zmq.Again:
+                break
+
+        return requests
+
+    async def process_queue(self):
+        requests = await self.handle_request()
+        if requests:
+            self.logger.info(f"forwarding {len(requests)} jobs")
+
+        for frames in requests:
+            envelope, payload = frames[:-1], frames[-1]
+            jobs, reply = unpack_request(json.loads(payload))
+            for data in filter(bool, jobs):
+                await self.push.send_json(data)
+
+            await self.rep.send_multipart(
+                envelope + [json.dumps(reply).encode("utf-8")]
+            )
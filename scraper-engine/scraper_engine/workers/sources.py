@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, List, Tuple
+
+import zmq
+import zmq.asyncio
+from scraper_engine.networking import RECIPE_QUEUE_REDIS_KEY, RedisQueueManager
+from scraper_engine.util import run_in_thread
+
+from .base import context
+
+# A job source hands jobs to a PullerWorker as (token, job) tuples,
+# the token is passed back to ack() once the job was processed.
+
+
+class ZmqJobSource(object):
+    """pulls jobs from the PUSH socket of a QueueServer.
+
+    Jobs are gone from the broker as soon as they are received, so
+    ack() is a no-op.
+    """
+
+    def __init__(
+        self,
+        pull_connect_address: str,
+        high_watermark: int = 1,
+        wait_timeout: int = 5,
+    ):
+        self.pull_connect_address = pull_connect_address
+        self.wait_timeout = wait_timeout
+        self.poller = zmq.asyncio.Poller()
+        self.queue = context.socket(zmq.PULL)
+        self.queue.set_hwm(high_watermark)
+        self.poller.register(self.queue, zmq.POLLIN)
+
+    def __str__(self):
+        return f"pull address: {self.pull_connect_address}"
+
+    def connect(self):
+        self.queue.connect(self.pull_connect_address)
+
+    async def pull(self, max_count: int = 1) -> List[Tuple[Any, dict]]:
+        socks = dict(await self.poller.poll(1000 * self.wait_timeout))
+        if self.queue not in socks or socks[self.queue] != zmq.POLLIN:
+            return []
+
+        jobs = [await self.queue.recv_json()]
+        while len(jobs) < max_count:
+            try:
+                jobs.append(await self.queue.recv_json(zmq.NOBLOCK))
+            except zmq.Again:
+                break
+
+        return [(None, job) for job in jobs]
+
+    async def ack(self, token):
+        pass
+
+    def close(self):
+        self.queue.close()
+
+
+class RedisJobSource(object):
+    """claims jobs from a sorted set managed by
+    :py:class:`~scraper_engine.networking.RedisQueueManager`.
+
+    Delivery is at-least-once: a claimed job that is not acknowledged
+    within ``visibility_timeout`` seconds, e.g. because the worker died,
+    is handed to the next worker that claims jobs.
+    """
+
+    def __init__(
+        self,
+        queue: RedisQueueManager,
+        key: str = RECIPE_QUEUE_REDIS_KEY,
+        visibility_timeout: float = 300,
+        wait_timeout: int = 1,
+    ):
+        self.queue = queue
+        self.key = key
+        self.visibility_timeout = visibility_timeout
+        self.wait_timeout = wait_timeout
+
+    def __str__(self):
+        return f"redis sorted set: {self.key}"
+
+    def connect(self):
+        pass
+
+    async def pull(self, max_count: int = 1) -> List[Tuple[Any, dict]]:
+        claimed = await run_in_thread(
+            self.queue.claim_jobs,
+            self.key,
+            count=max_count,
+            visibility_timeout=self.visibility_timeout,
+        )
+        if not claimed:
+            await asyncio.sleep(self.wait_timeout)
+
+        return claimed
+
+    async def ack(self, token):
+        await run_in_thread(self.queue.ack_job, self.key, token)
+
+    def close(self):
+        self.queue.close()
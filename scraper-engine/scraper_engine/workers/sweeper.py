@@ -0,0 +1,58 @@
+import threading
+
+from scraper_engine.config import config
+from scraper_engine.logs import get_logger
+from scraper_engine.sql import HttpInteraction
+
+logger = get_logger(__name__)
+
+
+class HttpCacheSweeper(object):
+    """deletes expired http interactions in batches of ``batch_size``,
+    then evicts the interactions that expire first until the stored
+    response bodies fit in ``max_bytes``"""
+
+    def __init__(
+        self,
+        batch_size: int = config.http_cache_sweep_batch_size,
+        max_bytes: int = config.http_cache_max_bytes,
+        interval: float = config.http_cache_sweep_interval,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def sweep(self) -> dict:
+        expired = 0
+        while not self.stopped.is_set():
+            deleted = HttpInteraction.delete_expired(self.batch_size)
+            expired += deleted
+            if deleted < self.batch_size:
+                break
+
+        evicted = 0
+        size = HttpInteraction.total_body_size()
+        while size > self.max_bytes and not self.stopped.is_set():
+            deleted, freed = HttpInteraction.delete_oldest(self.batch_size)
+            if not deleted:
+                break
+            size -= freed
+            evicted += deleted
+
+        logger.info(
+            f"http cache sweep: {expired} expired, {evicted} evicted, {size} bytes stored"
+        )
+        return {"expired": expired, "evicted": evicted, "size": size}
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("failed to sweep the http cache")
+
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
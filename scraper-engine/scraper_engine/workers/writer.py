@@ -0,0 +1,91 @@
+import asyncio
+from typing import Callable, Dict, List, Tuple
+
+from scraper_engine.config import config
+from scraper_engine.logs import get_logger
+from scraper_engine.sites.tudo_gostoso.models import Recipe
+from scraper_engine.sql.models import ScrapedRecipe
+from scraper_engine.util import run_in_thread
+
+
+class RecipeWriteBuffer(object):
+    """write-behind buffer that stores scraped recipes in batches
+    through :py:meth:`ScrapedRecipe.bulk_upsert`.
+
+    The buffer is flushed once it holds ``max_size`` recipes or every
+    ``flush_interval`` seconds while :py:meth:`run` is running,
+    whichever comes first. :py:meth:`add` returns a future that is
+    resolved once the flush containing the recipe has committed, or
+    fails along with it, so that callers can hold on to the job of a
+    recipe until it is stored.
+    """
+
+    def __init__(
+        self,
+        max_size: int = config.recipe_write_batch_size,
+        flush_interval: float = config.recipe_write_flush_interval,
+        save: Callable[[List[Recipe]], List[ScrapedRecipe]] = None,
+    ):
+        self.logger = get_logger("recipe-write-buffer")
+        self.max_size = max(1, max_size)
+        self.flush_interval = flush_interval
+        self.save = save or ScrapedRecipe.bulk_upsert
+        self.pending: Dict[str, Tuple[Recipe, List[asyncio.Future]]] = {}
+        self.lock = None
+        self.should_run = True
+
+    def __len__(self):
+        return len(self.pending)
+
+    async def add(self, recipe: Recipe) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if not recipe.has_enough_data():
+            future.set_result(None)
+            return future
+
+        # a recipe scraped twice before a flush is stored once
+        _, futures = self.pending.get(recipe.url, (None, []))
+        futures.append(future)
+        self.pending[recipe.url] = (recipe, futures)
+        if len(self.pending) >= self.max_size:
+            await self.flush()
+
+        return future
+
+    async def flush(self) -> List[ScrapedRecipe]:
+        if self.lock is None:
+            # created lazily so that it binds to the running event loop
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            if not self.pending:
+                return []
+
+            batch, self.pending = self.pending, {}
+            futures = [future for _, waiting in batch.values() for future in waiting]
+            try:
+                saved = await run_in_thread(
+                    self.save, [recipe for recipe, _ in batch.values()]
+                )
+            except Exception as e:
+                self.logger.exception(f"failed to save {len(batch)} recipes")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                return []
+
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+
+            self.logger.info(f"saved {len(saved)} recipes")
+            return saved
+
+    async def run(self):
+        while self.should_run:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        self.should_run = False
+        await self.flush()
@@ -0,0 +1,63 @@
+import re
+from pathlib import Path
+
+import pytest
+import yaml
+from requests import Response
+
+from scraper_engine.sites.tudo_gostoso.scrapers import RecipeScraper
+
+# the cassettes take seconds to load with the pure python parser
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+cassettes_path = Path(__file__).parent.joinpath(".cassetes")
+
+
+def recorded_recipe_pages():
+    for cassette in sorted(cassettes_path.iterdir()):
+        with cassette.open() as fd:
+            interactions = yaml.load(fd, Loader=SafeLoader)["interactions"]
+
+        for interaction in interactions:
+            url = interaction["request"]["uri"]
+            if "/receita/" in url and interaction["response"]["status"]["code"] == 200:
+                yield url, interaction["response"]["body"]["string"]
+
+
+def recorded_response(body) -> Response:
+    response = Response()
+    response._content = body.encode("utf-8") if isinstance(body, str) else body
+    response.encoding = "utf-8"
+    return response
+
+
+@pytest.mark.parametrize("url,body", list(recorded_recipe_pages()))
+def test_extract_recipe_matches_get_recipe(url, body):
+    "RecipeScraper.extract_recipe() should return the same recipe as get_recipe()"
+
+    response = recorded_response(body)
+
+    expected = RecipeScraper(url, response).get_recipe()
+    recipe = RecipeScraper(url, response).extract_recipe()
+
+    recipe.to_dict().should.equal(expected.to_dict())
+
+
+@pytest.mark.parametrize("url,body", list(recorded_recipe_pages()))
+def test_scrape_recipe_from_json_ld(url, body):
+    "RecipeScraper.scrape_recipe() should fill in the fields missing from json-ld"
+
+    response = recorded_response(body)
+
+    expected = RecipeScraper(url, response).extract_recipe().to_dict()
+    recipe = RecipeScraper(url, response).scrape_recipe().to_dict()
+
+    # the json-ld ingredients keep the text of links that the page splits
+    ingredients = recipe.pop("ingredients")
+    expected_ingredients = expected.pop("ingredients")
+    [i["step"] for i in ingredients].should.equal(
+        [i["step"] for i in expected_ingredients]
+    )
+    for ingredient, expected_ingredient in zip(ingredients, expected_ingredients):
+        ingredient["name"].should.match(f"^{re.escape(expected_ingredient['name'])}")
+
+    recipe.should.equal(expected)
@@ -0,0 +1,80 @@
+import asyncio
+
+from requests import Response
+
+from scraper_engine.sites.tudo_gostoso.models import Recipe
+from scraper_engine.workers.parser import RecipeParserPool
+
+URL = "https://www.tudogostoso.com.br/receita/1542-peras-ao-vinho.html"
+
+PAGE = """<html><body>
+<div class="recipe-title"><h1>Pêras ao vinho</h1></div>
+<div class="ingredients-card"><ul><li><p>6 pêras</p></li></ul></div>
+<div class="directions-card"><ol><li><p>Cozinhe as pêras</p></li></ol></div>
+</body></html>"""
+
+
+def parse(max_workers: int) -> Recipe:
+    response = Response()
+    response._content = PAGE.encode("utf-8")
+    response.encoding = "utf-8"
+    parser = RecipeParserPool(max_workers)
+
+    async def main():
+        try:
+            return await parser.parse(URL, response)
+        finally:
+            parser.close()
+
+    return asyncio.run(main())
+
+
+def test_recipe_parser_pool_parses_in_another_process():
+    "RecipeParserPool.parse() should return the recipe parsed by its processes"
+
+    recipe = parse(max_workers=1)
+
+    recipe.should.be.a(Recipe)
+    recipe.should.equal(parse(max_workers=0))
+    recipe.title.should.equal("Pêras ao vinho")
+    recipe.ingredients[0].name.should.equal("6 pêras")
+
+
+class CountingParserPool(RecipeParserPool):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.created = 0
+
+    def create_executor(self):
+        self.created += 1
+        return super().create_executor()
+
+
+def test_recipe_parser_pool_replaces_a_broken_pool_once():
+    "RecipeParserPool.parse() should start a single new pool however many parses the broken one failed"
+
+    response = Response()
+    response._content = PAGE.encode("utf-8")
+    response.encoding = "utf-8"
+    parser = CountingParserPool(1)
+
+    async def main():
+        try:
+            await parser.parse(URL, response)
+            broken = parser.executor
+            parses = asyncio.gather(*(parser.parse(URL, response) for _ in range(4)))
+            # break the pool while every parse is waiting for it
+            await asyncio.sleep(0)
+            for process in list(broken._processes.values()):
+                process.kill()
+
+            recipes = await parses
+            parser.executor.shouldnt.be(broken)
+            return recipes
+        finally:
+            parser.close()
+
+    recipes = asyncio.run(main())
+
+    [recipe.title for recipe in recipes].should.equal(["Pêras ao vinho"] * 4)
+    parser.created.should.equal(2)
@@ -0,0 +1,25 @@
+from scraper_engine import sql
+from scraper_engine.sql.models import ScrapedRecipe
+
+URL = "https://www.tudogostoso.com.br/receita/1542-peras-ao-vinho.html"
+
+
+def test_bulk_upsert_inserts_then_updates_by_url():
+    "ScrapedRecipe.bulk_upsert() should insert new urls and update existing ones"
+
+    sql.context.set_default_uri(sql.config.SQLALCHEMY_URI)
+    existing = ScrapedRecipe.find_one_by(url=URL)
+    if existing:
+        existing.delete()
+
+    [inserted] = ScrapedRecipe.bulk_upsert(
+        [{"url": URL, "title": "Pêras", "ingredients_count": 3}]
+    )
+    [updated] = ScrapedRecipe.bulk_upsert(
+        [{"url": URL, "title": "Pêras ao vinho", "ingredients_count": 6}]
+    )
+
+    updated.id.should.equal(inserted.id)
+    updated.created_at.should.equal(inserted.created_at)
+    ScrapedRecipe.find_one_by(url=URL).title.should.equal("Pêras ao vinho")
+    ScrapedRecipe.find_one_by(url=URL).ingredients_count.should.equal(6)
@@ -0,0 +1,82 @@
+import gc
+import resource
+import sys
+import tracemalloc
+import weakref
+
+from requests import Response
+
+from scraper_engine.sites.tudo_gostoso.scrapers import RecipeScraper
+
+PAGES = 2000
+
+INGREDIENTS = "".join(f"<li><p>{n} colheres de farinha</p></li>" for n in range(30))
+
+PAGE = f"""<html><body>
+<div class="recipe-title"><h1>Bolo de fubá</h1></div>
+<span itemprop="recipeYield">8 porções</span>
+<span itemprop="totalTime">45 min</span>
+<span itemprop="name">TudoGostoso</span>
+<div id="rating-average"><span>12</span><span>4.5</span></div>
+<div class="ingredients-card"><ol>{INGREDIENTS}</ol></div>
+<div class="directions-card"><ol><li><p>Misture tudo e asse</p></li></ol></div>
+<script>{"var padding = 1;" * 5000}</script>
+</body></html>"""
+
+
+def scrape(page_number: int) -> RecipeScraper:
+    url = f"https://www.tudogostoso.com.br/receita/{page_number}-bolo-de-fuba.html"
+    response = Response()
+    response._content = PAGE.encode("utf-8")
+    response.encoding = "utf-8"
+    scraper = RecipeScraper(url, response)
+    # the memoized getters, which used to keep the scraper and its dom alive
+    scraper.get_title()
+    scraper.get_rating()
+    scraper.get_servings_value()
+    scraper.get_total_cooking_time_unit()
+    scraper.get_author_name()
+    return scraper
+
+
+def get_max_rss() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def test_scraper_is_released_with_its_memoized_values():
+    "RecipeScraper should not be kept alive by the memoized getters"
+
+    scraper = scrape(1)
+    reference = weakref.ref(scraper)
+
+    del scraper
+    gc.collect()
+
+    reference().should.be.none
+
+
+def test_scraping_thousands_of_pages_keeps_memory_flat():
+    "RecipeScraper should not retain pages once they were scraped"
+
+    tracemalloc.start()
+    try:
+        for page_number in range(100):
+            scrape(page_number)
+
+        gc.collect()
+        traced_before, _ = tracemalloc.get_traced_memory()
+        rss_before = get_max_rss()
+
+        for page_number in range(PAGES):
+            scrape(page_number)
+
+        gc.collect()
+        traced_after, _ = tracemalloc.get_traced_memory()
+        rss_after = get_max_rss()
+    finally:
+        tracemalloc.stop()
+
+    (traced_after - traced_before).should.be.lower_than(1024 * 1024)
+    (rss_after - rss_before).should.be.lower_than(32 * 1024 * 1024)
@@ -1,3 +1,4 @@
+import asyncio
 from decimal import Decimal
 from pathlib import Path
 
@@ -9,6 +10,7 @@ from vcr import VCR
 
 from scraper_engine import sql
 from scraper_engine.sites.tudo_gostoso import (
+    AsyncTudoGostosoClient,
     Direction,
     Ingredient,
     Picture,
@@ -126,7 +128,7 @@ def test_recipe_with_links_in_directions(context):
     recipe = context.client.get_recipe(
         "https://www.tudogostoso.com.br/receita/125-cuca-da-tia-dalila.html"
     )
-    # TODO: Fix parsing of ingredients and directions that contain links
+    # TODO: Fix parsing of directions that contain links
     recipe.ingredients.should.have.length_of(10)
     recipe.directions.should.have.length_of(4)
 
@@ -146,12 +148,18 @@ def test_recipe_with_links_in_directions(context):
             {"step": "Cuca da tia Dalila", "name": "2 xícaras de açúcar"},
             {"step": "Cuca da tia Dalila", "name": "1 xícara de leite"},
             {"step": "Cuca da tia Dalila", "name": "4 ovos"},
-            {"step": "Cuca da tia Dalila", "name": "2 colheres (sopa) de"},
-            {"step": "Cuca da tia Dalila", "name": "2 colheres (sopa)"},
+            {
+                "step": "Cuca da tia Dalila",
+                "name": "2 colheres (sopa) de manteiga ou margarina",
+            },
+            {
+                "step": "Cuca da tia Dalila",
+                "name": "2 colheres (sopa) de fermento em pó",
+            },
             {"step": "Farofa", "name": "1 xícara de açúcar"},
             {"step": "Farofa", "name": "1/2 xícara de farinha de trigo"},
             {"step": "Farofa", "name": "canela em pó"},
-            {"step": "Farofa", "name": "1 ou 2 colheres de"},
+            {"step": "Farofa", "name": "1 ou 2 colheres de margarina ou manteiga"},
         ]
     )
     directions = [i.to_dict() for i in recipe.directions]
@@ -367,6 +375,31 @@ def test_tudogostoso_get_single_recipe(context):
     scraped.should.be.a(ScrapedRecipe)
 
 
+@vcr.use_cassette("test_recipe_without_steps")
+def test_async_client_get_recipe():
+    "AsyncTudoGostosoClient.get_recipe() returns the same recipe as the blocking client"
+
+    # Given an async client
+    client = AsyncTudoGostosoClient()
+
+    async def get_recipe():
+        try:
+            return await client.get_recipe(
+                "https://www.tudogostoso.com.br/receita/1542-peras-ao-vinho.html"
+            )
+        finally:
+            await client.close()
+
+    # When I retrieve a recipe from within the event loop
+    recipe = asyncio.run(get_recipe())
+
+    # Then it should be parsed just like with TudoGostosoClient
+    recipe.should.be.a(Recipe)
+    recipe.title.should.equal("Pêras ao vinho")
+    recipe.ingredients.should.have.length_of(4)
+    recipe.directions.should.have.length_of(1)
+
+
 @vcr.use_cassette
 def test_tudogostoso_get_recipe_urls_from_sitemap(context):
     "TudoGostosoClient.get_recipe_urls() from a valid sitemap url"
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from scraper_engine.http.cache import HttpCache
+from scraper_engine.sql.models.http import HttpInteraction
+
+
+class DictHttpCache(HttpCache):
+    """keeps in a dict what :py:class:`HttpCache` keeps in postgres"""
+
+    def __init__(self):
+        super().__init__(tiers=[])
+        self.database = {}
+
+    def load(self, cache_key):
+        return self.database.get(cache_key)
+
+    def save(
+        self, request, response, cache_key=None, expires_at=None, compressed_body=None
+    ):
+        data = HttpInteraction.exchange_data(
+            request, response, cache_key, expires_at, compressed_body
+        )
+        interaction = self.database[cache_key] = HttpInteraction(**data)
+        return interaction
+
+    def touch(self, interaction, expires_at=None):
+        interaction.updated_at = datetime.utcnow()
+        if expires_at:
+            interaction.expires_at = expires_at
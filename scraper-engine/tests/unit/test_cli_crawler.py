@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import fakeredis
+from click.testing import CliRunner
+
+from scraper_engine import cli
+from scraper_engine.http.cache import DummyCache
+from scraper_engine.networking import RECIPE_QUEUE_REDIS_KEY
+from scraper_engine.sites.tudo_gostoso.client import TudoGostosoClient
+
+
+class FakeCrawlClient(TudoGostosoClient):
+    crawls = []
+
+    def __init__(self):
+        super().__init__(cache=DummyCache())
+
+    def iter_crawl_sitemap(self, incremental=False, **kw):
+        self.crawls.append(incremental)
+        yield f"https://www.tudogostoso.com.br/receita/{len(self.crawls)}-bolo.html"
+
+
+def test_crawler_crawls_the_sitemaps_on_every_run(monkeypatch):
+    "the crawler command should run an incremental crawl every time unless given --urls-file"
+
+    FakeCrawlClient.crawls = []
+    connection = fakeredis.FakeStrictRedis()
+    monkeypatch.setattr(cli, "TudoGostosoClient", FakeCrawlClient)
+    monkeypatch.setattr(cli, "connect_to_redis", lambda: connection)
+    runner = CliRunner()
+
+    with runner.isolated_filesystem() as path:
+        for _ in range(2):
+            result = runner.invoke(cli.main, ["crawler", "-q", "redis"])
+            result.exit_code.should.equal(0)
+
+        FakeCrawlClient.crawls.should.equal([True, True])
+        connection.zcard(RECIPE_QUEUE_REDIS_KEY).should.equal(2)
+        list(Path(path).iterdir()).should.be.empty
@@ -0,0 +1,32 @@
+from lxml import html
+
+from scraper_engine.sites.tudo_gostoso.scrapers import Element, compile_selector
+
+
+def test_compile_selector_is_reused():
+    "compile_selector() should translate each css expression only once"
+
+    compile_selector("li strong").should.be(compile_selector("li strong"))
+
+
+def test_query_many_with_compiled_selector():
+    "Element.query_many() should match like HtmlElement.cssselect()"
+
+    dom = Element(
+        html.fromstring("<ol><li><strong>Molho:</strong></li><li>x</li></ol>")
+    )
+
+    dom.query_many("li").should.have.length_of(2)
+    dom.query_one("LI STRONG").text.should.equal("Molho:")
+
+
+def test_element_wraps_the_lxml_node():
+    "Element should be a truthy wrapper that only holds the lxml node"
+
+    dom = html.fromstring('<h3 class="title"></h3>')
+    element = Element(Element(dom))
+
+    element.dom.should.be(dom)
+    element.should.be.ok
+    element.to_dict().should.equal({"tag": "h3", "attributes": {"class": "title"}})
+    hasattr(element, "__dict__").should.be.false
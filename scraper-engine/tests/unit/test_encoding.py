@@ -0,0 +1,43 @@
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from scraper_engine.sites.tudo_gostoso.scrapers import RecipeScraper, parse_html
+from scraper_engine.util import detect_encoding
+
+LATIN1_PAGE = """<html><head><meta charset="iso-8859-1"></head>
+<body><div class="recipe-title"><h1>Pêras ao vinho</h1></div></body></html>"""
+
+
+def headers(content_type: str) -> CaseInsensitiveDict:
+    return CaseInsensitiveDict({"Content-Type": content_type})
+
+
+def test_detect_encoding():
+    "detect_encoding() should prefer the BOM, then the header, then <meta>"
+
+    detect_encoding(headers("text/html; charset=UTF-8"), b"").should.equal("utf-8")
+    detect_encoding(headers("text/html"), b"<html>").should.be.none
+    detect_encoding({}, LATIN1_PAGE.encode("latin-1")).should.equal("iso-8859-1")
+    detect_encoding(
+        headers("text/html; charset=iso-8859-1"), b"\xef\xbb\xbf<html>"
+    ).should.equal("utf-8")
+    detect_encoding({}, b'<meta charset="not-an-encoding">').should.be.none
+
+
+def test_parse_html_from_bytes():
+    "parse_html() should let lxml decode the page with the given encoding"
+
+    content = "<p>Pêras</p>".encode("cp1252")
+
+    parse_html(content, "cp1252").text_content().should.equal("Pêras")
+
+
+def test_recipe_scraper_sniffs_meta_charset():
+    "RecipeScraper should parse pages without a charset header from their bytes"
+
+    response = Response()
+    response._content = LATIN1_PAGE.encode("latin-1")
+
+    RecipeScraper("https://example.com/1-x", response).get_title().should.equal(
+        "Pêras ao vinho"
+    )
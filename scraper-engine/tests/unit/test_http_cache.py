@@ -0,0 +1,85 @@
+from scraper_engine.http.cache import HttpCache, MemoryCacheTier
+from scraper_engine.sql.models.http import HttpInteraction
+from scraper_engine.util import generate_cache_key
+
+
+def make_interaction(url, body=b"x" * 30):
+    return HttpInteraction(
+        cache_key=generate_cache_key(url, "GET"),
+        request_url=url,
+        request_method="GET",
+        response_status=200,
+        response_body=body,
+    )
+
+
+def test_memory_cache_tier_evicts_least_recently_used_by_size():
+    "MemoryCacheTier should evict the least recently used entries once full"
+
+    tier = MemoryCacheTier(max_bytes=100)
+    first = make_interaction("http://a/")
+    second = make_interaction("http://b/")
+    third = make_interaction("http://c/")
+
+    tier.set("GET http://a/", first)
+    tier.set("GET http://b/", second)
+    tier.get("GET http://a/").should.be(first)
+    tier.set("GET http://c/", third)
+
+    list(tier.entries).should.equal(["GET http://a/", "GET http://c/"])
+    tier.size.should.equal(2 * (9 + 30))
+    tier.get("GET http://b/").should.be.none
+    tier.stats.to_dict().should.equal({"hits": 1, "misses": 1})
+
+
+def test_memory_cache_tier_skips_entries_larger_than_the_budget():
+    "MemoryCacheTier should not keep entries larger than max_bytes"
+
+    tier = MemoryCacheTier(max_bytes=10)
+    tier.set("GET http://a/", make_interaction("http://a/"))
+
+    tier.entries.should.be.empty
+    tier.size.should.equal(0)
+
+
+def test_http_cache_copies_hits_into_upper_tiers():
+    "HttpCache should copy hits from lower tiers into the tiers above them"
+
+    upper = MemoryCacheTier()
+    lower = MemoryCacheTier()
+    lower.name = "shared"
+    interaction = make_interaction("http://a/")
+    lower.set(interaction.cache_key, interaction)
+    cache = HttpCache(tiers=[upper, lower])
+
+    cache.get_by_url_and_method("http://a/", "GET").should.be(interaction)
+    cache.get_by_url_and_method("http://a/", "GET").should.be(interaction)
+
+    stats = cache.stats()
+    stats["memory"].should.equal({"hits": 1, "misses": 1})
+    stats["shared"].should.equal({"hits": 1, "misses": 0})
+    stats["postgres"].should.equal({"hits": 0, "misses": 0})
+
+
+def test_generate_cache_key_normalizes_equivalent_requests():
+    "generate_cache_key() should give equivalent requests the same key"
+
+    key = generate_cache_key(
+        "https://www.tudogostoso.com.br/busca?q=bolo&page=2", "get"
+    )
+
+    key.should.have.length_of(64)
+    generate_cache_key(
+        "HTTPS://WWW.tudogostoso.com.br:443/busca?page=2#receitas",
+        "GET",
+        params={"q": "bolo"},
+        headers={"User-Agent": "AdsBot-Google", "Accept": "*/*"},
+    ).should.equal(key)
+    generate_cache_key(
+        "https://www.tudogostoso.com.br/busca?q=bolo&page=3", "GET"
+    ).shouldnt.equal(key)
+    generate_cache_key(
+        "https://www.tudogostoso.com.br/busca?q=bolo&page=2",
+        "GET",
+        headers={"Accept-Language": "en"},
+    ).shouldnt.equal(key)
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from scraper_engine.http.freshness import get_expiry, get_ttl, parse_cache_control
+
+
+def test_parse_cache_control():
+    "parse_cache_control() should return the directives of a Cache-Control header"
+
+    parse_cache_control('public, Max-Age=300, no-cache="Set-Cookie"').should.equal(
+        {"public": None, "max-age": "300", "no-cache": "Set-Cookie"}
+    )
+    parse_cache_control(None).should.equal({})
+
+
+def test_get_ttl_from_response_headers():
+    "get_ttl() should honor Cache-Control before Expires"
+
+    url = "https://www.tudogostoso.com.br/receita/1-bolo.html"
+
+    get_ttl(url, {"Cache-Control": "max-age=60, s-maxage=600"}).should.equal(600)
+    get_ttl(url, {"Cache-Control": "no-cache"}).should.equal(0)
+    get_ttl(url, {"Cache-Control": "private, no-store"}).should.be.none
+    get_ttl(
+        url,
+        {
+            "Date": "Sat, 21 Aug 2021 10:00:00 GMT",
+            "Expires": "Sat, 21 Aug 2021 12:00:00 GMT",
+        },
+    ).should.equal(7200)
+    get_ttl(url, {"Expires": "0"}).should.equal(0)
+    get_ttl(url, {}).should.equal(86400)
+
+
+def test_get_expiry():
+    "get_expiry() should add the ttl to the given time"
+
+    now = datetime(2021, 8, 21, 10, 0, 0)
+
+    get_expiry("https://a/", {"Cache-Control": "max-age=90"}, now=now).should.equal(
+        datetime(2021, 8, 21, 10, 1, 30)
+    )
@@ -0,0 +1,42 @@
+import json
+
+import requests
+
+from scraper_engine import compression
+from scraper_engine.sql.models.http import HttpInteraction
+
+
+def test_http_interaction_response_from_compressed_body():
+    "HttpInteraction.response() should decompress the stored body"
+
+    body = "<html><body>Pão de queijo</body></html>".encode("utf-8")
+    interaction = HttpInteraction(
+        request_url="https://www.tudogostoso.com.br/",
+        response_status=200,
+        response_headers=json.dumps({"Content-Type": "text/html; charset=utf-8"}),
+        response_body=compression.compress(body, compression.GZIP),
+        response_body_codec=compression.GZIP,
+    )
+
+    response = interaction.response()
+
+    response.status_code.should.equal(200)
+    response.content.should.equal(body)
+    response.text.should.equal("<html><body>Pão de queijo</body></html>")
+    response.headers["content-type"].should.equal("text/html; charset=utf-8")
+
+
+def test_http_interaction_stores_bodies_with_gzip_by_default():
+    "HttpInteraction.exchange_data() should not depend on optional codecs by default"
+
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"<html></html>"
+    request = requests.Request("GET", "https://www.tudogostoso.com.br/").prepare()
+
+    data = HttpInteraction.exchange_data(request, response, cache_key="key")
+
+    data["response_body_codec"].should.equal(compression.GZIP)
+    compression.decompress(data["response_body"], compression.GZIP).should.equal(
+        b"<html></html>"
+    )
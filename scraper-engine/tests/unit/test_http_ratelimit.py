@@ -0,0 +1,66 @@
+from scraper_engine.http.ratelimit import (
+    HostRateLimiter,
+    RateLimiterRegistry,
+    parse_retry_after,
+)
+
+
+def test_host_rate_limiter_allows_bursts_then_spaces_requests():
+    "HostRateLimiter should let ``burst`` requests through and then space them"
+
+    limiter = HostRateLimiter("www.tudogostoso.com.br", rate=10, burst=2)
+
+    waits = [limiter.reserve() for _ in range(4)]
+
+    waits[:2].should.equal([0.0, 0.0])
+    waits[2].should.be.within(0.09, 0.1)
+    waits[3].should.be.within(0.19, 0.2)
+
+
+def test_host_rate_limiter_adapts_its_rate():
+    "HostRateLimiter should increase additively and decrease multiplicatively"
+
+    limiter = HostRateLimiter(
+        "www.tudogostoso.com.br", rate=4, min_rate=1, max_rate=8, target_latency=1
+    )
+
+    limiter.feedback(200, 0.2)
+    limiter.rate.should.equal(4.25)
+
+    limiter.feedback(429, 0.2)
+    limiter.rate.should.equal(2.125)
+
+    limiter.feedback(200, 5)
+    limiter.feedback(503, 0.2)
+    limiter.rate.should.equal(1)
+
+
+def test_host_rate_limiter_honors_retry_after():
+    "HostRateLimiter should pause the host for as long as Retry-After asks"
+
+    limiter = HostRateLimiter("www.tudogostoso.com.br", rate=10, burst=5)
+
+    limiter.feedback(429, 0.1, retry_after=30)
+
+    limiter.reserve().should.be.within(29, 30)
+
+
+def test_rate_limiter_registry_shares_limiters_per_host():
+    "RateLimiterRegistry should hand out one limiter per host"
+
+    registry = RateLimiterRegistry()
+
+    registry.get("https://www.tudogostoso.com.br/receita/1.html").should.be(
+        registry.get("https://WWW.tudogostoso.com.br/sitemap.xml")
+    )
+    registry.get("https://www.tudogostoso.com.br/").shouldnt.be(
+        registry.get("https://tudogostoso.com.br/")
+    )
+
+
+def test_parse_retry_after():
+    "parse_retry_after() should accept seconds and http dates"
+
+    parse_retry_after("120").should.equal(120)
+    parse_retry_after(None).should.equal(0)
+    parse_retry_after("Sat, 21 Aug 2021 10:02:00 GMT", now=1629540000).should.equal(120)
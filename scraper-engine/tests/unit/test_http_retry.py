@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import httpretty
+import requests
+from sure import expect
+
+from scraper_engine.http.cache import DummyCache
+from scraper_engine.http.client import AsyncHttpClient, HttpClient
+from scraper_engine.http.exceptions import CircuitOpen
+from scraper_engine.http.retry import (
+    CONNECTION,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    RetryPolicies,
+    RetryPolicy,
+    classify,
+)
+
+
+def make_response(status_code, **headers):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+def test_classify_failed_attempts():
+    "classify() should group failed attempts by error class"
+
+    classify(error=requests.ConnectionError()).should.equal("connection")
+    classify(make_response(429)).should.equal("throttled")
+    classify(make_response(503, **{"Retry-After": "5"})).should.equal("throttled")
+    classify(make_response(502)).should.equal("server_error")
+    classify(make_response(404)).should.be.none
+    classify(make_response(200)).should.be.none
+
+
+def test_retry_policies_stop_after_max_attempts_and_budget():
+    "RetryPolicies should give up after max_attempts or once the budget is spent"
+
+    policies = RetryPolicies(
+        {CONNECTION: RetryPolicy(3, base_delay=1, max_delay=4)}, budget=10
+    )
+    error = requests.ConnectionError()
+
+    policies.get_delay(0, 0, error=error).should.be.within(0, 1)
+    policies.get_delay(1, 0, error=error).should.be.within(0, 2)
+    policies.get_delay(2, 0, error=error).should.be.none
+    policies.get_delay(1, 20, error=error).should.be.none
+    policies.get_delay(0, 0, response=make_response(500)).should.be.none
+
+
+def test_retry_policies_honor_retry_after():
+    "RetryPolicies should wait at least as long as Retry-After asks"
+
+    policies = RetryPolicies(budget=60)
+
+    policies.get_delay(
+        0, 0, response=make_response(429, **{"Retry-After": "7"})
+    ).should.equal(7)
+    policies.get_delay(
+        0, 0, response=make_response(429, **{"Retry-After": "90"})
+    ).should.be.none
+
+
+def test_circuit_breaker_opens_and_probes_half_open():
+    "CircuitBreaker should fail fast once open and let a single probe through later"
+
+    breaker = CircuitBreaker(
+        "www.tudogostoso.com.br", failure_threshold=2, reset_timeout=0
+    )
+    breaker.record(failed=True)
+    breaker.before_request()
+    breaker.record(failed=True)
+    breaker.state.should.equal(CircuitBreaker.OPEN)
+
+    breaker.before_request()
+    breaker.state.should.equal(CircuitBreaker.HALF_OPEN)
+    expect(breaker.before_request).when.called_with().to.throw(CircuitOpen)
+
+    breaker.record(failed=False)
+    breaker.state.should.equal(CircuitBreaker.CLOSED)
+    breaker.before_request()
+
+
+def test_circuit_breaker_replaces_lost_probes():
+    "CircuitBreaker should let another probe through once one is released or lost"
+
+    breaker = CircuitBreaker(
+        "www.tudogostoso.com.br",
+        failure_threshold=1,
+        reset_timeout=0,
+        probe_timeout=0.05,
+    )
+    breaker.record(failed=True)
+    breaker.before_request().should.be.true
+    breaker.release(probe=True)
+    breaker.before_request().should.be.true
+
+    expect(breaker.before_request).when.called_with().to.throw(CircuitOpen)
+    time.sleep(0.06)
+    breaker.before_request().should.be.true
+    breaker.state.should.equal(CircuitBreaker.HALF_OPEN)
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_http_client_records_unexpected_errors_as_failures():
+    "HttpClient.send() should reopen the circuit when the probe raises any error"
+
+    url = "https://www.tudogostoso.com.br/receita/loop.html"
+    httpretty.register_uri(
+        httpretty.GET, url, status=302, adding_headers={"Location": url}
+    )
+    breakers = CircuitBreakerRegistry(failure_threshold=1, reset_timeout=0)
+    breaker = breakers.get(url)
+    breaker.record(failed=True)
+    client = HttpClient(cache=DummyCache(), circuit_breakers=breakers)
+
+    expect(client.send).when.called_with("GET", url).to.throw(requests.TooManyRedirects)
+
+    breaker.state.should.equal(CircuitBreaker.OPEN)
+    breaker.before_request().should.be.true
+
+
+def test_async_http_client_releases_the_probe_when_cancelled():
+    "AsyncHttpClient.send() should hand the probe over when it is cancelled"
+
+    async def main():
+        server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/"
+        breakers = CircuitBreakerRegistry(failure_threshold=1, reset_timeout=0)
+        breaker = breakers.get(url)
+        breaker.record(failed=True)
+        client = AsyncHttpClient(cache=DummyCache(), circuit_breakers=breakers)
+
+        request = asyncio.ensure_future(client.send("GET", url))
+        await asyncio.sleep(0.1)
+        breaker.state.should.equal(CircuitBreaker.HALF_OPEN)
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        await client.close()
+        server.close()
+        return breaker
+
+    breaker = asyncio.run(main())
+    breaker.state.should.equal(CircuitBreaker.HALF_OPEN)
+    breaker.before_request().should.be.true
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import httpretty
+import requests
+
+from scraper_engine.http.client import HttpClient
+from scraper_engine.sql.models.http import HttpInteraction
+from scraper_engine.util import generate_cache_key
+
+from .caches import DictHttpCache
+
+URL = "https://www.tudogostoso.com.br/receita/1542-peras-ao-vinho.html"
+LAST_MODIFIED = "Sat, 17 Oct 2026 10:00:00 GMT"
+
+
+def store_stale_page(cache: DictHttpCache) -> HttpInteraction:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update({"ETag": '"v1"', "Last-Modified": LAST_MODIFIED})
+    response._content = b"<html>v1</html>"
+    request = requests.Request("GET", URL).prepare()
+
+    cache_key = generate_cache_key(URL, "GET", headers={})
+    return cache.save(
+        request,
+        response,
+        cache_key=cache_key,
+        expires_at=datetime.utcnow() - timedelta(minutes=1),
+    )
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_not_modified_refreshes_the_stale_entry():
+    "HttpClient should revalidate stale entries and keep them on 304 Not Modified"
+
+    httpretty.register_uri(
+        httpretty.GET, URL, status=304, adding_headers={"Cache-Control": "max-age=600"}
+    )
+    cache = DictHttpCache()
+    interaction = store_stale_page(cache)
+
+    response = HttpClient(cache=cache).request("GET", URL)
+
+    headers = httpretty.last_request().headers
+    headers["If-None-Match"].should.equal('"v1"')
+    headers["If-Modified-Since"].should.equal(LAST_MODIFIED)
+    response.status_code.should.equal(200)
+    response.content.should.equal(b"<html>v1</html>")
+    interaction.is_fresh(now=datetime.utcnow() + timedelta(minutes=9)).should.be.true
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_modified_page_replaces_the_stale_entry():
+    "HttpClient should replace stale entries when the page changed"
+
+    httpretty.register_uri(
+        httpretty.GET,
+        URL,
+        body=b"<html>v2</html>",
+        adding_headers={"ETag": '"v2"', "Cache-Control": "max-age=600"},
+    )
+    cache = DictHttpCache()
+    stale = store_stale_page(cache)
+
+    response = HttpClient(cache=cache).request("GET", URL)
+
+    httpretty.last_request().headers["If-None-Match"].should.equal('"v1"')
+    response.content.should.equal(b"<html>v2</html>")
+    stored = cache.load(stale.cache_key)
+    stored.shouldnt.be(stale)
+    stored.etag.should.equal('"v2"')
+    stored.response_content().should.equal(b"<html>v2</html>")
+    stored.is_fresh().should.be.true
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_cache_miss_returns_the_response_as_received(monkeypatch):
+    "HttpClient should not decompress what it just stored on a cache miss"
+
+    httpretty.register_uri(
+        httpretty.GET,
+        URL,
+        body="<html>Pêras</html>".encode("utf-8"),
+        adding_headers={"Content-Type": "text/html; charset=utf-8"},
+    )
+    monkeypatch.setattr(HttpInteraction, "response", None)
+    cache = DictHttpCache()
+
+    response = HttpClient(cache=cache).request("GET", URL)
+
+    response.text.should.equal("<html>Pêras</html>")
+    cache.load(generate_cache_key(URL, "GET", headers={})).shouldnt.be.none
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from scraper_engine.http.cache import DummyCache
+from scraper_engine.http.client import AsyncHttpClient
+from scraper_engine.http.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_single_flight_shares_one_call_between_threads():
+    "SingleFlight should run concurrent calls for the same key only once"
+
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "sitemap"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("GET /", fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    calls.should.equal([1])
+    results.should.equal(["sitemap"] * 5)
+    flight.deduplicated.should.equal(4)
+    flight.calls.should.be.empty
+
+
+def test_async_single_flight_shares_one_call_between_coroutines():
+    "AsyncSingleFlight should run concurrent calls for the same key only once"
+
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "recipe"
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("GET /a", fetch),
+            flight.do("GET /a", fetch),
+            flight.do("GET /b", fetch),
+        )
+
+    asyncio.run(main()).should.equal(["recipe", "recipe", "recipe"])
+    calls.should.equal([1, 1])
+    flight.deduplicated.should.equal(1)
+    flight.calls.should.be.empty
+
+
+def test_async_clients_of_one_event_loop_share_their_calls():
+    "AsyncHttpClient instances running on the same loop should share one request"
+
+    received = []
+
+    async def serve(reader, writer):
+        received.append(await reader.readuntil(b"\r\n\r\n"))
+        await asyncio.sleep(0.1)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Length: 6\r\nConnection: close\r\n\r\nrecipe"
+        )
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/receita"
+        clients = [AsyncHttpClient(cache=DummyCache()) for _ in range(2)]
+        try:
+            responses = await asyncio.gather(
+                *(client.request("GET", url) for client in clients)
+            )
+            clients[0].single_flight.should.be(clients[1].single_flight)
+            return [response.content for response in responses]
+        finally:
+            for client in clients:
+                await client.close()
+            server.close()
+
+    asyncio.run(main()).should.equal([b"recipe", b"recipe"])
+    received.should.have.length_of(1)
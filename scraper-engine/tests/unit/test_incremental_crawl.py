@@ -0,0 +1,33 @@
+from datetime import date, datetime, timedelta, timezone
+
+from scraper_engine.sites.tudo_gostoso.client import is_recipe_outdated, to_utc
+
+URL = "https://www.tudogostoso.com.br/receita/16-mousse-de-maracuja-facil.html"
+
+
+def test_to_utc():
+    "to_utc() should turn <lastmod> values into naive utc datetimes"
+
+    to_utc(date(2021, 9, 15)).should.equal(datetime(2021, 9, 15))
+    to_utc(
+        datetime(2021, 9, 15, 10, tzinfo=timezone(timedelta(hours=-3)))
+    ).should.equal(datetime(2021, 9, 15, 13))
+    to_utc("not a date").should.be.none
+    to_utc(None).should.be.none
+
+
+def test_is_recipe_outdated():
+    "is_recipe_outdated() should compare <lastmod> with the last scrape"
+
+    scraped = datetime(2021, 9, 15, 12)
+
+    is_recipe_outdated(URL, None, None).should.be.true
+    is_recipe_outdated(URL, datetime(2021, 9, 16), scraped).should.be.true
+    is_recipe_outdated(URL, datetime(2021, 9, 14), scraped).should.be.false
+
+
+def test_is_recipe_outdated_without_lastmod():
+    "is_recipe_outdated() should fall back to the ttl when there is no <lastmod>"
+
+    is_recipe_outdated(URL, None, datetime.utcnow()).should.be.false
+    is_recipe_outdated(URL, None, datetime.utcnow() - timedelta(days=2)).should.be.true
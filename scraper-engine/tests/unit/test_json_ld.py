@@ -0,0 +1,149 @@
+from decimal import Decimal
+
+from requests import Response
+
+from scraper_engine.sites.json_ld import find_json_ld_object, iter_json_ld_objects
+from scraper_engine.sites.tudo_gostoso.models import Direction, Ingredient, Picture
+from scraper_engine.sites.tudo_gostoso.scrapers import (
+    RecipeScraper,
+    parse_json_ld_recipe,
+)
+
+URL = "https://www.tudogostoso.com.br/receita/1542-peras-ao-vinho.html"
+
+PAGE = b"""<html><head>
+<script type="application/ld+json">{"@type": "WebSite", "name": "TudoGostoso"}</script>
+<script type="application/ld+json">{broken</script>
+<script type="application/ld+json">
+{"@context": "http://schema.org/", "@type": "Recipe", "name": "P\\u00earas ao vinho",
+ "author": {"@type": "Person", "name": "Elza"},
+ "aggregateRating": {"ratingValue": 3.5, "reviewCount": 2},
+ "recipeIngredient": ["Calda:", "1 copo de vinho", "a&ccedil;&uacute;car", " "],
+ "recipeInstructions": [
+   {"@type": "HowToStep", "text": "Descasque as p\u00earas."},
+   {"@type": "HowToSection", "name": "Calda:", "itemListElement": [
+     {"@type": "HowToStep", "text": "Ferva o vinho."}, "&nbsp;"]}],
+ "image": [
+   {"@type": "ImageObject", "url": "https://img.itdg.com.br/224.jpg", "caption": "Capa",
+    "width": 710, "height": 400},
+   "https://img.itdg.com.br/225.jpg?width=710&height=400"],
+ "recipeYield": 6,
+ "totalTime": "PT1H30M"}
+</script>
+</head></html>"""
+
+
+def test_find_json_ld_object():
+    "find_json_ld_object() should skip invalid blocks and other types"
+
+    list(iter_json_ld_objects(PAGE)).should.have.length_of(2)
+    find_json_ld_object(PAGE, "Recipe")["name"].should.equal("Pêras ao vinho")
+    find_json_ld_object(PAGE, "Article").should.be.none
+
+
+def test_parse_json_ld_recipe():
+    "parse_json_ld_recipe() should map a schema.org Recipe onto recipe fields"
+
+    fields = parse_json_ld_recipe(find_json_ld_object(PAGE, "Recipe"))
+
+    fields.should.have.key("title").being.equal("Pêras ao vinho")
+    fields.should.have.key("author_name").being.equal("Elza")
+    fields.should.have.key("total_ratings").being.equal(2)
+    str(fields["rating"]).should.equal("3.5")
+    fields["ingredients"].should.equal(
+        Ingredient.List(
+            [
+                Ingredient(step="Calda", name="1 copo de vinho"),
+                Ingredient(step="Calda", name="açúcar"),
+            ]
+        )
+    )
+    fields["directions"].should.equal(
+        Direction.List(
+            [
+                Direction(step="Pêras ao vinho", name="Descasque as pêras."),
+                Direction(step="Calda", name="Ferva o vinho."),
+            ]
+        )
+    )
+    fields["pictures"].should.equal(
+        Picture.List(
+            [
+                Picture(
+                    description="Capa",
+                    url="https://img.itdg.com.br/224.jpg",
+                    width=710,
+                    height=400,
+                ),
+                Picture(
+                    description="",
+                    url="https://img.itdg.com.br/225.jpg?width=710&height=400",
+                    width=710,
+                    height=400,
+                ),
+            ]
+        )
+    )
+    fields.should.have.key("servings").being.equal("6 porções")
+    fields.should.have.key("servings_value").being.equal(Decimal("6"))
+    fields.should.have.key("servings_unit").being.equal("porções")
+    fields.should.have.key("total_cooking_time").being.equal("90 min")
+    fields.should.have.key("total_cooking_time_value").being.equal(Decimal("90"))
+    fields.should.have.key("total_cooking_time_unit").being.equal("min")
+
+
+def test_parse_json_ld_recipe_leaves_out_fields_poorer_than_the_page():
+    "parse_json_ld_recipe() should leave unsectioned directions and a lone cover photo to the page"
+
+    fields = parse_json_ld_recipe(
+        {
+            "@type": "Recipe",
+            "name": "Mousse",
+            "recipeInstructions": [
+                {"@type": "HowToStep", "text": "Bata tudo."},
+                {"@type": "HowToStep", "text": "Leve à geladeira."},
+            ],
+            "image": "https://img.itdg.com.br/235.jpg",
+        }
+    )
+
+    fields.shouldnt.have.key("directions")
+    fields.shouldnt.have.key("pictures")
+
+
+def recipe_page(content: bytes) -> Response:
+    response = Response()
+    response._content = content
+    response.encoding = "utf-8"
+    return response
+
+
+def test_scrape_recipe_skips_the_document_when_json_ld_is_complete():
+    "RecipeScraper.scrape_recipe() should not parse the page when json-ld has every field"
+
+    scraper = RecipeScraper(URL, recipe_page(PAGE))
+
+    recipe = scraper.scrape_recipe()
+
+    scraper.parsed_dom.should.be.none
+    recipe.title.should.equal("Pêras ao vinho")
+    recipe.total_cooking_time.should.equal("90 min")
+
+
+def test_scrape_recipe_without_a_title_node():
+    "RecipeScraper.scrape_recipe() should keep the json-ld title when the page has no title node"
+
+    page = b"""<html><head>
+<script type="application/ld+json">{"@type": "Recipe", "name": "Bolo"}</script>
+</head><body><div class="directions-card"><ol><li><span>Asse.</span></li></ol></div>
+</body></html>"""
+    scraper = RecipeScraper(URL, recipe_page(page))
+
+    recipe = scraper.scrape_recipe()
+
+    scraper.parsed_dom.shouldnt.be.none
+    recipe.title.should.equal("Bolo")
+    [direction.to_dict() for direction in recipe.directions].should.equal(
+        [{"step": "Bolo", "name": "Asse."}]
+    )
+    RecipeScraper(URL, recipe_page(page)).extract_recipe().title.should.equal("")
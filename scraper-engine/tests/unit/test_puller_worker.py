@@ -0,0 +1,54 @@
+import asyncio
+
+from scraper_engine.workers.puller import PullerWorker
+
+
+class ListJobSource(object):
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.acked = []
+
+    def connect(self):
+        pass
+
+    async def pull(self, max_count=1):
+        pulled, self.jobs = self.jobs[:max_count], self.jobs[max_count:]
+        await asyncio.sleep(0)
+        return [(job["id"], job) for job in pulled]
+
+    async def ack(self, token):
+        self.acked.append(token)
+
+    def close(self):
+        pass
+
+
+class CountingWorker(PullerWorker):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.running = 0
+        self.max_running = 0
+
+    async def loop_once(self):
+        await super().loop_once()
+        if not self.source.jobs:
+            self.should_run = False
+
+    async def process_job(self, job):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running, len(self.in_flight))
+        await asyncio.sleep(0.01 * (job["id"] % 3))
+        self.running -= 1
+
+
+def test_puller_worker_runs_a_bounded_window_of_jobs():
+    "PullerWorker should never run more than max_in_flight jobs at once"
+
+    source = ListJobSource({"id": i} for i in range(20))
+    worker = CountingWorker("inproc://jobs", "test", max_in_flight=3, source=source)
+
+    asyncio.run(worker.run())
+
+    worker.max_running.should.equal(3)
+    sorted(source.acked).should.equal(list(range(20)))
+    worker.in_flight.should.be.empty
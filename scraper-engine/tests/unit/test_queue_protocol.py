@@ -0,0 +1,27 @@
+from scraper_engine.workers.queue import chunked, unpack_request
+
+
+def test_unpack_request_single_job():
+    "unpack_request() should echo single jobs back to the client"
+
+    jobs, reply = unpack_request({"recipe_url": "https://tudogostoso.com.br/"})
+
+    jobs.should.equal([{"recipe_url": "https://tudogostoso.com.br/"}])
+    reply.should.equal({"recipe_url": "https://tudogostoso.com.br/"})
+
+
+def test_unpack_request_batch():
+    "unpack_request() should fan out batches and report the rejected positions"
+
+    jobs, reply = unpack_request(
+        {"id": 7, "batch": [{"recipe_url": "a"}, {}, "b", {"recipe_url": "c"}]}
+    )
+
+    jobs.should.equal([{"recipe_url": "a"}, {"recipe_url": "c"}])
+    reply.should.equal({"id": 7, "count": 2, "rejected": [1, 2]})
+
+
+def test_chunked():
+    "chunked() should split any iterable into lists of the given size"
+
+    list(chunked(range(5), 2)).should.equal([[0, 1], [2, 3], [4]])
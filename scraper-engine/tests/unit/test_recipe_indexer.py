@@ -0,0 +1,64 @@
+import threading
+
+from scraper_engine.indexing import RecipeIndexer
+
+
+class RecordingIndexer(RecipeIndexer):
+    def __init__(self, **kw):
+        super().__init__(es=False, flush_interval=0.01, **kw)
+        self.batches = []
+        self.release = threading.Event()
+
+    def index_recipe_ids(self, recipe_ids):
+        self.release.wait(5)
+        self.batches.append(recipe_ids)
+        if len(self.batches) == 1:
+            raise ConnectionError("postgres went away")
+
+        return len(recipe_ids)
+
+
+def test_recipe_indexer_blocks_producers_once_max_pending_ids_wait():
+    "RecipeIndexer.add() should block while max_pending ids are waiting"
+
+    indexer = RecordingIndexer(batch_size=2, max_pending=2)
+    indexer.start()
+    for recipe_id in range(4):
+        indexer.add(recipe_id)
+
+    producer = threading.Thread(target=indexer.add, args=(4,))
+    producer.start()
+    producer.join(0.1)
+    producer.is_alive().should.be.true
+
+    indexer.release.set()
+    producer.join(5)
+    producer.is_alive().should.be.false
+    indexer.stop()
+
+    indexer.batches.should.equal([[0, 1], [2, 3], [4]])
+
+
+def test_recipe_indexer_survives_failed_batches():
+    "RecipeIndexer should keep indexing after a batch fails"
+
+    indexer = RecordingIndexer(batch_size=1, max_pending=1)
+    indexer.release.set()
+    indexer.start()
+    for recipe_id in range(3):
+        indexer.add(recipe_id)
+
+    indexer.stop()
+
+    indexer.batches.should.equal([[0], [1], [2]])
+    indexer.pending.should.be.empty
+
+
+def test_recipe_indexer_drops_ids_instead_of_blocking_when_not_running():
+    "RecipeIndexer.add() should not block once the indexer thread is gone"
+
+    indexer = RecordingIndexer(batch_size=1, max_pending=1)
+    indexer.add(1)
+    indexer.add(2)
+
+    list(indexer.pending).should.equal([1])
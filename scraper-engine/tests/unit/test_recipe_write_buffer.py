@@ -0,0 +1,106 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+from sure import expect
+
+from scraper_engine.sites.tudo_gostoso.models import Recipe
+from scraper_engine.sql.models import ScrapedRecipe
+from scraper_engine.workers.writer import RecipeWriteBuffer
+
+
+def make_recipe(number: int, title: str = "Bolo") -> Recipe:
+    return Recipe(
+        url=f"https://www.tudogostoso.com.br/receita/{number}",
+        title=title,
+        ingredients=[],
+        directions=[],
+        pictures=[],
+    )
+
+
+class Batches(object):
+    def __init__(self):
+        self.urls = []
+
+    def __call__(self, recipes):
+        self.urls.append([recipe.url for recipe in recipes])
+        return recipes
+
+
+def test_bulk_upsert_statement_keeps_the_last_copy_of_each_url():
+    "ScrapedRecipe.bulk_upsert_statement() should upsert each url only once"
+
+    statement = ScrapedRecipe.bulk_upsert_statement(
+        [make_recipe(1, "Bolo"), make_recipe(2), make_recipe(1, "Bolo de cenoura")]
+    )
+    compiled = statement.compile(dialect=postgresql.dialect())
+
+    sql = str(compiled)
+    sql.should.contain("ON CONFLICT (url) DO UPDATE SET")
+    sql.should.contain("title = excluded.title")
+    sql.shouldnt.contain("created_at = excluded.created_at")
+    sql.should.contain("RETURNING scraped_recipe.id")
+    compiled.params["title_m0"].should.equal("Bolo de cenoura")
+    compiled.params["url_m1"].should.equal("https://www.tudogostoso.com.br/receita/2")
+    compiled.params.shouldnt.have.key("url_m2")
+
+    ScrapedRecipe.bulk_upsert_statement([]).should.be.none
+
+
+def test_write_buffer_flushes_when_full():
+    "RecipeWriteBuffer should flush once it holds max_size recipes"
+
+    batches = Batches()
+    buffer = RecipeWriteBuffer(max_size=2, flush_interval=60, save=batches)
+
+    async def main():
+        first = await buffer.add(make_recipe(1))
+        first.done().should.be.false
+        second = await buffer.add(make_recipe(2))
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+
+    batches.urls.should.have.length_of(1)
+    len(buffer).should.equal(0)
+
+
+def test_write_buffer_flushes_on_interval_and_on_close():
+    "RecipeWriteBuffer should flush every flush_interval and once more when closed"
+
+    batches = Batches()
+    buffer = RecipeWriteBuffer(max_size=100, flush_interval=0.01, save=batches)
+
+    async def main():
+        flusher = asyncio.ensure_future(buffer.run())
+        await (await buffer.add(make_recipe(1)))
+        flusher.cancel()
+
+        last = await buffer.add(make_recipe(2))
+        await buffer.close()
+        return last
+
+    asyncio.run(main()).done().should.be.true
+
+    batches.urls.should.equal(
+        [
+            ["https://www.tudogostoso.com.br/receita/1"],
+            ["https://www.tudogostoso.com.br/receita/2"],
+        ]
+    )
+
+
+def test_write_buffer_fails_the_futures_of_a_failed_flush():
+    "RecipeWriteBuffer.add() futures should fail along with the flush of their batch"
+
+    def save(recipes):
+        raise RuntimeError("connection refused")
+
+    buffer = RecipeWriteBuffer(max_size=1, save=save)
+
+    async def main():
+        return await (await buffer.add(make_recipe(1)))
+
+    expect(asyncio.run).when.called_with(main()).to.throw(
+        RuntimeError, "connection refused"
+    )
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import fakeredis
+
+from scraper_engine.networking import RedisQueueManager
+from scraper_engine.workers.sources import RedisJobSource
+
+KEY = "cook-my-list:sortedset:recipes"
+
+
+def make_queue():
+    return RedisQueueManager(fakeredis.FakeStrictRedis(), name="test", verbose=False)
+
+
+def test_claimed_jobs_are_not_delivered_twice_within_the_visibility_timeout():
+    "RedisQueueManager.claim_jobs() should hide claimed jobs until their timeout"
+
+    queue = make_queue()
+    queue.add_jobs(KEY, [{"url": "/receita/1"}, {"url": "/receita/2"}])
+
+    claimed = queue.claim_jobs(KEY, count=1, visibility_timeout=60)
+    [job for _, job in claimed].should.equal([{"url": "/receita/1"}])
+    queue.job_count(KEY).should.equal(1)
+    queue.claimed_count(KEY).should.equal(1)
+
+    second = queue.claim_jobs(KEY, count=10, visibility_timeout=60)
+    [job for _, job in second].should.equal([{"url": "/receita/2"}])
+    queue.claim_jobs(KEY, count=10, visibility_timeout=60).should.be.empty
+
+
+def test_acknowledged_jobs_are_never_redelivered():
+    "RedisQueueManager.ack_job() should drop the claim of a processed job"
+
+    queue = make_queue()
+    queue.add_jobs(KEY, [{"url": "/receita/1"}])
+    [(member, job)] = queue.claim_jobs(KEY, visibility_timeout=0.05)
+
+    queue.ack_job(KEY, member).should.be.true
+    queue.ack_job(KEY, member).should.be.false
+    time.sleep(0.1)
+
+    queue.claim_jobs(KEY, count=10).should.be.empty
+    queue.claimed_count(KEY).should.equal(0)
+
+
+def test_expired_claims_are_redelivered():
+    "RedisQueueManager.claim_jobs() should redeliver jobs whose claim expired"
+
+    queue = make_queue()
+    queue.add_jobs(KEY, [{"url": "/receita/1"}])
+    [(member, job)] = queue.claim_jobs(KEY, visibility_timeout=0.05)
+    time.sleep(0.1)
+
+    redelivered = queue.claim_jobs(KEY, count=10, visibility_timeout=60)
+    redelivered.should.equal([(member, job)])
+    queue.job_count(KEY).should.equal(0)
+    queue.claimed_count(KEY).should.equal(1)
+
+
+def test_redis_job_source_pulls_and_acks_claims():
+    "RedisJobSource should hand out claims and acknowledge them by token"
+
+    queue = make_queue()
+    queue.add_jobs(KEY, [{"url": "/receita/1"}, {"url": "/receita/2"}])
+    source = RedisJobSource(queue, visibility_timeout=60, wait_timeout=0)
+
+    async def main():
+        pulled = await source.pull(10)
+        for token, _ in pulled:
+            await source.ack(token)
+        return pulled
+
+    [job for _, job in asyncio.run(main())].should.equal(
+        [{"url": "/receita/1"}, {"url": "/receita/2"}]
+    )
+    queue.claimed_count(KEY).should.equal(0)
@@ -0,0 +1,100 @@
+import threading
+
+from scraper_engine.http.cache import DummyCache
+from scraper_engine.sites.tudo_gostoso.client import (
+    CrawlCheckpoints,
+    SitemapShard,
+    TudoGostosoClient,
+)
+from scraper_engine.sites.tudo_gostoso.models import SiteMap
+
+
+class FakeShardsClient(TudoGostosoClient):
+    def __init__(self, shards):
+        super().__init__(cache=DummyCache())
+        self.shards = shards
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def iter_sitemap(self, max_pages=None):
+        for url in list(self.shards)[:max_pages]:
+            yield SiteMap(url=url)
+
+    def iter_recipe_urls(self, sitemap_url):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            urls = self.shards[sitemap_url]
+            if isinstance(urls, Exception):
+                raise urls
+            return list(urls)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_iter_crawl_sitemap_reports_failed_shards():
+    "iter_crawl_sitemap() should carry on past sitemaps that fail"
+
+    client = FakeShardsClient(
+        {
+            "sitemap-1.xml": ["recipe-1", "recipe-2"],
+            "sitemap-2.xml": ConnectionError("connection reset"),
+            "sitemap-3.xml": ["recipe-3"],
+        }
+    )
+    failures = []
+
+    urls = client.iter_crawl_sitemap(max_pages=3, concurrency=2, failures=failures)
+
+    sorted(urls).should.equal(["recipe-1", "recipe-2", "recipe-3"])
+    failures.should.have.length_of(1)
+    failures[0].sitemap.url.should.equal("sitemap-2.xml")
+    failures[0].error.should.be.a(ConnectionError)
+
+
+def test_iter_crawl_shards_respects_concurrency():
+    "iter_crawl_shards() should not crawl more sitemaps at once than allowed"
+
+    client = FakeShardsClient({f"sitemap-{i}.xml": [f"recipe-{i}"] for i in range(8)})
+
+    shards = list(client.iter_crawl_shards(max_pages=8, concurrency=3))
+
+    shards.should.have.length_of(8)
+    client.max_running.should.be.lower_than_or_equal_to(3)
+
+
+class RecordingShard(SitemapShard):
+    crawled = []
+
+    def mark_crawled(self):
+        self.crawled.append(self.sitemap.url)
+
+
+def test_crawl_checkpoints_wait_for_every_url_of_a_sitemap_to_be_enqueued():
+    "CrawlCheckpoints should mark sitemaps crawled only once all their urls are enqueued"
+
+    RecordingShard.crawled = []
+    checkpoints = CrawlCheckpoints()
+    shards = [
+        RecordingShard(SiteMap(url="sitemap-1.xml"), ["recipe-1", "recipe-2"]),
+        RecordingShard(SiteMap(url="sitemap-2.xml"), []),
+        RecordingShard(SiteMap(url="sitemap-3.xml"), ["recipe-3"], changed=False),
+        RecordingShard(SiteMap(url="sitemap-4.xml"), ["recipe-4", "recipe-5"]),
+    ]
+
+    urls = [url for shard in shards for url in checkpoints.track(shard)]
+
+    urls.should.have.length_of(5)
+    RecordingShard.crawled.should.equal(["sitemap-2.xml"])
+
+    checkpoints.confirm(3, 2)
+    RecordingShard.crawled.should.equal(["sitemap-2.xml"])
+    checkpoints.confirm(0, 1)
+    RecordingShard.crawled.should.equal(["sitemap-2.xml"])
+    checkpoints.confirm(1, 2)
+    RecordingShard.crawled.should.equal(
+        ["sitemap-2.xml", "sitemap-1.xml", "sitemap-4.xml"]
+    )
@@ -0,0 +1,138 @@
+import gzip
+import io
+from datetime import datetime, timedelta
+
+import httpretty
+
+from scraper_engine import compression
+from scraper_engine.http.client import TeeReader
+from scraper_engine.sites.sitemaps import get_child_text, iter_sitemap_elements
+from scraper_engine.sites.tudo_gostoso.client import TudoGostosoClient
+
+from .caches import DictHttpCache
+
+SITEMAP = b"""<?xml version="1.0" encoding="utf-8" ?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+%s
+</urlset>
+"""
+
+
+def make_sitemap(count):
+    urls = b"".join(
+        b"<url><loc> https://www.tudogostoso.com.br/receita/%d.html </loc>"
+        b"<lastmod>2021-08-21</lastmod></url>\n" % i
+        for i in range(count)
+    )
+    return SITEMAP % urls
+
+
+def test_iter_sitemap_elements():
+    "iter_sitemap_elements() should yield every <url> of a sitemap"
+
+    elements = iter_sitemap_elements(io.BytesIO(make_sitemap(3)), "url")
+
+    [get_child_text(e, "loc") for e in elements].should.equal(
+        [
+            "https://www.tudogostoso.com.br/receita/0.html",
+            "https://www.tudogostoso.com.br/receita/1.html",
+            "https://www.tudogostoso.com.br/receita/2.html",
+        ]
+    )
+
+
+def test_iter_sitemap_elements_from_gzipped_shards():
+    "iter_sitemap_elements() should decompress .xml.gz shards"
+
+    source = io.BytesIO(gzip.compress(make_sitemap(5000)))
+
+    urls = [get_child_text(e, "loc") for e in iter_sitemap_elements(source, "url")]
+
+    urls.should.have.length_of(5000)
+    urls[-1].should.equal("https://www.tudogostoso.com.br/receita/4999.html")
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_open_sitemap_is_served_from_cache_the_second_time():
+    "TudoGostosoClient.open_sitemap() should cache sitemaps that were read in full"
+
+    url = "https://www.tudogostoso.com.br/sitemap-1.xml"
+    httpretty.register_uri(
+        httpretty.GET,
+        url,
+        body=make_sitemap(3),
+        adding_headers={"ETag": '"v1"', "Cache-Control": "max-age=600"},
+    )
+    client = TudoGostosoClient(cache=DictHttpCache())
+
+    first = client.get_recipe_urls(url)
+    second = client.get_recipe_urls(url)
+
+    second.should.equal(first)
+    first.should.have.length_of(3)
+    httpretty.latest_requests().should.have.length_of(1)
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_open_streams_cached_bodies_compressed():
+    "HttpClient.open() should store bodies compressed and decompress them while read"
+
+    url = "https://www.tudogostoso.com.br/sitemap-1.xml"
+    sitemap = make_sitemap(1000)
+    httpretty.register_uri(
+        httpretty.GET,
+        url,
+        body=sitemap,
+        adding_headers={"Cache-Control": "max-age=600"},
+    )
+    cache = DictHttpCache()
+    client = TudoGostosoClient(cache=cache)
+    with client.open(url) as body:
+        body.read().should.equal(sitemap)
+
+    [interaction] = cache.database.values()
+    interaction.response_body_codec.should.equal(compression.GZIP)
+    len(interaction.response_body).should.be.lower_than(len(sitemap) // 10)
+    with client.open(url) as body:
+        body.shouldnt.be.an(io.BytesIO)
+        body.read(100).should.equal(sitemap[:100])
+
+
+def test_tee_reader_gives_up_bodies_larger_than_max_bytes():
+    "TeeReader should only keep a complete copy of bodies within max_bytes"
+
+    sitemap = make_sitemap(1000)
+    small = TeeReader(io.BytesIO(sitemap))
+    large = TeeReader(io.BytesIO(sitemap), max_bytes=10)
+    while small.read(4096) or large.read(4096):
+        pass
+
+    small.complete.should.be.true
+    compression.decompress(small.getvalue(), compression.GZIP).should.equal(sitemap)
+    large.complete.should.be.false
+    large.getvalue().should.equal(b"")
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_open_sitemap_revalidates_stale_copies():
+    "TudoGostosoClient.open_sitemap() should reuse a stale sitemap on 304 Not Modified"
+
+    url = "https://www.tudogostoso.com.br/sitemap-1.xml"
+    httpretty.register_uri(
+        httpretty.GET,
+        url,
+        responses=[
+            httpretty.Response(body=make_sitemap(2), adding_headers={"ETag": '"v1"'}),
+            httpretty.Response(body="", status=304),
+        ],
+    )
+    cache = DictHttpCache()
+    client = TudoGostosoClient(cache=cache)
+    client.get_recipe_urls(url).should.have.length_of(2)
+    for interaction in cache.database.values():
+        interaction.expires_at = datetime.utcnow() - timedelta(minutes=1)
+
+    client.get_recipe_urls(url).should.have.length_of(2)
+
+    httpretty.last_request().headers["If-None-Match"].should.equal('"v1"')
+    httpretty.latest_requests().should.have.length_of(2)
@@ -0,0 +1,100 @@
+"""measures throughput and enqueue latency of the queue brokers
+
+Usage:
+
+    python tools/benchmark-queue-server.py --jobs 500 --clients 4 --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import zmq
+import zmq.asyncio
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from scraper_engine.workers import QueueServer, StreamingQueueServer  # noqa
+from scraper_engine.workers.base import context  # noqa
+
+REP_ADDRESS = "tcp://127.0.0.1:15000"
+PUSH_ADDRESS = "tcp://127.0.0.1:16000"
+
+
+async def enqueue(jobs: int, latencies: list):
+    socket = context.socket(zmq.REQ)
+    socket.connect(REP_ADDRESS)
+    for i in range(jobs):
+        started = time.perf_counter()
+        await socket.send_json({"recipe_url": f"https://example.com/{i}"})
+        await socket.recv_json()
+        latencies.append(time.perf_counter() - started)
+    socket.close(linger=0)
+
+
+async def consume(received: list, total: int):
+    socket = context.socket(zmq.PULL)
+    socket.connect(PUSH_ADDRESS)
+    while len(received) < total:
+        if await socket.poll(100, zmq.POLLIN):
+            received.append(await socket.recv_json())
+    socket.close(linger=0)
+
+
+async def benchmark(server, jobs: int, clients: int, workers: int) -> dict:
+    total = jobs * clients
+    received = []
+    latencies = []
+
+    broker = asyncio.ensure_future(server.run())
+    consumers = [
+        asyncio.ensure_future(consume(received, total)) for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*[enqueue(jobs, latencies) for _ in range(clients)])
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - started
+
+    server.should_run = False
+    await broker
+    server.rep.close(linger=0)
+    server.push.close(linger=0)
+
+    latencies.sort()
+    return {
+        "jobs": total,
+        "seconds": elapsed,
+        "jobs/s": total / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100, help="jobs per client")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    servers = [
+        ("polling", QueueServer(REP_ADDRESS, PUSH_ADDRESS)),
+        (
+            "streaming",
+            StreamingQueueServer(REP_ADDRESS, PUSH_ADDRESS, batch_size=args.batch_size),
+        ),
+    ]
+    for name, server in servers:
+        result = asyncio.run(benchmark(server, args.jobs, args.clients, args.workers))
+        summary = " ".join(f"{k}={v:.2f}" for k, v in result.items())
+        print(f"{name:>10}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""measures how long it takes to parse the recipes recorded in the
+functional test cassettes
+
+Usage:
+
+    python tools/benchmark-recipe-parsing.py --rounds 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import yaml
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from scraper_engine.sites.tudo_gostoso import scrapers  # noqa
+
+# the cassettes take seconds to load with the pure python parser
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+CASSETTES_PATH = (
+    Path(__file__).parent.parent.joinpath("tests", "functional", ".cassetes").absolute()
+)
+
+
+def load_recipe_responses(path: Path) -> list:
+    """returns a :py:class:`requests.Response` for every recipe page
+    recorded in the cassettes"""
+    responses = []
+    for cassette in sorted(path.iterdir()):
+        with cassette.open() as fd:
+            data = yaml.load(fd, Loader=SafeLoader)
+
+        for interaction in data["interactions"]:
+            url = interaction["request"]["uri"]
+            recorded = interaction["response"]
+            if "/receita/" not in url or recorded["status"]["code"] != 200:
+                continue
+
+            body = recorded["body"]["string"]
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+
+            response = Response()
+            response.url = url
+            response.status_code = 200
+            response.headers = CaseInsensitiveDict(
+                {name: values[-1] for name, values in recorded["headers"].items()}
+            )
+            response._content = body
+            response.encoding = "utf-8"
+            responses.append(response)
+
+    return responses
+
+
+def benchmark(responses: list, rounds: int, method: str = "get_recipe") -> list:
+    timings = []
+    for _ in range(rounds):
+        for response in responses:
+            started = time.perf_counter()
+            scraper = scrapers.RecipeScraper(response.url, response)
+            getattr(scraper, method)()
+            timings.append(time.perf_counter() - started)
+
+    return timings
+
+
+def compile_selector_every_time(selector: str) -> scrapers.CSSSelector:
+    # what ``HtmlElement.cssselect`` does on every call
+    return scrapers.CSSSelector(selector, translator="html")
+
+
+def report(name: str, timings: list):
+    print(
+        f"{name:>12}: "
+        f"mean {statistics.mean(timings) * 1000:.2f}ms, "
+        f"median {statistics.median(timings) * 1000:.2f}ms, "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95)] * 1000:.2f}ms per recipe"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--rounds", default=20, type=int)
+    parser.add_argument("-p", "--cassettes-path", default=CASSETTES_PATH, type=Path)
+    args = parser.parse_args()
+
+    responses = load_recipe_responses(args.cassettes_path)
+    print(f"parsing {len(responses)} recipes {args.rounds} times")
+
+    compile_selector = scrapers.compile_selector
+    scrapers.compile_selector = compile_selector_every_time
+    try:
+        report("uncompiled", benchmark(responses, args.rounds))
+    finally:
+        scrapers.compile_selector = compile_selector
+
+    report("compiled", benchmark(responses, args.rounds))
+    report("single pass", benchmark(responses, args.rounds, "extract_recipe"))
+    report("json-ld", benchmark(responses, args.rounds, "scrape_recipe"))
+
+
+if __name__ == "__main__":
+    main()